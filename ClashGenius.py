@@ -1,44 +1,408 @@
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
-import aiohttp
 import asyncio
 import datetime
-import json
+import functools
+import math
 import os
+import time
 from dotenv import load_dotenv
-from keep_alive import keep_alive
+from keep_alive import HealthServer
+from coc_api import CocClient, BASE_URL
+from ratelimit import INTERACTIVE, CircuitBreaker, RateGovernor, api_priority
+from cache import TTLCache, SnapshotStore
+from storage import SnapshotDB
+from history import HistoryStore
+from players import MemberCache, PlayerRefresher
+from analytics import WarAnalytics, war_log_summary
+from activity import ActivityTracker, profile_fingerprint
+from cwl import CWL_WARS_PER_GROUP, League, LeagueGroup, RoundProgress, parse_league_war
+from notifications import split_message
+from tables import Column, PageCache, render_table
+from search import MemberIndex
+from war import WarState
+from models import CapitalSeason, Clan
+from scheduler import CAPITAL_POLL_RETRY, capital_poll_delay, war_poll_delay
+from clans import ClanConfig, ClanRegistry, load_clan_configs, load_subscriptions, normalize_tag, run_for_clans
+from events import (EventPipeline, MemberJoined, MemberLeft, Donation, DonationReceived, TrophyReport,
+                    DonationReport, WarSummaryReport, WarStateChanged, MissedAttacks, WarAttackMade,
+                    CapitalSeasonStarted, CapitalSeasonSummary, CapitalContributions, CapitalRaidAttack)
+from jobs import CronSchedule, Job, JobScheduler
+from metrics import (REGISTRY, CACHE_HIT_RATE, CACHE_SIZE, DISCORD_MESSAGES, DISCORD_SEND_DURATION,
+                     DISCORD_SEND_ERRORS, EVENT_QUEUE_DEPTH, API_CIRCUIT_OPEN, LOOP_DURATION, LOOP_OVERRUNS)
 
 # Carregar variáveis de ambiente
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 COC_API_KEY = os.getenv('COC_API_KEY')
 CLAN_TAG = os.getenv('CLAN_TAG')
-GUILD_ID = int(os.getenv('GUILD_ID'))
-LOG_CHANNEL_ID = int(os.getenv('LOG_CHANNEL_ID'))
+GUILD_ID = os.getenv('GUILD_ID')
+LOG_CHANNEL_ID = os.getenv('LOG_CHANNEL_ID')
 
-keep_alive()
+# Vários clãs podem ser monitorados por um único processo (veja load_clan_configs)
+CLANS_FILE = os.getenv('CLANS_FILE')
+CLANS = os.getenv('CLANS')
+# Destinos extras dos eventos de cada clã: canais de outros servidores e webhooks
+# (veja load_subscriptions)
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+SUBSCRIPTIONS = os.getenv('SUBSCRIPTIONS')
+CLAN_POLL_CONCURRENCY = int(os.getenv('CLAN_POLL_CONCURRENCY', '5'))
+# Fração do intervalo de cada tarefa usada para escalonar o início das verificações
+CLAN_POLL_SPREAD = float(os.getenv('CLAN_POLL_SPREAD', '0.5'))
+# Intervalo (em segundos) em que o agendador procura clãs com verificação pendente
+SCHEDULER_TICK = int(os.getenv('SCHEDULER_TICK', '60'))
 
-# Configuração do bot
+# Configuração do cliente HTTP da API do Clash of Clans
+COC_API_BASE_URL = os.getenv('COC_API_BASE_URL', BASE_URL)
+COC_HTTP_POOL_SIZE = int(os.getenv('COC_HTTP_POOL_SIZE', '20'))
+COC_HTTP_TIMEOUT = float(os.getenv('COC_HTTP_TIMEOUT', '10'))
+COC_HTTP_CONNECT_TIMEOUT = float(os.getenv('COC_HTTP_CONNECT_TIMEOUT', '5'))
+COC_DNS_CACHE_TTL = int(os.getenv('COC_DNS_CACHE_TTL', '300'))
+COC_RESPONSE_CACHE_SIZE = int(os.getenv('COC_RESPONSE_CACHE_SIZE', '512'))
+
+# Limite de requisições à API (por segundo, 0 desativa), novas tentativas após
+# 429/5xx e disjuntor (falhas seguidas até suspender as consultas e por quantos segundos)
+COC_RATE_LIMIT = float(os.getenv('COC_RATE_LIMIT', '10'))
+COC_RATE_BURST = int(os.getenv('COC_RATE_BURST', '10'))
+COC_MAX_RETRIES = int(os.getenv('COC_MAX_RETRIES', '3'))
+COC_BREAKER_THRESHOLD = int(os.getenv('COC_BREAKER_THRESHOLD', '5'))
+COC_BREAKER_RESET = float(os.getenv('COC_BREAKER_RESET', '60'))
+
+# Intervalo (em segundos) em que o perfil de cada membro monitorado é atualizado
+# em segundo plano; as consultas são espalhadas ao longo dele
+PLAYER_REFRESH_INTERVAL = float(os.getenv('PLAYER_REFRESH_INTERVAL', '3600'))
+
+# Sincronização do histórico de guerras e das temporadas da Capital com o banco:
+# agenda (cron) e itens por página
+HISTORY_SYNC_SCHEDULE = os.getenv('HISTORY_SYNC_SCHEDULE', '15 * * * *')
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '25'))
+INACTIVE_DAYS = int(os.getenv('INACTIVE_DAYS', '3'))
+# Linhas por página dos rankings, até 50 (um clã inteiro) para caber no limite
+# de 4096 caracteres da descrição de um embed
+RANKING_PAGE_SIZE = max(1, min(int(os.getenv('RANKING_PAGE_SIZE', '20')), 50))
+RANKING_VIEW_TIMEOUT = float(os.getenv('RANKING_VIEW_TIMEOUT', '300'))
+
+# Guerras da Liga de Clãs buscadas ao mesmo tempo ao atualizar um grupo
+CWL_FETCH_CONCURRENCY = int(os.getenv('CWL_FETCH_CONCURRENCY', '10'))
+
+# Idade máxima (em segundos) dos dados usados pelos comandos antes de consultar a API
+SNAPSHOT_MAX_AGE = int(os.getenv('SNAPSHOT_MAX_AGE', '300'))
+
+# Banco SQLite onde o estado de comparação é salvo entre reinícios
+SNAPSHOT_DB_PATH = os.getenv('SNAPSHOT_DB_PATH', 'clashgenius.db')
+
+# Histórico de troféus e doações (no mesmo banco): por quantos dias as amostras
+# de cada verificação são mantidas, além dos resumos por hora e por dia
+HISTORY_RAW_RETENTION_DAYS = float(os.getenv('HISTORY_RAW_RETENTION_DAYS', '7'))
+
+# Pipeline de notificações: tamanho máximo da fila, workers de entrega, tempo
+# (em segundos) para juntar os eventos de uma rodada e tentativas por envio
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', '1000'))
+EVENT_WORKERS = int(os.getenv('EVENT_WORKERS', '4'))
+EVENT_BATCH_WINDOW = float(os.getenv('EVENT_BATCH_WINDOW', '1'))
+EVENT_MAX_RETRIES = int(os.getenv('EVENT_MAX_RETRIES', '3'))
+# Limite de mensagens por segundo (e rajada) de cada canal ou webhook de destino
+EVENT_DESTINATION_RATE = float(os.getenv('EVENT_DESTINATION_RATE', '1'))
+EVENT_DESTINATION_BURST = int(os.getenv('EVENT_DESTINATION_BURST', '5'))
+
+# Agendas (formato cron, no horário local; vazio desativa) dos relatórios e por
+# quantos segundos um relatório perdido com o bot fora do ar ainda é enviado
+TROPHY_REPORT_SCHEDULE = os.getenv('TROPHY_REPORT_SCHEDULE', '0 0 * * *')
+DONATION_REPORT_SCHEDULE = os.getenv('DONATION_REPORT_SCHEDULE', '0 20 * * 0')
+WAR_REPORT_SCHEDULE = os.getenv('WAR_REPORT_SCHEDULE', '0 21 * * 0')
+REPORT_CATCHUP = int(os.getenv('REPORT_CATCHUP', '3600'))
+
+# Servidor HTTP de saúde (/, /ready, /status e /metrics)
+HEALTH_HOST = os.getenv('HEALTH_HOST', '0.0.0.0')
+HEALTH_PORT = int(os.getenv('HEALTH_PORT', '3000'))
+
+# Configuração do bot. Por padrão o bot não pede o intent de conteúdo das
+# mensagens: os comandos de barra funcionam sempre e os com prefixo só
+# mencionando o bot (@bot clan). MESSAGE_CONTENT_INTENT=1 volta a aceitar `!coc`.
+MESSAGE_CONTENT_INTENT = os.getenv('MESSAGE_CONTENT_INTENT', '0') == '1'
+# O Discord limita bastante o registro dos comandos de barra: só registrar
+# (SYNC_APP_COMMANDS=1) na primeira vez e quando os comandos mudarem
+SYNC_APP_COMMANDS = os.getenv('SYNC_APP_COMMANDS', '0') == '1'
 intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix='!coc ', intents=intents)
-
-# URLs da API do Clash of Clans
-BASE_URL = "https://api.clashofclans.com/v1"
-
-# Headers para a API do Clash of Clans
-headers = {
-    "Authorization": f"Bearer {COC_API_KEY}",
-    "Accept": "application/json"
-}
-
-# Dicionário para armazenar dados anteriores para comparação
-previous_data = {
-    "members": {},
-    "war": None,
-    "donations": {},
-    "capital": None  # Adicionada esta linha
-}
+intents.message_content = MESSAGE_CONTENT_INTENT
+
+# Cliente único da API do Clash of Clans, compartilhado por todas as funções
+coc_client = CocClient(
+    COC_API_KEY,
+    base_url=COC_API_BASE_URL,
+    pool_size=COC_HTTP_POOL_SIZE,
+    dns_cache_ttl=COC_DNS_CACHE_TTL,
+    total_timeout=COC_HTTP_TIMEOUT,
+    connect_timeout=COC_HTTP_CONNECT_TIMEOUT,
+    cache_size=COC_RESPONSE_CACHE_SIZE,
+    governor=RateGovernor(COC_RATE_LIMIT, COC_RATE_BURST),
+    breaker=CircuitBreaker(COC_BREAKER_THRESHOLD, COC_BREAKER_RESET),
+    max_retries=COC_MAX_RETRIES
+)
+
+# Estado de comparação persistido em disco
+snapshot_db = SnapshotDB(SNAPSHOT_DB_PATH)
+
+# Histórico dos membros e dos clãs, consultado pelo comando historico
+history_store = HistoryStore(SNAPSHOT_DB_PATH, raw_retention=HISTORY_RAW_RETENTION_DAYS * 86400)
+
+# Última execução de cada tarefa de monitoramento: {nome: {"last_run", "duration"}}
+loop_runs = {}
+
+def record_loop_run(name, started, interval):
+    duration = time.monotonic() - started
+    loop_runs[name] = {"last_run": time.time(), "duration": duration}
+    LOOP_DURATION.observe(duration, loop=name)
+    if duration > interval:
+        LOOP_OVERRUNS.inc(loop=name)
+
+# O bot está pronto para atender: conectado ao Discord e com a sessão da API aberta
+def is_ready():
+    return bot.is_ready() and coc_client.is_open
+
+# Relatório exibido em /status
+def health_status():
+    now = time.time()
+    gateway_latency = bot.latency
+    return {
+        "ready": is_ready(),
+        "discord": {
+            "connected": bot.is_ready(),
+            "gateway_latency_ms": round(gateway_latency * 1000, 1) if math.isfinite(gateway_latency) else None
+        },
+        "api": {
+            "last_latency_ms": round(coc_client.last_latency * 1000, 1) if coc_client.last_latency is not None else None,
+            "last_request_seconds_ago": round(now - coc_client.last_request_at, 1) if coc_client.last_request_at else None,
+            "response_cache": coc_client.cache.stats() if coc_client.cache is not None else None,
+            "circuit": coc_client.breaker.state,
+            "rate_limit_waiting": coc_client.governor.waiting
+        },
+        "loops": {
+            name: {
+                "last_run_seconds_ago": round(now - run["last_run"], 1),
+                "duration_seconds": round(run["duration"], 3)
+            }
+            for name, run in loop_runs.items()
+        },
+        "clans": len(clan_registry)
+    }
+
+# Métricas exibidas em /metrics, com as taxas de acerto dos caches atualizadas na hora
+def metrics_text():
+    caches = {"member": member_cache.stats(), "snapshot": snapshots.stats(), "league_war": league_war_cache.stats(),
+              "ranking_pages": ranking_pages.stats()}
+    if coc_client.cache is not None:
+        caches["api_response"] = coc_client.cache.stats()
+    for name, stats in caches.items():
+        CACHE_HIT_RATE.set(stats["hit_rate"], cache=name)
+        CACHE_SIZE.set(stats["size"], cache=name)
+    EVENT_QUEUE_DEPTH.set(event_pipeline.qsize())
+    API_CIRCUIT_OPEN.set(1 if coc_client.breaker.state == "open" else 0)
+    return REGISTRY.render()
+
+health_server = HealthServer(is_ready, health_status, host=HEALTH_HOST, port=HEALTH_PORT,
+                             metrics_provider=metrics_text)
+
+# Envia uma mensagem ao Discord contando o envio e a latência para a origem
+# (tarefa de monitoramento ou comando) nas métricas
+async def metered_send(send, source, *args, **kwargs):
+    started = time.monotonic()
+    try:
+        message = await send(*args, **kwargs)
+    except Exception:
+        DISCORD_SEND_ERRORS.inc(source=source)
+        raise
+    DISCORD_SEND_DURATION.observe(time.monotonic() - started, source=source)
+    DISCORD_MESSAGES.inc(source=source)
+    return message
+
+# Canal de logs cujos envios entram nas métricas da tarefa que os fez
+class MeteredChannel:
+    def __init__(self, channel, source):
+        self.id = channel.id
+        self.channel = channel
+        self.source = source
+
+    async def send(self, *args, **kwargs):
+        return await metered_send(self.channel.send, self.source, *args, **kwargs)
+
+# Contexto dos comandos cujas respostas entram nas métricas do comando
+class MeteredContext(commands.Context):
+    async def send(self, *args, **kwargs):
+        source = f"command:{self.command.name}" if self.command else "command"
+        return await metered_send(super().send, source, *args, **kwargs)
+
+# Botões para navegar entre as páginas (embeds já prontos) de um ranking. Trocar
+# de página só edita a mensagem; ao expirar, os botões são desativados.
+class PageView(discord.ui.View):
+    def __init__(self, pages, timeout=RANKING_VIEW_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.index = 0
+        self.message = None
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index == len(self.pages) - 1
+
+    async def _show(self, interaction, index):
+        self.index = max(0, min(index, len(self.pages) - 1))
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.index], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self._show(interaction, self.index - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self._show(interaction, self.index + 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+# Envia a primeira página de um ranking, com os botões se houver mais de uma
+async def send_pages(ctx, pages):
+    if len(pages) == 1:
+        await ctx.send(embed=pages[0])
+        return
+    view = PageView(pages)
+    view.message = await ctx.send(embed=pages[0], view=view)
+
+# Um embed por página de tabela, com o número da página no rodapé
+def page_embeds(title, tables, color=0x00ff00):
+    embeds = []
+    for number, table in enumerate(tables, 1):
+        embed = discord.Embed(title=title, description=table, color=color)
+        if len(tables) > 1:
+            embed.set_footer(text=f"Página {number}/{len(tables)}")
+        embeds.append(embed)
+    return embeds
+
+class ClashGeniusBot(commands.Bot):
+    async def get_context(self, origin, *, cls=MeteredContext):
+        return await super().get_context(origin, cls=cls)
+
+    # Inicia o servidor de saúde e restaura o estado salvo de cada clã antes de
+    # iniciar o monitoramento
+    async def setup_hook(self):
+        await health_server.start()
+        event_pipeline.start()
+        await asyncio.to_thread(snapshot_db.open)
+        await asyncio.to_thread(history_store.open)
+        for state in clan_registry:
+            state.restore(await asyncio.to_thread(snapshot_db.load_state, state.tag))
+        job_scheduler.restore(await asyncio.to_thread(snapshot_db.load_job_runs))
+        war_analytics.add(*await asyncio.to_thread(snapshot_db.load_war_archive))
+        activity_tracker.restore(await asyncio.to_thread(snapshot_db.load_activity))
+        for state in clan_registry:
+            member_index.update(state.tag, state.members)
+        if SYNC_APP_COMMANDS:
+            await self.sync_app_commands()
+
+    # Registra os comandos de barra em cada servidor com clã configurado, onde
+    # ficam disponíveis na hora (o registro global leva até uma hora)
+    async def sync_app_commands(self):
+        for guild_id in clan_registry.guild_ids():
+            guild = discord.Object(guild_id)
+            self.tree.copy_global_to(guild=guild)
+            try:
+                await self.tree.sync(guild=guild)
+            except discord.HTTPException as e:
+                print(f"Erro ao registrar os comandos de barra no servidor {guild_id}: {e}")
+
+    # Entrega as notificações pendentes e fecha o servidor de saúde, as conexões
+    # com a API e o banco ao desligar o bot
+    async def close(self):
+        await event_pipeline.stop()
+        await player_refresher.stop()
+        await health_server.stop()
+        await coc_client.close()
+        snapshot_db.close()
+        history_store.close()
+        await super().close()
+
+bot = ClashGeniusBot(command_prefix=commands.when_mentioned_or('!coc '), intents=intents)
+
+# Registro dos clãs monitorados, com o estado da última verificação de cada um
+clan_registry = ClanRegistry()
+for config in load_clan_configs(CLANS_FILE, CLANS):
+    clan_registry.register(config)
+if CLAN_TAG and GUILD_ID and LOG_CHANNEL_ID:
+    clan_registry.register(ClanConfig(CLAN_TAG, GUILD_ID, LOG_CHANNEL_ID))
+for subscription in load_subscriptions(SUBSCRIPTIONS_FILE, SUBSCRIPTIONS):
+    if not clan_registry.subscribe(subscription):
+        print(f"Inscrição ignorada: o clã {subscription.tag} não é monitorado")
+
+clan_poll_semaphore = asyncio.Semaphore(CLAN_POLL_CONCURRENCY)
+
+# Eventos detectados pelo monitoramento, entregues em segundo plano ao canal de
+# logs e aos destinos inscritos de cada clã. Uma única verificação alimenta
+# todos os destinos.
+def resolve_event_channels(clan_tag, source):
+    state = clan_registry.get(clan_tag)
+    if not state:
+        return []
+    channels = [get_log_channel(state, source)]
+    for subscription in state.subscriptions:
+        # Um destino com problema não impede a entrega aos demais
+        try:
+            channels.append(get_subscription_channel(subscription, source))
+        except Exception as e:
+            target = "webhook" if subscription.webhook_url else f"canal {subscription.channel_id}"
+            print(f"Erro ao preparar o destino ({target}) do clã {clan_tag}: {e}")
+    return [channel for channel in channels if channel is not None]
+
+event_pipeline = EventPipeline(resolve_event_channels, maxsize=EVENT_QUEUE_SIZE, workers=EVENT_WORKERS,
+                               batch_window=EVENT_BATCH_WINDOW, max_retries=EVENT_MAX_RETRIES,
+                               destination_rate=EVENT_DESTINATION_RATE, destination_burst=EVENT_DESTINATION_BURST)
+
+# Últimos dados obtidos pelo monitoramento, compartilhados com os comandos
+snapshots = SnapshotStore(SNAPSHOT_MAX_AGE)
+
+# Estatísticas das guerras arquivadas, usadas pelo comando stats
+war_analytics = WarAnalytics()
+
+# Perfis dos membros de todos os clãs monitorados, atualizados em segundo plano
+# e lidos pelos comandos sem consultar a API
+member_cache = MemberCache()
+
+def tracked_member_tags():
+    return [tag for state in clan_registry for tag in state.members]
+
+# Nomes dos membros de todos os clãs monitorados, para o autocompletar
+member_index = MemberIndex()
+
+# Última atividade de cada membro monitorado, usada pelo comando inativos
+activity_tracker = ActivityTracker()
+
+# Compara a marca de atividade do perfil recém-atualizado com a anterior
+async def record_profile_activity(profile):
+    row = activity_tracker.observe(profile.tag, profile_fingerprint(profile), time.time())
+    if row:
+        await asyncio.to_thread(snapshot_db.save_activity, [row])
+
+# Guerras terminadas da Liga de Clãs (não mudam mais, guardadas como WarState),
+# por tag da guerra. Uma temporada da liga dura cerca de 8 dias; o tamanho
+# comporta todas as guerras do grupo de cada clã monitorado.
+league_war_cache = TTLCache(8 * 86400, maxsize=max(1, len(clan_registry)) * CWL_WARS_PER_GROUP)
+
+# Páginas dos rankings, renderizadas uma vez por snapshot
+ranking_pages = PageCache()
+
+DONATION_COLUMNS = [Column('Posição', 8), Column('Nome', 15), Column('Doações', 8), Column('Recebidas', 9),
+                    Column('Razão', 5)]
+TROPHY_COLUMNS = [Column('Posição', 8), Column('Nome', 15), Column('Troféus', 7), Column('TH', 3), Column('Liga', 20)]
+CAPITAL_COLUMNS = [Column('Posição', 8), Column('Nome', 15), Column('Ouro', 10)]
+cwl_fetch_semaphore = asyncio.Semaphore(CWL_FETCH_CONCURRENCY)
 
 # Função auxiliar para formatar a tag do clã
 def format_tag(tag):
@@ -47,509 +411,677 @@ def format_tag(tag):
     return tag.replace('#', '%23')
 
 # Função para obter dados do clã
-async def get_clan_data():
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{BASE_URL}/clans/{format_tag(CLAN_TAG)}", headers=headers) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                print(f"Erro ao obter dados do clã: {response.status}")
-                return None
+async def get_clan_data(clan_tag):
+    return await coc_client.get(f"/clans/{format_tag(clan_tag)}", f"Erro ao obter dados do clã {clan_tag}")
 
 # Função para obter dados da guerra atual
-async def get_current_war():
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{BASE_URL}/clans/{format_tag(CLAN_TAG)}/currentwar", headers=headers) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                print(f"Erro ao obter dados da guerra: {response.status}")
-                return None
-# Função para obter dados da Capital do Clã
-async def get_clan_capital_info():
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{BASE_URL}/clans/{format_tag(CLAN_TAG)}/capitalraidseasons", headers=headers) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                print(f"Erro ao obter dados da Capital do Clã: {response.status}")
-                return None
+async def get_current_war(clan_tag):
+    return await coc_client.get(f"/clans/{format_tag(clan_tag)}/currentwar", f"Erro ao obter dados da guerra {clan_tag}")
 
-# Função para obter dados do histórico de guerras
-async def get_war_log():
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{BASE_URL}/clans/{format_tag(CLAN_TAG)}/warlog", headers=headers) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                print(f"Erro ao obter histórico de guerras: {response.status}")
-                return None
+# Função para obter dados da Capital do Clã (só a temporada atual)
+async def get_clan_capital_info(clan_tag):
+    return await coc_client.get(f"/clans/{format_tag(clan_tag)}/capitalraidseasons?limit=1", f"Erro ao obter dados da Capital do Clã {clan_tag}")
+
+# Páginas do histórico de guerras, da mais recente para a mais antiga (403 se o
+# histórico do clã é privado)
+def war_log_pages(clan_tag):
+    return coc_client.iter_pages(f"/clans/{format_tag(clan_tag)}/warlog",
+                                 f"Erro ao obter histórico de guerras {clan_tag}", HISTORY_PAGE_SIZE,
+                                 quiet_statuses=(403,))
+
+# Páginas das temporadas da Capital, da mais recente para a mais antiga
+def capital_season_pages(clan_tag):
+    return coc_client.iter_pages(f"/clans/{format_tag(clan_tag)}/capitalraidseasons",
+                                 f"Erro ao obter temporadas da Capital do Clã {clan_tag}", HISTORY_PAGE_SIZE)
+
+# Função para obter o grupo da Liga de Clãs. Fora da liga a API responde 404,
+# tratado como um grupo com estado notInWar; None só se a consulta falhou.
+async def get_league_group(clan_tag):
+    return await coc_client.get(f"/clans/{format_tag(clan_tag)}/currentwar/leaguegroup",
+                                f"Erro ao obter grupo da Liga de Clãs {clan_tag}", quiet_statuses=(404,),
+                                missing={'state': 'notInWar'})
+
+# Função para obter uma guerra da Liga de Clãs pela tag da guerra, já convertida
+# em WarState
+async def get_league_war(war_tag):
+    war = league_war_cache.get(war_tag)
+    if war is not None:
+        return war
+    async with cwl_fetch_semaphore:
+        war_data = await coc_client.get(f"/clanwarleagues/wars/{format_tag(war_tag)}",
+                                        f"Erro ao obter guerra da Liga de Clãs {war_tag}")
+    if not war_data:
+        return None
+    war = parse_league_war(war_data)
+    if war.state == 'warEnded':
+        league_war_cache.set(war_tag, war)
+    return war
 
 # Função para obter dados de um jogador específico
 async def get_player_data(player_tag):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{BASE_URL}/players/{format_tag(player_tag)}", headers=headers) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                print(f"Erro ao obter dados do jogador {player_tag}: {response.status}")
+    return await coc_client.get(f"/players/{format_tag(player_tag)}", f"Erro ao obter dados do jogador {player_tag}")
+
+player_refresher = PlayerRefresher(member_cache, tracked_member_tags, get_player_data, PLAYER_REFRESH_INTERVAL,
+                                   on_refresh=record_profile_activity)
+
+# Funções que buscam os dados e já os convertem nos registros compactos
+async def fetch_clan(clan_tag):
+    clan_data = await get_clan_data(clan_tag)
+    return Clan.from_payload(clan_data) if clan_data else None
+
+async def fetch_war(clan_tag):
+    war_data = await get_current_war(clan_tag)
+    return WarState(war_data) if war_data else None
+
+async def fetch_capital(clan_tag):
+    capital_data = await get_clan_capital_info(clan_tag)
+    if not capital_data or not capital_data.get("items"):
+        return None
+    return CapitalSeason.from_payload(capital_data["items"][0])
+
+# Busca o grupo da liga e todas as guerras de todas as rodadas ao mesmo tempo
+# (as terminadas vêm do cache). Fora da liga retorna um League com estado
+# notInWar; se a consulta do grupo falhar, None.
+async def fetch_league(clan_tag):
+    group_data = await get_league_group(clan_tag)
+    if group_data is None:
+        return None
+    group = LeagueGroup.from_payload(group_data)
+    war_tags = group.war_tags
+    results = await asyncio.gather(*(get_league_war(war_tag) for war_tag in war_tags))
+    return League(group, {war_tag: war for war_tag, war in zip(war_tags, results) if war})
+
+# Funções para obter os dados mais recentes de um clã, reaproveitando os snapshots
+def get_clan_snapshot(clan_tag, max_age=None):
+    return snapshots.get(("clan", clan_tag), lambda: fetch_clan(clan_tag), max_age)
+
+def get_war_snapshot(clan_tag, max_age=None):
+    return snapshots.get(("war", clan_tag), lambda: fetch_war(clan_tag), max_age)
+
+def get_capital_snapshot(clan_tag, max_age=None):
+    return snapshots.get(("capital", clan_tag), lambda: fetch_capital(clan_tag), max_age)
+
+def get_league_snapshot(clan_tag, max_age=None):
+    return snapshots.get(("league", clan_tag), lambda: fetch_league(clan_tag), max_age)
+
+# Função para encontrar o canal de logs de um clã. `source` identifica a tarefa
+# que vai enviar as mensagens, para as métricas.
+def get_log_channel(state, source):
+    guild = bot.get_guild(state.config.guild_id)
+    if not guild:
+        print(f"Não foi possível encontrar o servidor com ID {state.config.guild_id}")
+        return None
+    
+    log_channel = guild.get_channel(state.config.channel_id)
+    if not log_channel:
+        print(f"Não foi possível encontrar o canal com ID {state.config.channel_id}")
+        return None
+    return MeteredChannel(log_channel, source)
+
+# Webhooks das inscrições, criados uma vez por URL (usam a sessão HTTP do bot)
+webhooks = {}
+
+# Função para encontrar o destino de uma inscrição: o webhook ou o canal do
+# outro servidor
+def get_subscription_channel(subscription, source):
+    if subscription.webhook_url:
+        webhook = webhooks.get(subscription.webhook_url)
+        if webhook is None:
+            try:
+                webhook = webhooks[subscription.webhook_url] = discord.Webhook.from_url(subscription.webhook_url, client=bot)
+            except ValueError:
+                print(f"URL de webhook inválida na inscrição do clã {subscription.tag}")
                 return None
+        return MeteredChannel(webhook, source)
+    
+    guild = bot.get_guild(subscription.guild_id)
+    channel = guild.get_channel(subscription.channel_id) if guild else None
+    if not channel:
+        print(f"Não foi possível encontrar o canal com ID {subscription.channel_id} (servidor {subscription.guild_id})")
+        return None
+    return MeteredChannel(channel, source)
+
+# Função para escolher o clã de um comando: a tag informada ou o clã do servidor
+def resolve_clan_tag(ctx, tag=None):
+    if tag:
+        return normalize_tag(tag)
+    if ctx.guild:
+        states = clan_registry.for_guild(ctx.guild.id)
+        if states:
+            return states[0].tag
+    for state in clan_registry:
+        return state.tag
+    return None
+
+# Procura membros atuais de um clã pela tag ou pelo nome (exato ou parte dele):
+# [(tag, nome)]. Uma tag é aceita mesmo se o jogador já saiu do clã.
+def find_members(clan_tag, query):
+    state = clan_registry.get(clan_tag)
+    members = (state.members if state else None) or {}
+    if query.startswith('#'):
+        member_tag = normalize_tag(query)
+        member = members.get(member_tag)
+        return [(member_tag, member.name if member else member_tag)]
+    lowered = query.lower()
+    matches = [m for m in members.values() if m.name and m.name.lower() == lowered]
+    matches = matches or [m for m in members.values() if m.name and lowered in m.name.lower()]
+    return [(m.tag, m.name) for m in matches]
+
+# Mensagem para uma busca de membro sem resultado ou com mais de um
+def member_lookup_error(query, matches):
+    if not matches:
+        return f"Membro '{query}' não encontrado no clã."
+    names = ", ".join(name for _, name in matches[:10])
+    return f"Mais de um membro encontrado: {names}. Use a tag do jogador."
+
+# Duração do intervalo de uma tarefa em segundos
+def loop_interval(loop):
+    return loop.hours * 3600 + loop.minutes * 60 + loop.seconds
+
+# As consultas feitas pelos comandos passam na frente das tarefas de monitoramento
+@bot.before_invoke
+async def prioritize_command(ctx):
+    api_priority.set(INTERACTIVE)
 
 @bot.event
 async def on_ready():
     print(f'{bot.user.name} está online!')
+    # Abrir a sessão HTTP compartilhada com a API
+    await coc_client.open()
     # Iniciar as tarefas de monitoramento
     check_clan_status.start()
     check_war_status.start()
     check_clan_capital_status.start()
+    run_scheduled_reports.start()
+    # Atualizar os perfis dos membros em segundo plano
+    player_refresher.start()
 
-# Task para verificar o status do clã regularmente
+# Task para verificar o status dos clãs regularmente
 @tasks.loop(minutes=5)
 async def check_clan_status():
+    started = time.monotonic()
     try:
-        guild = bot.get_guild(GUILD_ID)
-        if not guild:
-            print(f"Não foi possível encontrar o servidor com ID {GUILD_ID}")
-            return
-        
-        log_channel = guild.get_channel(LOG_CHANNEL_ID)
-        if not log_channel:
-            print(f"Não foi possível encontrar o canal com ID {LOG_CHANNEL_ID}")
-            return
-        
-        clan_data = await get_clan_data()
-        if not clan_data:
-            return
-        
-        # Verificar se memberList existe nos dados retornados
-        if 'memberList' not in clan_data:
-            print("Erro: memberList não encontrado nos dados do clã")
-            return
-            
-        # Verificar mudanças nos membros
-        current_members = {member['tag']: member for member in clan_data['memberList']}
-        
-        # Novos membros e membros que saíram
-        if previous_data["members"]:
-            # Verificar novos membros
-            for tag, member in current_members.items():
-                if tag not in previous_data["members"]:
-                    await log_channel.send(f"📥 **Novo membro no clã!** {member['name']} (#{member['tag'][1:]}) entrou no clã!")
-            
-            # Verificar membros que saíram
-            for tag, member in previous_data["members"].items():
-                if tag not in current_members:
-                    await log_channel.send(f"📤 **Membro saiu do clã!** {member['name']} (#{member['tag'][1:]}) saiu do clã!")
+        await run_for_clans(clan_registry, check_clan, clan_poll_semaphore,
+                            loop_interval(check_clan_status) * CLAN_POLL_SPREAD)
+    finally:
+        record_loop_run("check_clan_status", started, loop_interval(check_clan_status))
+
+# Verifica mudanças de membros e doações de um clã
+async def check_clan(state):
+    clan = await get_clan_snapshot(state.tag, max_age=0)
+    if not clan:
+        return
+    
+    # Verificar se memberList existe nos dados retornados
+    if clan.members is None:
+        print("Erro: memberList não encontrado nos dados do clã")
+        return
         
+    # Verificar mudanças nos membros
+    current_members = clan.members
+    
+    # Novos membros e membros que saíram
+    active = []
+    if state.members:
+        # Verificar novos membros
+        for tag, member in current_members.items():
+            if tag not in state.members:
+                await event_pipeline.emit(MemberJoined(state.tag, member.name, member.tag))
+        
+        # Verificar membros que saíram
+        for tag, member in state.members.items():
+            if tag not in current_members:
+                await event_pipeline.emit(MemberLeft(state.tag, member.name, member.tag))
+    
         # Verificar mudanças nas doações
-        if previous_data["donations"]:
-            for tag, member in current_members.items():
-                if tag in previous_data["donations"]:
-                    # Verificar se as chaves existem antes de acessá-las
-                    if 'donations' in member and 'donationsReceived' in member and 'donations' in previous_data["donations"][tag] and 'donationsReceived' in previous_data["donations"][tag]:
-                        old_donations = previous_data["donations"][tag]["donations"]
-                        old_received = previous_data["donations"][tag]["donationsReceived"]
-                        
-                        new_donations = member["donations"]
-                        new_received = member["donationsReceived"]
-                        
-                        if new_donations > old_donations:
-                            diff = new_donations - old_donations
-                            await log_channel.send(f"🎁 **Doações:** {member['name']} doou {diff} tropas! (Total: {new_donations})")
-                        
-                        if new_received > old_received:
-                            diff = new_received - old_received
-                            await log_channel.send(f"📦 **Recebimentos:** {member['name']} recebeu {diff} tropas! (Total: {new_received})")
-        
-        # Atualizar dados para a próxima verificação
-        previous_data["members"] = current_members
-        previous_data["donations"] = {}
-        for m in clan_data['memberList']:
-            if 'donations' in m and 'donationsReceived' in m:
-                previous_data["donations"][m['tag']] = {"donations": m['donations'], "donationsReceived": m['donationsReceived']}
-        
-        # Log de troféus e ligas
-        now = datetime.datetime.now()
-        if now.hour == 0 and now.minute < 30:  # Fazer isso uma vez por dia, por volta da meia-noite
-            trophy_log = "📊 **Registro diário de troféus**\n```\n"
-            trophy_log += f"{'Nome':<15} | {'Troféus':<7} | {'Liga':<20}\n"
-            trophy_log += "-" * 50 + "\n"
+        for tag, member in current_members.items():
+            old_member = state.members.get(tag)
+            if old_member is None:
+                continue
+            # Verificar se os valores existem antes de compará-los
+            if None in (member.donations, member.donations_received, old_member.donations, old_member.donations_received):
+                continue
             
-            for member in sorted(clan_data['memberList'], key=lambda x: x.get('trophies', 0), reverse=True):
-                # Verificar se a chave 'trophies' existe
-                trophies = member.get('trophies', 0)
-                # Verificar se 'league' existe e tem a chave 'name'
-                league_name = member.get('league', {}).get('name', 'Sem Liga')
-                trophy_log += f"{member['name'][:15]:<15} | {trophies:<7} | {league_name:<20}\n"
+            if member.donations > old_member.donations:
+                diff = member.donations - old_member.donations
+                await event_pipeline.emit(Donation(state.tag, member.name, diff, member.donations))
+                active.append(tag)
             
-            trophy_log += "```"
-            await log_channel.send(trophy_log)
-    except Exception as e:
-        print(f"Erro em check_clan_status: {e}")
+            if member.donations_received > old_member.donations_received:
+                diff = member.donations_received - old_member.donations_received
+                await event_pipeline.emit(DonationReceived(state.tag, member.name, diff, member.donations_received))
+                active.append(tag)
+    
+    # Doar ou pedir tropas conta como atividade sem esperar a atualização do perfil
+    if active:
+        now = time.time()
+        rows = [activity_tracker.touch(tag, now) for tag in dict.fromkeys(active)]
+        await asyncio.to_thread(snapshot_db.save_activity, rows)
+    
+    # Atualizar dados para a próxima verificação
+    state.members = current_members
+    member_index.update(state.tag, current_members)
+    await asyncio.to_thread(snapshot_db.save_members, state.tag, state.members)
+    await asyncio.to_thread(history_store.record, state.tag, clan.points, current_members)
 
-# Task para verificar o status da guerra regularmente
-@tasks.loop(minutes=15)
+# Task que verifica a guerra dos clãs cuja próxima verificação já chegou. O
+# intervalo de cada clã se adapta ao estado da guerra (veja scheduler.py).
+@tasks.loop(seconds=SCHEDULER_TICK)
 async def check_war_status():
+    started = time.monotonic()
+    now = time.time()
+    due = [state for state in clan_registry if state.next_war_poll <= now]
     try:
-        guild = bot.get_guild(GUILD_ID)
-        if not guild:
-            return
-        
-        log_channel = guild.get_channel(LOG_CHANNEL_ID)
-        if not log_channel:
-            return
-        
-        war_data = await get_current_war()
-        if not war_data or war_data.get('state') == 'notInWar':
-            return
-        
-        # Se é a primeira verificação ou houve mudança no estado da guerra
-        if not previous_data["war"] or previous_data["war"].get('state') != war_data.get('state'):
-            if war_data.get('state') == 'preparation':
-                # Verificar se as chaves necessárias existem
-                clan_name = war_data.get('clan', {}).get('name', 'Nosso Clã')
-                opponent_name = war_data.get('opponent', {}).get('name', 'Oponente')
-                team_size = war_data.get('teamSize', '?')
-                start_time = war_data.get('startTime', 'horário desconhecido')
-                
-                await log_channel.send(f"⚔️ **Preparação para guerra iniciada!**\n"
-                                      f"**{clan_name}** vs **{opponent_name}**\n"
-                                      f"Guerra de {team_size} vs {team_size}\n"
-                                      f"A fase de batalha começa em {start_time}")
-            
-            elif war_data.get('state') == 'inWar':
-                # Verificar se as chaves necessárias existem
-                clan_name = war_data.get('clan', {}).get('name', 'Nosso Clã')
-                opponent_name = war_data.get('opponent', {}).get('name', 'Oponente')
-                end_time = war_data.get('endTime', 'horário desconhecido')
-                
-                await log_channel.send(f"🔥 **A guerra começou!**\n"
-                                      f"**{clan_name}** vs **{opponent_name}**\n"
-                                      f"A guerra termina em {end_time}")
-            
-            elif war_data.get('state') == 'warEnded':
-                # Resultado da guerra
-                clan_data = war_data.get('clan', {})
-                opponent_data = war_data.get('opponent', {})
-                
-                clan_name = clan_data.get('name', 'Nosso Clã')
-                opponent_name = opponent_data.get('name', 'Oponente')
-                clan_stars = clan_data.get('stars', 0)
-                opponent_stars = opponent_data.get('stars', 0)
-                clan_destruction = clan_data.get('destructionPercentage', 0)
-                opponent_destruction = opponent_data.get('destructionPercentage', 0)
-                
-                result = "Empate!"
-                if clan_stars > opponent_stars:
-                    result = f"**{clan_name}** venceu! 🎉"
-                elif opponent_stars > clan_stars:
-                    result = f"**{opponent_name}** venceu! 😢"
-                elif clan_destruction > opponent_destruction:
-                    result = f"**{clan_name}** venceu por porcentagem de destruição! 🎉"
-                elif opponent_destruction > clan_destruction:
-                    result = f"**{opponent_name}** venceu por porcentagem de destruição! 😢"
-                
-                await log_channel.send(f"🏁 **Guerra terminada!**\n"
-                                      f"**{clan_name}** {clan_stars}⭐ ({clan_destruction:.2f}%)\n"
-                                      f"**{opponent_name}** {opponent_stars}⭐ ({opponent_destruction:.2f}%)\n"
-                                      f"Resultado: {result}")
-                
-                # Listar quem não usou os ataques
-                missed_attacks = []
-                for member in war_data.get('clan', {}).get('members', []):
-                    attacks_used = len(member.get('attacks', []))
-                    attacks_limit = 2  # Assumindo guerra normal de 2 ataques por pessoa
-                    if attacks_used < attacks_limit:
-                        missed_attacks.append((member.get('name', 'Membro desconhecido'), attacks_limit - attacks_used))
-                
-                if missed_attacks:
-                    missed_msg = "❌ **Membros que não usaram todos os ataques:**\n```\n"
-                    for name, missed in missed_attacks:
-                        missed_msg += f"{name}: {missed} {'ataque' if missed == 1 else 'ataques'} não usado(s)\n"
-                    missed_msg += "```"
-                    await log_channel.send(missed_msg)
-        
-        # Verificar novos ataques desde a última checagem
-        if previous_data["war"]:
-            old_attacks = {}
-            for member in previous_data["war"].get('clan', {}).get('members', []):
-                for attack in member.get('attacks', []):
-                    old_attacks[f"{member.get('tag', '')}-{attack.get('defenderTag', '')}"] = attack
-            
-            # Verificar novos ataques do nosso clã
-            for member in war_data.get('clan', {}).get('members', []):
-                for attack in member.get('attacks', []):
-                    if 'tag' in member and 'defenderTag' in attack:
-                        attack_id = f"{member['tag']}-{attack['defenderTag']}"
-                        if attack_id not in old_attacks:
-                            # Encontrar o nome do defensor
-                            defender_name = "Oponente"
-                            for opponent in war_data.get('opponent', {}).get('members', []):
-                                if opponent.get('tag') == attack.get('defenderTag'):
-                                    defender_name = opponent.get('name', 'Oponente')
-                                    break
-                            
-                            stars = "⭐" * attack.get('stars', 0)
-                            destruction = attack.get('destructionPercentage', 0)
-                            await log_channel.send(f"⚔️ **Novo ataque!** {member.get('name', 'Membro')} atacou {defender_name} e conseguiu {stars} ({destruction}%)")
+        await run_for_clans(due, poll_war, clan_poll_semaphore,
+                            loop_interval(check_war_status) * CLAN_POLL_SPREAD)
+    finally:
+        record_loop_run("check_war_status", started, loop_interval(check_war_status))
+
+# Verifica a guerra de um clã (e, fora de guerra comum, a Liga de Clãs) e agenda
+# a próxima verificação. Se a consulta falhar, tenta de novo em WAR_POLL_RETRY.
+async def poll_war(state):
+    war = None
+    try:
+        war = await check_war(state)
+        if war and war.state == 'notInWar':
+            league = await check_league(state)
+            if league is None:
+                # Falha ao consultar a liga: não é o mesmo que estar fora de guerra
+                war = None
+            # Durante a liga a guerra comum fica em notInWar; vale a rodada atual
+            elif league.state != 'notInWar':
+                war = league.current_war(state.tag)[1] or war
+    finally:
+        state.idle_war_polls = state.idle_war_polls + 1 if war and war.state == 'notInWar' else 0
+        delay = war_poll_delay(war, state.idle_war_polls, datetime.datetime.now(datetime.timezone.utc))
+        state.next_war_poll = time.time() + delay
+
+# Verifica mudanças de estado e novos ataques na guerra de um clã. Retorna a
+# guerra obtida (None se a consulta falhou).
+async def check_war(state):
+    war = await get_war_snapshot(state.tag, max_age=0)
+    if not war or war.state == 'notInWar':
+        return war
+    
+    await process_war(state, war, state.war)
+    
+    # Atualizar dados da guerra para a próxima verificação
+    state.war = war
+    await asyncio.to_thread(snapshot_db.save_war, state.tag, war)
+    return war
+
+# Verifica as guerras do clã em todas as rodadas da Liga de Clãs. Retorna a liga
+# obtida (com estado notInWar fora da liga, None se a consulta falhou).
+async def check_league(state):
+    league = await get_league_snapshot(state.tag, max_age=0)
+    if not league or league.state == 'notInWar':
+        return league
+    
+    if state.league_season != league.season:
+        state.league_season = league.season
+        state.league_wars = {}
+    
+    changed = []
+    for league_round, war in league.clan_wars(state.tag):
+        previous = state.league_wars.get(war.id)
+        progress = RoundProgress.from_war(war)
+        if progress == previous:
+            continue
+        if previous is None and war.state == 'warEnded':
+            # Rodada que terminou antes de ser acompanhada: só arquivar
+            await archive_war(state, war)
+        elif war.state in ('preparation', 'inWar', 'warEnded'):
+            await process_war(state, war, previous, league_round)
+        state.league_wars[war.id] = progress
+        changed.append(progress)
+    
+    # Guardar o progresso das rodadas para não repetir as notificações após reiniciar
+    if changed:
+        await asyncio.to_thread(snapshot_db.save_league_rounds, state.tag, league.season, changed)
+    return league
+
+# Guarda uma guerra terminada para as estatísticas
+async def archive_war(state, war):
+    archived = await asyncio.to_thread(snapshot_db.archive_war, state.tag, war)
+    if archived:
+        war_analytics.add(*archived)
+
+# Notifica as mudanças de uma guerra em relação à verificação anterior
+# (`previous`, None na primeira): estado, ataques perdidos e novos ataques
+async def process_war(state, war, previous, league_round=None):
+    # Se é a primeira verificação ou houve mudança no estado da guerra
+    if not previous or previous.state != war.state:
+        if war.state in ('preparation', 'inWar', 'warEnded'):
+            await event_pipeline.emit(WarStateChanged(state.tag, war, league_round))
+        
+        if war.state == 'warEnded':
+            # Arquivar a guerra para as estatísticas
+            await archive_war(state, war)
             
-            # Verificar novos ataques do clã oponente
-            old_opponent_attacks = {}
-            for member in previous_data["war"].get('opponent', {}).get('members', []):
-                for attack in member.get('attacks', []):
-                    if 'tag' in member and 'defenderTag' in attack:
-                        old_opponent_attacks[f"{member['tag']}-{attack['defenderTag']}"] = attack
+            # Listar quem não usou os ataques
+            missed_attacks = []
+            for member in war.clan.members.values():
+                attacks_used = len(member.attacks)
+                attacks_limit = war.attacks_per_member
+                if attacks_used < attacks_limit:
+                    missed_attacks.append((member.name or 'Membro desconhecido', attacks_limit - attacks_used))
             
-            for member in war_data.get('opponent', {}).get('members', []):
-                for attack in member.get('attacks', []):
-                    if 'tag' in member and 'defenderTag' in attack:
-                        attack_id = f"{member['tag']}-{attack['defenderTag']}"
-                        if attack_id not in old_opponent_attacks:
-                            # Encontrar o nome do defensor
-                            defender_name = "Membro"
-                            for our_member in war_data.get('clan', {}).get('members', []):
-                                if our_member.get('tag') == attack.get('defenderTag'):
-                                    defender_name = our_member.get('name', 'Membro')
-                                    break
-                            
-                            stars = "⭐" * attack.get('stars', 0)
-                            destruction = attack.get('destructionPercentage', 0)
-                            await log_channel.send(f"🛡️ **Fomos atacados!** {member.get('name', 'Oponente')} atacou {defender_name} e conseguiu {stars} ({destruction}%)")
-        
-        # Atualizar dados da guerra para a próxima verificação
-        previous_data["war"] = war_data
-    except Exception as e:
-        print(f"Erro em check_war_status: {e}")
-        
-        # Task para monitorar atividades da Capital do Clã
-@tasks.loop(hours=6)  # Verificar a cada 6 horas é suficiente
+            if missed_attacks:
+                await event_pipeline.emit(MissedAttacks(state.tag, missed_attacks))
+    
+    # Verificar novos ataques desde a última checagem (pelo `order` dos ataques)
+    if previous:
+        last_order = previous.last_order if previous.id == war.id else 0
+        for attack in war.attacks_since(last_order):
+            if attack.side == 'clan':
+                attacker_name = war.attacker_name(attack, 'Membro')
+                defender_name = war.defender_name(attack, 'Oponente')
+            else:
+                attacker_name = war.attacker_name(attack, 'Oponente')
+                defender_name = war.defender_name(attack, 'Membro')
+            await event_pipeline.emit(WarAttackMade(state.tag, attack.side, attacker_name, defender_name,
+                                                    attack.stars, attack.destruction))
+
+# Task para monitorar atividades da Capital do Clã. As verificações se concentram
+# no fim de semana de raides (veja scheduler.py).
+@tasks.loop(seconds=SCHEDULER_TICK)
 async def check_clan_capital_status():
+    started = time.monotonic()
+    now = time.time()
+    due = [state for state in clan_registry if state.next_capital_poll <= now]
     try:
-        guild = bot.get_guild(GUILD_ID)
-        if not guild:
-            print(f"Não foi possível encontrar o servidor com ID {GUILD_ID}")
-            return
-        
-        log_channel = guild.get_channel(LOG_CHANNEL_ID)
-        if not log_channel:
-            print(f"Não foi possível encontrar o canal com ID {LOG_CHANNEL_ID}")
-            return
-        
-        capital_data = await get_clan_capital_info()
-        if not capital_data or "items" not in capital_data or len(capital_data["items"]) == 0:
-            return
-        
-        # Obter dados mais recentes da temporada atual da Capital
-        latest_season = capital_data["items"][0]
-        
-        # Verificar se temos dados armazenados para comparação
-        if "capital" not in previous_data or previous_data["capital"] is None:
-            previous_data["capital"] = latest_season
-            return
-        
-        # Comparar com os dados anteriores para verificar mudanças
-        prev_season = previous_data["capital"]
-        
-        # Verificar se é uma nova temporada
-        if prev_season.get("id") != latest_season.get("id"):
-            start_date = latest_season.get("startTime", "desconhecido")
-            end_date = latest_season.get("endTime", "desconhecido")
-            await log_channel.send(f"🏛️ **Nova temporada da Capital do Clã iniciada!**\n"
-                                 f"Período: {start_date} até {end_date}")
-            
-            # Se a temporada anterior terminou, mostrar resumo
-            if "id" in prev_season:
-                total_raid_medals = prev_season.get("totalAttacks", 0)
-                offensive_reward = prev_season.get("offensiveReward", 0)
-                defensive_reward = prev_season.get("defensiveReward", 0)
-                
-                await log_channel.send(f"🏆 **Resumo da temporada anterior:**\n"
-                                     f"Total de ataques: {total_raid_medals}\n"
-                                     f"Recompensas ofensivas: {offensive_reward} medalhas\n"
-                                     f"Recompensas defensivas: {defensive_reward} medalhas\n"
-                                     f"Total: {offensive_reward + defensive_reward} medalhas")
-        
-        # Verificar contribuições de ouro da capital
-        if "members" in latest_season and "members" in prev_season:
-            new_contributions = {}
-            for member in latest_season.get("members", []):
-                if "tag" in member and "name" in member and "capitalResourcesLooted" in member:
-                    new_contributions[member["tag"]] = {
-                        "name": member["name"],
-                        "gold": member["capitalResourcesLooted"]
-                    }
-            
-            old_contributions = {}
-            for member in prev_season.get("members", []):
-                if "tag" in member and "capitalResourcesLooted" in member:
-                    old_contributions[member["tag"]] = member["capitalResourcesLooted"]
-            
-            # Verificar aumento nas contribuições
-            contributions_log = ""
-            for tag, data in new_contributions.items():
-                old_gold = old_contributions.get(tag, 0)
-                new_gold = data["gold"]
-                
-                if new_gold > old_gold:
-                    contributions_log += f"{data['name']}: +{new_gold - old_gold} ouro\n"
-            
-            if contributions_log:
-                await log_channel.send(f"💰 **Novas contribuições para a Capital do Clã:**\n```\n{contributions_log}```")
-        
-        # Verificar novos ataques em raids da capital
-        if "attackLog" in latest_season and "attackLog" in prev_season:
-            old_attacks = set()
-            for attack in prev_season.get("attackLog", []):
-                if "attacker" in attack and "defender" in attack:
-                    attack_id = f"{attack['attacker'].get('tag', '')}-{attack['defender'].get('tag', '')}-{attack.get('destructionPercentage', 0)}"
-                    old_attacks.add(attack_id)
-            
-            new_attacks = []
-            for attack in latest_season.get("attackLog", []):
-                if "attacker" in attack and "defender" in attack:
-                    attack_id = f"{attack['attacker'].get('tag', '')}-{attack['defender'].get('tag', '')}-{attack.get('destructionPercentage', 0)}"
-                    if attack_id not in old_attacks:
-                        new_attacks.append(attack)
+        await run_for_clans(due, poll_capital, clan_poll_semaphore,
+                            loop_interval(check_clan_capital_status) * CLAN_POLL_SPREAD)
+    finally:
+        record_loop_run("check_clan_capital_status", started, loop_interval(check_clan_capital_status))
+
+# Verifica a Capital de um clã e agenda a próxima verificação. Se a consulta
+# falhar, tenta de novo em CAPITAL_POLL_RETRY.
+async def poll_capital(state):
+    season = None
+    try:
+        season = await check_capital(state)
+    finally:
+        if season is None:
+            delay = CAPITAL_POLL_RETRY
+        else:
+            delay = capital_poll_delay(season, datetime.datetime.now(datetime.timezone.utc))
+        state.next_capital_poll = time.time() + delay
+
+# Verifica contribuições e ataques na Capital de um clã. Retorna a temporada
+# obtida (None se a consulta falhou).
+async def check_capital(state):
+    # Dados mais recentes da temporada atual da Capital
+    latest_season = await get_capital_snapshot(state.tag, max_age=0)
+    if not latest_season:
+        return
+    
+    # Verificar se temos dados armazenados para comparação
+    if state.capital is None:
+        state.capital = latest_season
+        await asyncio.to_thread(snapshot_db.save_capital, state.tag, latest_season)
+        return latest_season
+    
+    # Comparar com os dados anteriores para verificar mudanças
+    prev_season = state.capital
+    
+    # Verificar se é uma nova temporada
+    if prev_season.key != latest_season.key:
+        await event_pipeline.emit(CapitalSeasonStarted(state.tag, latest_season.start_time, latest_season.end_time))
+        
+        # Se a temporada anterior terminou, mostrar resumo
+        if prev_season.key:
+            await event_pipeline.emit(CapitalSeasonSummary(state.tag, prev_season.total_attacks,
+                                                           prev_season.offensive_reward, prev_season.defensive_reward))
+    
+    # Verificar contribuições de ouro da capital
+    if latest_season.members is not None and prev_season.members is not None:
+        contributions = []
+        for tag, member in latest_season.members.items():
+            old_member = prev_season.members.get(tag)
+            old_gold = old_member.looted if old_member else 0
             
-            for attack in new_attacks:
-                attacker_name = attack.get("attacker", {}).get("name", "Membro desconhecido")
-                district_name = attack.get("defender", {}).get("name", "Distrito desconhecido")
-                destruction = attack.get("destructionPercentage", 0)
-                await log_channel.send(f"⚔️ **Ataque na Capital do Clã!** {attacker_name} atacou {district_name} e conseguiu {destruction}% de destruição!")
+            if member.looted > old_gold:
+                contributions.append((member.name, member.looted - old_gold))
         
-        # Atualizar dados para a próxima verificação
-        previous_data["capital"] = latest_season
-        
-    except Exception as e:
-        print(f"Erro em check_clan_capital_status: {e}")
+        if contributions:
+            await event_pipeline.emit(CapitalContributions(state.tag, contributions))
+    
+    # Verificar novos ataques em raids da capital
+    if latest_season.attack_log is not None and prev_season.attack_log is not None:
+        old_attacks = {attack.key for attack in prev_season.attack_log}
+        
+        for attack in latest_season.attack_log:
+            if attack.key not in old_attacks:
+                await event_pipeline.emit(CapitalRaidAttack(state.tag, attack.attacker_name, attack.defender_name,
+                                                            attack.destruction))
+    
+    # Atualizar dados para a próxima verificação
+    state.capital = latest_season
+    await asyncio.to_thread(snapshot_db.save_capital, state.tag, latest_season)
+    return latest_season
+
+# Task que envia os relatórios agendados que chegaram no horário (veja jobs.py)
+@tasks.loop(minutes=1)
+async def run_scheduled_reports():
+    started = time.monotonic()
+    try:
+        await job_scheduler.run_due(datetime.datetime.now())
+    finally:
+        record_loop_run("run_scheduled_reports", started, loop_interval(run_scheduled_reports))
+
+# Relatórios agendados, montados a partir dos últimos dados obtidos pelo
+# monitoramento (sem novas consultas à API). Retornam None enquanto ainda não
+# há dados, para tentar de novo no próximo minuto.
+async def trophy_report(state, last_data):
+    clan = snapshots.peek(("clan", state.tag))
+    if not clan or clan.members is None:
+        return None
+    ranking = sorted(clan.members.values(), key=lambda x: x.trophies, reverse=True)
+    await event_pipeline.emit(TrophyReport(state.tag, [(m.name, m.trophies, m.league) for m in ranking]))
+    return {}
+
+async def donation_report(state, last_data):
+    clan = snapshots.peek(("clan", state.tag))
+    if not clan or clan.members is None:
+        return None
+    ranking = sorted(clan.members.values(), key=lambda x: x.donations or 0, reverse=True)
+    await event_pipeline.emit(DonationReport(state.tag, [(m.name, m.donations or 0, m.donations_received or 0)
+                                                         for m in ranking]))
+    return {}
+
+async def war_summary_report(state, last_data):
+    clan = snapshots.peek(("clan", state.tag))
+    if not clan:
+        return None
+    record = (clan.war_wins, clan.war_ties, clan.war_losses)
+    previous = tuple(last_data["record"]) if last_data and "record" in last_data else None
+    war = snapshots.peek(("war", state.tag))
+    await event_pipeline.emit(WarSummaryReport(state.tag, record, previous, clan.war_win_streak,
+                                               war.state if war else None, war.opponent.name if war else None))
+    return {"record": list(record)}
+
+# Grava o histórico de guerras página a página, parando na primeira guerra que
+# já estava no banco. Retorna quantas guerras novas foram gravadas.
+async def sync_war_log(clan_tag):
+    last_end = await asyncio.to_thread(snapshot_db.last_war_log_end, clan_tag)
+    saved = 0
+    async for page in war_log_pages(clan_tag):
+        new = [item for item in page if item.get('endTime') and (last_end is None or item['endTime'] > last_end)]
+        if new:
+            await asyncio.to_thread(snapshot_db.save_war_log, clan_tag, new)
+            saved += len(new)
+        if len(new) < len(page):
+            break
+    return saved
+
+# Grava as temporadas terminadas da Capital página a página, parando na
+# primeira que já estava no banco. Retorna quantas temporadas foram gravadas.
+async def sync_capital_seasons(clan_tag):
+    last_start = await asyncio.to_thread(snapshot_db.last_capital_season, clan_tag)
+    saved = 0
+    async for page in capital_season_pages(clan_tag):
+        ended = [item for item in page if item.get('state') == 'ended' and item.get('startTime')]
+        new = [item for item in ended if last_start is None or item['startTime'] > last_start]
+        if new:
+            await asyncio.to_thread(snapshot_db.save_capital_history, clan_tag, new)
+            saved += len(new)
+        if len(new) < len(ended):
+            break
+    return saved
+
+async def history_sync(state, last_data):
+    wars = await sync_war_log(state.tag)
+    seasons = await sync_capital_seasons(state.tag)
+    return {"wars": wars, "seasons": seasons}
+
+def save_job_run(name, period, data):
+    return asyncio.to_thread(snapshot_db.save_job_run, name, period, data)
+
+job_scheduler = JobScheduler(save_job_run, REPORT_CATCHUP)
+for report_name, spec, report in (("trophies", TROPHY_REPORT_SCHEDULE, trophy_report),
+                                  ("donations", DONATION_REPORT_SCHEDULE, donation_report),
+                                  ("wars", WAR_REPORT_SCHEDULE, war_summary_report),
+                                  ("history", HISTORY_SYNC_SCHEDULE, history_sync)):
+    if not spec:
+        continue
+    schedule = CronSchedule(spec)
+    for state in clan_registry:
+        job_scheduler.add(Job(f"{report_name}:{state.tag}", schedule, functools.partial(report, state)))
 
 @check_clan_status.before_loop
 @check_war_status.before_loop
 @check_clan_capital_status.before_loop
+@run_scheduled_reports.before_loop
 async def before_check():
     await bot.wait_until_ready()
 
 # Comando para mostrar informações do clã
-@bot.command(name='clan')
-async def clan_info(ctx):
+@bot.hybrid_command(name='clan', description="Mostra informações gerais sobre o clã")
+@app_commands.describe(tag="Tag do clã (padrão: o clã deste servidor)")
+async def clan_info(ctx, tag: str = None):
     try:
-        clan_data = await get_clan_data()
-        if not clan_data:
+        await ctx.defer()
+        clan_tag = resolve_clan_tag(ctx, tag)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
+            return
+        
+        clan = await get_clan_snapshot(clan_tag)
+        if not clan:
             await ctx.send("Não foi possível obter informações do clã.")
             return
         
         embed = discord.Embed(
-            title=f"{clan_data.get('name', 'Clã')} ({clan_data.get('tag', 'N/A')})", 
-            description=clan_data.get('description', 'Sem descrição'), 
+            title=f"{clan.name or 'Clã'} ({clan.tag or 'N/A'})", 
+            description=clan.description or 'Sem descrição', 
             color=0x00ff00
         )
         
-        embed.add_field(name="Nível do Clã", value=clan_data.get('clanLevel', 'N/A'), inline=True)
-        embed.add_field(name="Troféus", value=clan_data.get('clanPoints', 'N/A'), inline=True)
+        embed.add_field(name="Nível do Clã", value=clan.level or 'N/A', inline=True)
+        embed.add_field(name="Troféus", value=clan.points if clan.points is not None else 'N/A', inline=True)
         
-        # Verificar se alguma dessas chaves existe para troféus de guerra
-        if 'clanVersusPoints' in clan_data:
-            embed.add_field(name="Troféus de Guerra", value=clan_data['clanVersusPoints'], inline=True)
-        elif 'warPoints' in clan_data:
-            embed.add_field(name="Troféus de Guerra", value=clan_data['warPoints'], inline=True)
-        elif 'clanBuilderBasePoints' in clan_data:
-            embed.add_field(name="Troféus Base Construtor", value=clan_data['clanBuilderBasePoints'], inline=True)
+        # Troféus de guerra ou da Base do Construtor, se a API enviou algum deles
+        if clan.secondary_points:
+            label, points = clan.secondary_points
+            embed.add_field(name=label, value=points, inline=True)
         
-        embed.add_field(name="Membros", value=f"{clan_data.get('members', 0)}/50", inline=True)
-        embed.add_field(name="Tipo", value=clan_data.get('type', 'N/A'), inline=True)
-        embed.add_field(name="Frequência de Guerra", value=clan_data.get('warFrequency', 'Desconhecido'), inline=True)
-        embed.add_field(name="Streak de Vitórias", value=clan_data.get('warWinStreak', 0), inline=True)
-        embed.add_field(name="Vitórias em Guerra", value=clan_data.get('warWins', 0), inline=True)
-        embed.add_field(name="Empates em Guerra", value=clan_data.get('warTies', 0), inline=True)
-        embed.add_field(name="Derrotas em Guerra", value=clan_data.get('warLosses', 0), inline=True)
+        embed.add_field(name="Membros", value=f"{clan.member_count}/50", inline=True)
+        embed.add_field(name="Tipo", value=clan.type or 'N/A', inline=True)
+        embed.add_field(name="Frequência de Guerra", value=clan.war_frequency or 'Desconhecido', inline=True)
+        embed.add_field(name="Streak de Vitórias", value=clan.war_win_streak, inline=True)
+        embed.add_field(name="Vitórias em Guerra", value=clan.war_wins, inline=True)
+        embed.add_field(name="Empates em Guerra", value=clan.war_ties, inline=True)
+        embed.add_field(name="Derrotas em Guerra", value=clan.war_losses, inline=True)
         
-        if clan_data.get('location'):
-            embed.add_field(name="Localização", value=clan_data['location'].get('name', 'Desconhecida'), inline=True)
+        if clan.location:
+            embed.add_field(name="Localização", value=clan.location, inline=True)
         
-        if clan_data.get('badgeUrls', {}).get('medium'):
-            embed.set_thumbnail(url=clan_data['badgeUrls']['medium'])
+        if clan.badge_url:
+            embed.set_thumbnail(url=clan.badge_url)
         
         await ctx.send(embed=embed)
     except Exception as e:
         await ctx.send(f"Erro ao processar informações do clã: {e}")
 
 # Comando para mostrar o status da guerra atual
-@bot.command(name='war')
-async def war_status(ctx):
+@bot.hybrid_command(name='war', description="Mostra o status da guerra atual")
+@app_commands.describe(tag="Tag do clã (padrão: o clã deste servidor)")
+async def war_status(ctx, tag: str = None):
     try:
-        war_data = await get_current_war()
-        if not war_data:
+        await ctx.defer()
+        clan_tag = resolve_clan_tag(ctx, tag)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
+            return
+        
+        war = await get_war_snapshot(clan_tag)
+        if not war:
             await ctx.send("Não foi possível obter informações da guerra.")
             return
         
-        if war_data.get('state') == 'notInWar':
+        # Fora de guerra comum, mostrar a rodada atual da Liga de Clãs
+        league_round = None
+        if war.state == 'notInWar':
+            league = await get_league_snapshot(clan_tag)
+            if league and league.state != 'notInWar':
+                league_round, league_war = league.current_war(clan_tag)
+                war = league_war or war
+        
+        if war.state == 'notInWar':
             await ctx.send("O clã não está em guerra no momento.")
             return
         
-        clan_data = war_data.get('clan', {})
-        opponent_data = war_data.get('opponent', {})
-        
-        clan_name = clan_data.get('name', 'Nosso Clã')
-        opponent_name = opponent_data.get('name', 'Oponente')
-        clan_stars = clan_data.get('stars', 0)
-        opponent_stars = opponent_data.get('stars', 0)
-        clan_attacks = clan_data.get('attacks', 0)
-        clan_destruction = clan_data.get('destructionPercentage', 0)
-        opponent_destruction = opponent_data.get('destructionPercentage', 0)
+        clan_name = war.clan.name or 'Nosso Clã'
+        opponent_name = war.opponent.name or 'Oponente'
         
-        embed = discord.Embed(title=f"Guerra: {clan_name} vs {opponent_name}", color=0xff0000)
+        title = f"Guerra: {clan_name} vs {opponent_name}"
+        if league_round:
+            title = f"Liga de Clãs, rodada {league_round}: {clan_name} vs {opponent_name}"
+        embed = discord.Embed(title=title, color=0xff0000)
         
-        war_state = war_data.get('state', 'unknown')
-        if war_state == 'preparation':
+        if war.state == 'preparation':
             embed.description = "⏳ Fase de preparação"
-            embed.add_field(name="Início dos Ataques", value=war_data.get('startTime', 'Desconhecido'), inline=False)
-        elif war_state == 'inWar':
+            embed.add_field(name="Início dos Ataques", value=war.start_time or 'Desconhecido', inline=False)
+        elif war.state == 'inWar':
             embed.description = "⚔️ Guerra em andamento"
-            embed.add_field(name="Término", value=war_data.get('endTime', 'Desconhecido'), inline=False)
+            embed.add_field(name="Término", value=war.end_time or 'Desconhecido', inline=False)
         else:  # warEnded
             embed.description = "🏁 Guerra finalizada"
         
-        embed.add_field(name=clan_name, value=f"{clan_stars}⭐ ({clan_destruction:.2f}%)", inline=True)
-        embed.add_field(name=opponent_name, value=f"{opponent_stars}⭐ ({opponent_destruction:.2f}%)", inline=True)
+        embed.add_field(name=clan_name, value=f"{war.clan.stars}⭐ ({war.clan.destruction:.2f}%)", inline=True)
+        embed.add_field(name=opponent_name, value=f"{war.opponent.stars}⭐ ({war.opponent.destruction:.2f}%)", inline=True)
         
         # Detalhes dos ataques do nosso clã
         attacks_info = "```\n"
         attacks_info += f"{'Nome':<15} | {'Alvo':<15} | {'Estrelas':<8} | {'Destruição':<10}\n"
         attacks_info += "-" * 55 + "\n"
         
-        has_attacks = False
-        for member in clan_data.get('members', []):
-            for attack in member.get('attacks', []):
-                has_attacks = True
-                # Encontrar nome do defensor
-                defender_name = "Oponente"
-                for opponent in opponent_data.get('members', []):
-                    if opponent.get('tag') == attack.get('defenderTag'):
-                        defender_name = opponent.get('name', 'Oponente')
-                        break
-                
-                stars = "⭐" * attack.get('stars', 0)
-                destruction = attack.get('destructionPercentage', 0)
-                attacks_info += f"{member.get('name', 'Membro')[:15]:<15} | {defender_name[:15]:<15} | {stars:<8} | {destruction}%\n"
+        our_attacks = war.side_attacks('clan')
+        for attack in our_attacks:
+            attacker_name = war.attacker_name(attack, 'Membro')
+            defender_name = war.defender_name(attack, 'Oponente')
+            stars = "⭐" * attack.stars
+            attacks_info += f"{attacker_name[:15]:<15} | {defender_name[:15]:<15} | {stars:<8} | {attack.destruction}%\n"
         
         attacks_info += "```"
         
         # Se não houver ataques ainda
-        if not has_attacks:
+        if not our_attacks:
             attacks_info = "Nenhum ataque realizado ainda."
         
         embed.add_field(name="Ataques do nosso clã", value=attacks_info, inline=False)
         
         # Membros que ainda não atacaram
         not_attacked = []
-        attacks_limit = 2  # Assumindo guerra normal de 2 ataques por pessoa
+        attacks_limit = war.attacks_per_member
         
-        for member in clan_data.get('members', []):
-            attacks_used = len(member.get('attacks', []))
+        for member in war.clan.members.values():
+            attacks_used = len(member.attacks)
             if attacks_used < attacks_limit:
                 not_attacked.append((
-                    member.get('name', 'Membro desconhecido'),
-                    member.get('mapPosition', 0),
+                    member.name or 'Membro desconhecido',
+                    member.map_position,
                     attacks_limit - attacks_used
                 ))
         
@@ -568,168 +1100,490 @@ async def war_status(ctx):
     except Exception as e:
         await ctx.send(f"Erro ao processar informações da guerra: {e}")
 
-# Comando para mostrar os top doadores
-@bot.command(name='doadores')
-async def top_donators(ctx):
+# Comando para mostrar a classificação do grupo da Liga de Clãs e as guerras do
+# clã em cada rodada
+@bot.command(name='cwl')
+async def league_status(ctx, tag=None):
     try:
-        clan_data = await get_clan_data()
-        if not clan_data:
-            await ctx.send("Não foi possível obter informações do clã.")
+        clan_tag = resolve_clan_tag(ctx, tag)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
             return
         
-        if 'memberList' not in clan_data:
-            await ctx.send("Dados de membros não encontrados na resposta da API.")
+        league = await get_league_snapshot(clan_tag)
+        if not league:
+            await ctx.send("Não foi possível obter informações da Liga de Clãs.")
             return
-            
-        members = clan_data['memberList']
         
-        # Verificar se todos os membros têm a chave 'donations'
-        for member in members:
-            if 'donations' not in member:
-                member['donations'] = 0
-            if 'donationsReceived' not in member:
-                member['donationsReceived'] = 0
-        
-        # Ordenar por doações
-        donators = sorted(members, key=lambda x: x.get('donations', 0), reverse=True)
+        if league.state == 'notInWar':
+            await ctx.send("O clã não está participando da Liga de Clãs.")
+            return
         
-        embed = discord.Embed(title=f"Top Doadores de {clan_data.get('name', 'Clã')}", color=0x00ff00)
+        embed = discord.Embed(title=f"Liga de Clãs {league.season or ''}".strip(), color=0xff0000)
+        
+        standings_text = "```\n"
+        standings_text += f"{'#':<2} | {'Clã':<15} | {'Estrelas':>8} | {'Destruição':>10} | {'V':>2}\n"
+        standings_text += "-" * 48 + "\n"
+        for position, (tag, name, stars, destruction, wins) in enumerate(league.standings(), 1):
+            marker = "»" if tag == clan_tag else " "
+            standings_text += f"{position:<2} |{marker}{(name or tag)[:14]:<14} | {stars:>8} | {destruction:>9.0f}% | {wins:>2}\n"
+        standings_text += "```"
+        embed.add_field(name="Classificação", value=standings_text, inline=False)
+        
+        clan_wars = league.clan_wars(clan_tag)
+        rounds_text = "```\n"
+        status = {'preparation': 'Preparação', 'inWar': 'Em guerra', 'warEnded': 'Terminada'}
+        for league_round, war in clan_wars:
+            opponent_name = (war.opponent.name or 'Oponente')[:15]
+            rounds_text += (f"{league_round:<2} | {opponent_name:<15} | {war.clan.stars:>2}⭐ x {war.opponent.stars}⭐ | "
+                            f"{status.get(war.state, war.state)}\n")
+        rounds_text += "```"
+        if clan_wars:
+            embed.add_field(name="Rodadas", value=rounds_text, inline=False)
         
-        donators_text = "```\n"
-        donators_text += f"{'Posição':<8} | {'Nome':<15} | {'Doações':<8} | {'Recebidas':<9} | {'Razão':<5}\n"
-        donators_text += "-" * 55 + "\n"
+        await ctx.send(embed=embed)
+    except Exception as e:
+        await ctx.send(f"Erro ao processar informações da Liga de Clãs: {e}")
+
+# Comando para mostrar os top doadores
+@bot.hybrid_command(name='doadores', description="Mostra o ranking de doadores do clã")
+@app_commands.describe(tag="Tag do clã (padrão: o clã deste servidor)")
+async def top_donators(ctx, tag: str = None):
+    try:
+        await ctx.defer()
+        clan_tag = resolve_clan_tag(ctx, tag)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
+            return
         
-        for i, member in enumerate(donators[:10], 1):
-            donations = member.get('donations', 0)
-            received = member.get('donationsReceived', 0)
-            ratio = donations / max(1, received)  # Evitar divisão por zero
-            donators_text += f"{i:<8} | {member.get('name', 'Membro')[:15]:<15} | {donations:<8} | {received:<9} | {ratio:.1f}\n"
+        clan = await get_clan_snapshot(clan_tag)
+        if not clan:
+            await ctx.send("Não foi possível obter informações do clã.")
+            return
         
-        donators_text += "```"
-        embed.add_field(name="Top 10 Doadores", value=donators_text, inline=False)
+        if clan.members is None:
+            await ctx.send("Dados de membros não encontrados na resposta da API.")
+            return
         
-        await ctx.send(embed=embed)
+        pages = ranking_pages.get(("doadores", clan_tag), clan)
+        if pages is None:
+            # Ordenar por doações
+            donators = sorted(clan.members.values(), key=lambda x: x.donations or 0, reverse=True)
+            rows = []
+            for i, member in enumerate(donators, 1):
+                donations = member.donations or 0
+                received = member.donations_received or 0
+                ratio = donations / max(1, received)  # Evitar divisão por zero
+                rows.append((i, member.name, donations, received, f"{ratio:.1f}"))
+            tables = render_table(DONATION_COLUMNS, rows, RANKING_PAGE_SIZE)
+            pages = ranking_pages.set(("doadores", clan_tag), clan,
+                                      page_embeds(f"Top Doadores de {clan.name or 'Clã'}", tables))
+        
+        await send_pages(ctx, pages)
     except Exception as e:
         await ctx.send(f"Erro ao processar informações de doadores: {e}")
 
 # Comando para mostrar ranking de troféus
-@bot.command(name='trofeus')
-async def trophies_ranking(ctx):
+@bot.hybrid_command(name='trofeus', description="Mostra o ranking de troféus do clã")
+@app_commands.describe(tag="Tag do clã (padrão: o clã deste servidor)")
+async def trophies_ranking(ctx, tag: str = None):
     try:
-        clan_data = await get_clan_data()
-        if not clan_data:
+        await ctx.defer()
+        clan_tag = resolve_clan_tag(ctx, tag)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
+            return
+        
+        clan = await get_clan_snapshot(clan_tag)
+        if not clan:
             await ctx.send("Não foi possível obter informações do clã.")
             return
         
-        if 'memberList' not in clan_data:
+        if clan.members is None:
             await ctx.send("Dados de membros não encontrados na resposta da API.")
             return
-            
-        members = clan_data['memberList']
-        
-        # Verificar se todos os membros têm a chave 'trophies'
-        for member in members:
-            if 'trophies' not in member:
-                member['trophies'] = 0
-        
-        # Ordenar por troféus
-        trophy_leaders = sorted(members, key=lambda x: x.get('trophies', 0), reverse=True)
-        
-        embed = discord.Embed(title=f"Ranking de Troféus de {clan_data.get('name', 'Clã')}", color=0x00ff00)
-        
-        trophies_text = "```\n"
-        trophies_text += f"{'Posição':<8} | {'Nome':<15} | {'Troféus':<7} | {'TH':<3} | {'Liga':<20}\n"
-        trophies_text += "-" * 60 + "\n"
-        
-        for i, member in enumerate(trophy_leaders, 1):
-            # Obter informações detalhadas do jogador (TH)
-            th_level = "?"
-            if 'tag' in member:
-                player_data = await get_player_data(member['tag'])
-                if player_data and 'townHallLevel' in player_data:
-                    th_level = player_data['townHallLevel']
-            
-            trophies = member.get('trophies', 0)
-            league_name = member.get('league', {}).get('name', 'Sem Liga')
-            trophies_text += f"{i:<8} | {member.get('name', 'Membro')[:15]:<15} | {trophies:<7} | {th_level:<3} | {league_name[:20]:<20}\n"
-            
-            # Limitar a 15 jogadores para não exceder o limite de caracteres do Discord
-            if i >= 15:
-                break
-        
-        trophies_text += "```"
-        embed.add_field(name="Ranking de Troféus", value=trophies_text, inline=False)
         
-        await ctx.send(embed=embed)
+        # O CV vem dos perfis atualizados em segundo plano: as páginas são
+        # renderizadas de novo também quando o CV de algum membro deste clã muda
+        townhalls = {}
+        for member_tag in clan.members:
+            profile = member_cache.get(member_tag)
+            townhalls[member_tag] = profile.townhall_level if profile and profile.townhall_level else "?"
+        version = (clan, tuple(townhalls.values()))
+        pages = ranking_pages.get(("trofeus", clan_tag), version)
+        if pages is None:
+            # Ordenar por troféus
+            trophy_leaders = sorted(clan.members.values(), key=lambda x: x.trophies, reverse=True)
+            rows = [(i, member.name, member.trophies, townhalls[member.tag], member.league or 'Sem Liga')
+                    for i, member in enumerate(trophy_leaders, 1)]
+            tables = render_table(TROPHY_COLUMNS, rows, RANKING_PAGE_SIZE)
+            pages = ranking_pages.set(("trofeus", clan_tag), version,
+                                      page_embeds(f"Ranking de Troféus de {clan.name or 'Clã'}", tables))
+        
+        await send_pages(ctx, pages)
     except Exception as e:
         await ctx.send(f"Erro ao processar informações de troféus: {e}")
 
-# Comando para mostrar informações da Capital do Clã
-@bot.command(name='capital')
-async def clan_capital_info(ctx):
-    try:
-        capital_data = await get_clan_capital_info()
-        if not capital_data or "items" not in capital_data or len(capital_data["items"]) == 0:
-            await ctx.send("Não foi possível obter informações da Capital do Clã.")
-            return
-        
-        # Obter dados da temporada atual
-        latest_season = capital_data["items"][0]
-        
+# Embeds do comando capital: os dados gerais da temporada e das temporadas
+# anteriores em todas as páginas, com uma página da tabela de contribuidores de
+# ouro na descrição de cada uma (os campos têm limite de 1024 caracteres)
+def capital_pages(latest_season, seasons):
+    def season_embed(contributors=None):
+        description = f"Temporada: {latest_season.id or 'N/A'}"
+        # Contribuidores de ouro (uma página da tabela)
+        if contributors:
+            description += f"\n**Contribuidores de Ouro**\n{contributors}"
         embed = discord.Embed(
             title="Informações da Capital do Clã", 
-            description=f"Temporada: {latest_season.get('id', 'N/A')}", 
+            description=description, 
             color=0x00ff00
         )
-        
+    
         # Informações gerais
-        start_date = latest_season.get("startTime", "desconhecido")
-        end_date = latest_season.get("endTime", "desconhecido")
+        start_date = latest_season.start_time or "desconhecido"
+        end_date = latest_season.end_time or "desconhecido"
         embed.add_field(name="Período", value=f"{start_date} até {end_date}", inline=False)
-        
+    
         # Recompensas
-        offensive_reward = latest_season.get("offensiveReward", 0)
-        defensive_reward = latest_season.get("defensiveReward", 0)
+        offensive_reward = latest_season.offensive_reward
+        defensive_reward = latest_season.defensive_reward
         total_rewards = offensive_reward + defensive_reward
-        
+    
         embed.add_field(name="Recompensas", value=f"Ofensivas: {offensive_reward}\nDefensivas: {defensive_reward}\nTotal: {total_rewards}", inline=True)
-        
+    
         # Total de distritos atacados
-        total_districts = latest_season.get("districtsDestroyed", 0)
-        total_attacks = latest_season.get("totalAttacks", 0)
-        embed.add_field(name="Atividade do Clã", value=f"Distritos destruídos: {total_districts}\nTotal de ataques: {total_attacks}", inline=True)
-        
-        # Top contribuidores de ouro
-        if "members" in latest_season:
-            members = latest_season.get("members", [])
-            sorted_members = sorted(members, key=lambda x: x.get("capitalResourcesLooted", 0), reverse=True)
-            
-            contributors = "```\n"
-            contributors += f"{'Nome':<15} | {'Ouro':<10}\n"
-            contributors += "-" * 30 + "\n"
+        embed.add_field(name="Atividade do Clã", value=f"Distritos destruídos: {latest_season.districts_destroyed}\nTotal de ataques: {latest_season.total_attacks}", inline=True)
+    
+        # Temporadas anteriores
+        if seasons:
+            seasons_text = "```\n"
+            seasons_text += f"{'Início':<10} | {'Saque':>9} | {'Ataques':>7} | {'Distritos':>9}\n"
+            seasons_text += "-" * 45 + "\n"
+            for start_time, loot, attacks, districts, _, _ in seasons:
+                start_date = f"{start_time[6:8]}/{start_time[4:6]}/{start_time[:4]}"
+                seasons_text += f"{start_date:<10} | {loot or 0:>9} | {attacks or 0:>7} | {districts or 0:>9}\n"
+            seasons_text += "```"
+            embed.add_field(name="Temporadas Anteriores", value=seasons_text, inline=False)
+        return embed
+    
+    if latest_season.members is None:
+        return [season_embed()]
+    sorted_members = sorted(latest_season.members.values(), key=lambda x: x.looted, reverse=True)
+    rows = [(i, member.name, member.looted) for i, member in enumerate(sorted_members, 1)]
+    tables = render_table(CAPITAL_COLUMNS, rows, RANKING_PAGE_SIZE)
+    pages = []
+    for number, table in enumerate(tables, 1):
+        embed = season_embed(table)
+        if len(tables) > 1:
+            embed.set_footer(text=f"Página {number}/{len(tables)}")
+        pages.append(embed)
+    return pages
+
+# Comando para mostrar informações da Capital do Clã
+@bot.hybrid_command(name='capital', description="Mostra informações da Capital do Clã")
+@app_commands.describe(tag="Tag do clã (padrão: o clã deste servidor)")
+async def clan_capital_info(ctx, tag: str = None):
+    try:
+        await ctx.defer()
+        clan_tag = resolve_clan_tag(ctx, tag)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
+            return
+        
+        # Obter dados da temporada atual
+        latest_season = await get_capital_snapshot(clan_tag)
+        if not latest_season:
+            await ctx.send("Não foi possível obter informações da Capital do Clã.")
+            return
+        
+        # Temporadas anteriores, do histórico sincronizado
+        seasons = await asyncio.to_thread(snapshot_db.load_capital_history, clan_tag, 5)
+        version = (latest_season, seasons)
+        pages = ranking_pages.get(("capital", clan_tag), version)
+        if pages is None:
+            pages = ranking_pages.set(("capital", clan_tag), version, capital_pages(latest_season, seasons))
+        
+        await send_pages(ctx, pages)
+    except Exception as e:
+        await ctx.send(f"Erro ao processar informações da Capital do Clã: {e}")
+
+# Comando para mostrar o perfil de um membro, lido do cache de perfis
+@bot.hybrid_command(name='jogador', description="Mostra o perfil de um membro")
+@app_commands.describe(query="Nome ou tag do membro")
+@app_commands.rename(query="membro")
+async def player_profile(ctx, *, query: str = None):
+    try:
+        if not query:
+            await ctx.send("Informe o nome ou a tag do jogador. Ex.: `!coc jogador Fulano`")
+            return
+        clan_tag = resolve_clan_tag(ctx)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
+            return
+        
+        matches = find_members(clan_tag, query.strip())
+        if len(matches) != 1:
+            # Procurar também nos outros clãs monitorados
+            matches = [match for state in clan_registry if state.tag != clan_tag
+                       for match in find_members(state.tag, query.strip())] or matches
+        if len(matches) != 1:
+            await ctx.send(member_lookup_error(query, matches))
+            return
+        member_tag, member_name = matches[0]
+        
+        profile = member_cache.get(member_tag)
+        if not profile:
+            await ctx.send(f"O perfil de {member_name} ainda não foi carregado. Tente novamente em alguns minutos.")
+            return
+        
+        embed = discord.Embed(title=f"{profile.name} ({profile.tag})", color=0x00ff00)
+        embed.add_field(name="Centro de Vila", value=profile.townhall_level or '?', inline=True)
+        embed.add_field(name="Nível", value=profile.exp_level or '?', inline=True)
+        embed.add_field(name="Liga", value=profile.league or 'Sem Liga', inline=True)
+        embed.add_field(name="Troféus", value=f"{profile.trophies} (recorde {profile.best_trophies})", inline=True)
+        embed.add_field(name="Estrelas de Guerra", value=profile.war_stars, inline=True)
+        embed.add_field(name="Vitórias", value=f"Ataques: {profile.attack_wins}\nDefesas: {profile.defense_wins}", inline=True)
+        embed.add_field(name="Doações", value=f"Doadas: {profile.donations}\nRecebidas: {profile.donations_received}", inline=True)
+        embed.add_field(name="Capital do Clã", value=f"{profile.capital_contributions} de ouro contribuído", inline=True)
+        
+        if profile.heroes:
+            heroes_text = "\n".join(f"{name}: {level}/{max_level}" for name, level, max_level in profile.heroes)
+            embed.add_field(name="Heróis", value=heroes_text, inline=False)
+        
+        refreshed_at = member_cache.refreshed_at(member_tag)
+        if refreshed_at:
+            embed.set_footer(text=f"Atualizado há {max(0, int((time.time() - refreshed_at) // 60))} min")
+        
+        await ctx.send(embed=embed)
+    except Exception as e:
+        await ctx.send(f"Erro ao processar o perfil do jogador: {e}")
+
+# Autocompletar do comando de barra jogador: membros dos clãs do servidor cujo
+# nome começa com o texto digitado, lidos do índice em memória
+@player_profile.autocomplete('query')
+async def member_autocomplete(interaction, current):
+    clan_tags = None
+    if interaction.guild:
+        clan_tags = {state.tag for state in clan_registry.for_guild(interaction.guild.id)} or None
+    return [app_commands.Choice(name=f"{name} ({tag})"[:100], value=tag)
+            for tag, name, _ in member_index.search(current, clan_tags)]
+
+# Comando para mostrar a evolução do clã ou de um membro nos últimos dias. Até
+# 2 dias a tabela é por hora; acima disso, por dia.
+@bot.command(name='historico')
+async def history_command(ctx, *args):
+    try:
+        args = list(args)
+        days = 7
+        if args and args[-1].isdigit():
+            days = max(1, min(int(args.pop()), 60))
+        query = " ".join(args).strip()
+        
+        # Uma tag de clã monitorado mostra o histórico do clã
+        clan_tag = None
+        if query.startswith('#') and clan_registry.get(normalize_tag(query)):
+            clan_tag = normalize_tag(query)
+            query = ""
+        clan_tag = clan_tag or resolve_clan_tag(ctx)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
+            return
+        
+        resolution = "hourly" if days <= 2 else "daily"
+        label_format = "%d/%m %Hh" if resolution == "hourly" else "%d/%m"
+        since = time.time() - days * 86400
+        period = "último dia" if days == 1 else f"últimos {days} dias"
+        
+        if not query:
+            rows = await asyncio.to_thread(history_store.clan_series, clan_tag, since, resolution)
+            if not rows:
+                await ctx.send("Ainda não há histórico para este clã.")
+                return
+            title = f"📈 **Histórico do clã {clan_tag}** ({period})"
+            history_text = "```\n"
+            history_text += f"{'Data':<9} | {'Pontos':>7} | {'Membros':>7} | {'Doações':>8} | {'Recebidas':>9}\n"
+            history_text += "-" * 53 + "\n"
+            for bucket, points, members, donations, received in rows:
+                label = datetime.datetime.fromtimestamp(bucket).strftime(label_format)
+                history_text += f"{label:<9} | {points or 0:>7} | {members:>7} | {donations:>8} | {received:>9}\n"
+            history_text += "```"
+        else:
+            matches = find_members(clan_tag, query)
+            if len(matches) != 1:
+                await ctx.send(member_lookup_error(query, matches))
+                return
+            member_tag, member_name = matches[0]
             
-            for i, member in enumerate(sorted_members[:10]):
-                if "name" in member and "capitalResourcesLooted" in member:
-                    contributors += f"{member['name'][:15]:<15} | {member['capitalResourcesLooted']:<10}\n"
+            rows = await asyncio.to_thread(history_store.member_series, clan_tag, member_tag, since, resolution)
+            if not rows:
+                await ctx.send(f"Ainda não há histórico para {member_name}.")
+                return
+            trophy_change = (rows[-1][3] or 0) - (rows[0][3] or 0)
+            title = f"📈 **Histórico de {member_name}** ({period}, troféus {trophy_change:+})"
+            history_text = "```\n"
+            history_text += f"{'Data':<9} | {'Troféus':>7} | {'Mín-Máx':>11} | {'Doações':>8} | {'Recebidas':>9}\n"
+            history_text += "-" * 57 + "\n"
+            for bucket, low, high, trophies, donations, received in rows:
+                label = datetime.datetime.fromtimestamp(bucket).strftime(label_format)
+                history_text += f"{label:<9} | {trophies or 0:>7} | {f'{low}-{high}':>11} | {donations or 0:>8} | {received or 0:>9}\n"
+            history_text += "```"
+        
+        for chunk in split_message(f"{title}\n{history_text}"):
+            await ctx.send(chunk)
+    except Exception as e:
+        await ctx.send(f"Erro ao processar o histórico: {e}")
+
+# Comando para mostrar as estatísticas de guerra do clã ou de um membro, a partir
+# das guerras arquivadas e do histórico de guerras gravado pela sincronização
+# agendada (sem consultar a API)
+@bot.command(name='stats')
+async def war_stats(ctx, *, query=None):
+    try:
+        query = (query or "").strip()
+        clan_tag = None
+        if query.startswith('#') and clan_registry.get(normalize_tag(query)):
+            clan_tag = normalize_tag(query)
+            query = ""
+        clan_tag = clan_tag or resolve_clan_tag(ctx)
+        if not clan_tag:
+            await ctx.send("Nenhum clã configurado para este servidor.")
+            return
+        
+        member_tag = None
+        if query:
+            matches = find_members(clan_tag, query)
+            if len(matches) != 1:
+                await ctx.send(member_lookup_error(query, matches))
+                return
+            member_tag, member_name = matches[0]
+        
+        wars = war_analytics.war_count(clan_tag)
+        if member_tag:
+            stats = next((s for s in war_analytics.member_stats(clan_tag) if s.tag == member_tag), None)
+            if not stats:
+                await ctx.send(f"{member_name} não participou de nenhuma das {wars} guerras arquivadas.")
+                return
+            stats_text = (f"📊 **Estatísticas de guerra de {member_name}**\n"
+                          f"Guerras: {stats.wars} | Ataques: {stats.attacks}\n"
+                          f"Média de estrelas: {stats.avg_stars:.2f} | 3 estrelas: {stats.three_star_rate:.0%}\n"
+                          f"Ataques perdidos: {stats.missed_rate:.0%}\n"
+                          f"Defesas: {stats.defenses} | Segurou: {stats.hold_rate:.0%}\n")
+        else:
+            stats_text = f"📊 **Estatísticas de guerra de {clan_tag}** ({wars} guerras arquivadas)\n"
+            summary = war_log_summary(await asyncio.to_thread(snapshot_db.load_war_log, clan_tag))
+            if summary:
+                stats_text += (f"Histórico de guerras: {summary['wars']} guerras, {summary['wins']}V/{summary['ties']}E/"
+                               f"{summary['losses']}D ({summary['win_rate']:.0%} de vitórias), média de "
+                               f"{summary['avg_stars']:.1f} estrelas e {summary['avg_destruction']:.1f}% de destruição\n")
             
-            contributors += "```"
-            embed.add_field(name="Top Contribuidores de Ouro", value=contributors, inline=False)
+            members = sorted(war_analytics.member_stats(clan_tag), key=lambda s: (s.avg_stars, s.three_star_rate), reverse=True)
+            if members:
+                stats_text += "```\n"
+                stats_text += f"{'Nome':<15} | {'G':>3} | {'Média':>5} | {'3★':>4} | {'Perd.':>5} | {'Segurou':>7}\n"
+                stats_text += "-" * 54 + "\n"
+                for s in members:
+                    stats_text += (f"{(s.name or s.tag)[:15]:<15} | {s.wars:>3} | {s.avg_stars:>5.2f} | "
+                                   f"{s.three_star_rate:>4.0%} | {s.missed_rate:>5.0%} | {s.hold_rate:>7.0%}\n")
+                stats_text += "```\n"
+        
+        differences = war_analytics.townhall_difference(clan_tag, member_tag)
+        if differences:
+            stats_text += "**Por diferença de CV (atacante - defensor)**\n```\n"
+            stats_text += f"{'Dif.':>4} | {'Ataques':>7} | {'Média':>5} | {'3★':>4}\n"
+            stats_text += "-" * 30 + "\n"
+            for difference, attacks, avg_stars, three_star_rate in differences:
+                stats_text += f"{difference:>+4} | {attacks:>7} | {avg_stars:>5.2f} | {three_star_rate:>4.0%}\n"
+            stats_text += "```"
+        
+        for chunk in split_message(stats_text.rstrip("\n")):
+            await ctx.send(chunk)
+    except Exception as e:
+        await ctx.send(f"Erro ao processar as estatísticas de guerra: {e}")
+
+# Comando para mostrar a memória usada pelo estado de cada clã monitorado
+@bot.command(name='memoria')
+async def memory_usage(ctx):
+    lines = [f"{state.tag:<12} | {state.memory_usage() / 1024:>8.1f} KB" for state in clan_registry]
+    if not lines:
+        await ctx.send("Nenhum clã está sendo monitorado.")
+        return
+    
+    memory_text = "```\n"
+    memory_text += f"{'Clã':<12} | {'Memória':>11}\n"
+    memory_text += "-" * 26 + "\n"
+    memory_text += "\n".join(lines[:40]) + "\n"
+    memory_text += "```"
+    await ctx.send(f"🧠 **Memória por clã monitorado** ({len(lines)} clãs)\n{memory_text}")
+
+# Formata um intervalo em segundos como "3d 4h" (ou só horas abaixo de um dia)
+def format_idle(seconds):
+    days, hours = divmod(int(seconds // 3600), 24)
+    return f"{days}d {hours}h" if days else f"{hours}h"
+
+# Comando para listar os membros sem atividade há pelo menos N dias, do índice de
+# atividade (sem consultar a API). Sem tag, cobre todos os clãs do servidor.
+@bot.command(name='inativos')
+async def inactive_members(ctx, *args):
+    try:
+        args = list(args)
+        days = INACTIVE_DAYS
+        if args and args[-1].isdigit():
+            days = max(1, min(int(args.pop()), 60))
+        tag = args[0] if args else None
+        
+        if tag:
+            states = [state for state in [clan_registry.get(normalize_tag(tag))] if state]
+        else:
+            states = clan_registry.for_guild(ctx.guild.id) if ctx.guild else []
+            states = states or list(clan_registry)
+        if not states:
+            await ctx.send("Clã não monitorado." if tag else "Nenhum clã configurado para este servidor.")
+            return
         
-        await ctx.send(embed=embed)
+        now = time.time()
+        sections = []
+        for state in states:
+            members = state.members or {}
+            inactive = activity_tracker.inactive(members, days * 86400, now)
+            unknown = sum(1 for member_tag in members if activity_tracker.last_seen(member_tag) is None)
+            section = f"**{state.tag}** ({len(inactive)} de {len(members)} membros)\n"
+            if inactive:
+                section += "```\n"
+                section += f"{'Membro':<16} | {'Sem atividade':>13}\n"
+                section += "-" * 32 + "\n"
+                for member_tag, idle, tracked_since in inactive:
+                    # Sem nenhuma atividade desde o início do acompanhamento: o valor é um mínimo
+                    idle_text = ("≥ " if now - tracked_since <= idle else "") + format_idle(idle)
+                    section += f"{members[member_tag].name[:16]:<16} | {idle_text:>13}\n"
+                section += "```"
+            if unknown:
+                section += ("\n" if inactive else "") + f"{unknown} membro(s) ainda sem dados de atividade."
+            sections.append(section)
+        
+        title = f"💤 **Membros sem atividade há {days} dia{'s' if days > 1 else ''} ou mais**"
+        for chunk in split_message(title + "\n" + "\n".join(sections)):
+            await ctx.send(chunk)
     except Exception as e:
-        await ctx.send(f"Erro ao processar informações da Capital do Clã: {e}")
+        await ctx.send(f"Erro ao processar os membros inativos: {e}")
 
 # Comando de ajuda
-@bot.command(name='ajuda')
+@bot.hybrid_command(name='ajuda', description="Mostra a lista de comandos")
 async def help_command(ctx):
-    embed = discord.Embed(title="Comandos do Bot de Clash of Clans", description="Lista de comandos disponíveis:", color=0x00ff00)
+    embed = discord.Embed(title="Comandos do Bot de Clash of Clans", description="Lista de comandos disponíveis (sem a tag, é usado o clã deste servidor). "
+                          "`clan`, `war`, `doadores`, `trofeus`, `capital`, `jogador` e `ajuda` também existem como comandos de barra (ex.: `/trofeus`):", color=0x00ff00)
     
     commands = [
-        ("!coc clan", "Mostra informações gerais sobre o clã"),
-        ("!coc war", "Mostra o status da guerra atual"),
-        ("!coc doadores", "Mostra o ranking de doadores do clã"),
-        ("!coc trofeus", "Mostra o ranking de troféus do clã"),
-        ("!coc capital", "Mostra informações da Capital do Clã"),  # Adicionada esta linha
+        ("!coc clan [tag]", "Mostra informações gerais sobre o clã"),
+        ("!coc war [tag]", "Mostra o status da guerra atual"),
+        ("!coc cwl [tag]", "Mostra a classificação e as rodadas da Liga de Clãs"),
+        ("!coc doadores [tag]", "Mostra o ranking de doadores de todos os membros, em páginas"),
+        ("!coc trofeus [tag]", "Mostra o ranking de troféus de todos os membros, em páginas"),
+        ("!coc capital [tag]", "Mostra informações da Capital do Clã"),
+        ("!coc jogador <nome|tag>", "Mostra o perfil de um membro (CV, heróis, estrelas de guerra...)"),
+        ("!coc historico [membro|tag] [dias]", "Mostra a evolução de troféus e doações do clã ou de um membro"),
+        ("!coc stats [membro|tag]", "Mostra estatísticas de guerra do clã ou de um membro"),
+        ("!coc inativos [tag] [dias]", "Mostra os membros sem atividade recente (doações, ataques, Capital, conquistas...)"),
+        ("!coc memoria", "Mostra a memória usada por cada clã monitorado"),
         ("!coc ajuda", "Mostra esta mensagem de ajuda")
     ]
     
@@ -0,0 +1,72 @@
+import hashlib
+
+# Conquistas que avançam sem o jogador jogar (defesas, recorde de troféus) e por
+# isso não entram na marca de atividade
+PASSIVE_ACHIEVEMENTS = {"Unbreakable", "Sweet Victory!", "Champion Builder"}
+
+
+# Marca de atividade de um perfil (PlayerProfile): hash dos contadores que só
+# avançam quando o jogador joga. Usa os totais de toda a conta (nível, estrelas
+# de guerra, contribuições na Capital e conquistas, que incluem doações e
+# vitórias em ataques), e não os da temporada, que zeram todo mês. Troféus
+# ficam de fora porque caem com as defesas mesmo sem o jogador entrar.
+def profile_fingerprint(profile):
+    counters = [profile.exp_level, profile.war_stars, profile.capital_contributions]
+    counters.extend(value for name, value in sorted(profile.achievements.items()) if name not in PASSIVE_ACHIEVEMENTS)
+    return hashlib.blake2b(repr(counters).encode(), digest_size=8).hexdigest()
+
+
+# Índice de atividade dos membros: para cada tag, a última marca vista, quando
+# ela mudou pela última vez (`last_seen`) e desde quando o membro é acompanhado.
+# As mudanças são detectadas comparando só o hash; os métodos que alteram o
+# índice devolvem a linha a ser gravada (tag, marca, last_seen, desde).
+class ActivityTracker:
+    def __init__(self):
+        self._members = {}
+
+    def __len__(self):
+        return len(self._members)
+
+    # Carrega as linhas gravadas (veja SnapshotDB.load_activity)
+    def restore(self, rows):
+        for tag, fingerprint, last_seen, tracked_since in rows:
+            self._members[tag] = [fingerprint, last_seen, tracked_since]
+
+    # Registra a marca atual de um membro; devolve a linha se for nova ou mudou.
+    # A primeira marca de um membro criado por `touch` não conta como atividade.
+    def observe(self, tag, fingerprint, now):
+        entry = self._members.get(tag)
+        if entry is None:
+            entry = self._members[tag] = [fingerprint, now, now]
+        elif entry[0] is None:
+            entry[0] = fingerprint
+        elif entry[0] != fingerprint:
+            entry[0] = fingerprint
+            entry[1] = now
+        else:
+            return None
+        return (tag, *entry)
+
+    # Registra atividade vista por outro meio (ex.: uma doação na lista de membros)
+    def touch(self, tag, now):
+        entry = self._members.get(tag)
+        if entry is None:
+            entry = self._members[tag] = [None, now, now]
+        entry[1] = now
+        return (tag, *entry)
+
+    # (last_seen, desde) de um membro, ou None se ainda não foi visto
+    def last_seen(self, tag):
+        entry = self._members.get(tag)
+        return (entry[1], entry[2]) if entry else None
+
+    # Membros de `tags` sem atividade há pelo menos `min_idle` segundos, do mais
+    # inativo para o menos: [(tag, segundos sem atividade, desde quando é acompanhado)]
+    def inactive(self, tags, min_idle, now):
+        result = []
+        for tag in tags:
+            entry = self._members.get(tag)
+            if entry is not None and now - entry[1] >= min_idle:
+                result.append((tag, now - entry[1], entry[2]))
+        result.sort(key=lambda item: item[1], reverse=True)
+        return result
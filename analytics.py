@@ -0,0 +1,182 @@
+import numpy as np
+
+SIDES = {'clan': 0, 'opponent': 1}
+RESULTS = {'win': 0, 'tie': 1, 'lose': 2}
+
+
+# Estatísticas de guerra de um membro
+class MemberWarStats:
+    __slots__ = ('tag', 'name', 'wars', 'attacks', 'avg_stars', 'three_star_rate', 'missed_rate',
+                 'defenses', 'hold_rate')
+
+    def __init__(self, tag, name, wars, attacks, avg_stars, three_star_rate, missed_rate, defenses, hold_rate):
+        self.tag = tag
+        self.name = name
+        self.wars = wars
+        self.attacks = attacks
+        self.avg_stars = avg_stars
+        self.three_star_rate = three_star_rate
+        self.missed_rate = missed_rate
+        self.defenses = defenses
+        self.hold_rate = hold_rate
+
+
+# Divisão elemento a elemento que devolve 0 onde o divisor é 0
+def _ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+# Resumo do histórico de guerras (linhas de SnapshotDB.load_war_log: resultado,
+# estrelas e destruição): guerras, vitórias, empates, derrotas, taxa de vitória
+# e médias de estrelas e destruição por guerra. As guerras da liga, sem
+# resultado no histórico, são ignoradas.
+def war_log_summary(rows):
+    rows = [row for row in rows if row[0] in RESULTS]
+    if not rows:
+        return None
+    results = np.fromiter((RESULTS[row[0]] for row in rows), dtype=np.int8, count=len(rows))
+    stars = np.fromiter((row[1] or 0 for row in rows), dtype=np.float64, count=len(rows))
+    destruction = np.fromiter((row[2] or 0 for row in rows), dtype=np.float64, count=len(rows))
+    wins, ties, losses = np.bincount(results, minlength=3)
+    return {
+        'wars': len(rows),
+        'wins': int(wins),
+        'ties': int(ties),
+        'losses': int(losses),
+        'win_rate': float(wins / len(rows)),
+        'avg_stars': float(stars.mean()),
+        'avg_destruction': float(destruction.mean())
+    }
+
+
+# Estatísticas das guerras arquivadas de todos os clãs, em vetores NumPy. As
+# guerras chegam como linhas de war_archive_rows; os vetores são remontados só
+# quando há guerras novas e cada consulta é um punhado de bincounts sobre eles.
+class WarAnalytics:
+    def __init__(self):
+        self._member_rows = []
+        self._attack_rows = []
+        self._wars = set()
+        self._clans = {}
+        self._tags = {}
+        self._names = {}
+        self._arrays = None
+
+    # Número de guerras arquivadas de um clã
+    def war_count(self, clan_tag):
+        return sum(1 for clan, _ in self._wars if clan == clan_tag)
+
+    # Acrescenta guerras (participantes, ataques); guerras já conhecidas são ignoradas
+    def add(self, members, attacks):
+        known = set(self._wars)
+        for row in members:
+            if (row[0], row[1]) in known:
+                continue
+            self._wars.add((row[0], row[1]))
+            self._member_rows.append(row)
+            if row[4]:
+                self._names[row[3]] = row[4]
+        self._attack_rows.extend(row for row in attacks if (row[0], row[1]) not in known)
+        self._arrays = None
+
+    def _code(self, codes, key):
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(codes)
+        return code
+
+    def _build(self):
+        if self._arrays is not None:
+            return self._arrays
+        members = self._member_rows
+        townhalls = {}
+        for clan_tag, war, side, tag, _, townhall, _, _ in members:
+            townhalls[(clan_tag, war, side, tag)] = townhall or 0
+        clans, tags = self._clans, self._tags
+        arrays = {
+            'm_clan': np.array([self._code(clans, r[0]) for r in members], dtype=np.int32),
+            'm_side': np.array([SIDES[r[2]] for r in members], dtype=np.int8),
+            'm_tag': np.array([self._code(tags, r[3]) for r in members], dtype=np.int32),
+            'm_allowed': np.array([r[6] for r in members], dtype=np.float64),
+            'm_used': np.array([r[7] for r in members], dtype=np.float64),
+        }
+        attacks = self._attack_rows
+        defending = {'clan': 'opponent', 'opponent': 'clan'}
+        arrays.update({
+            'a_clan': np.array([self._code(clans, r[0]) for r in attacks], dtype=np.int32),
+            'a_side': np.array([SIDES[r[2]] for r in attacks], dtype=np.int8),
+            'a_attacker': np.array([self._code(tags, r[3]) for r in attacks], dtype=np.int32),
+            'a_defender': np.array([self._code(tags, r[4]) for r in attacks], dtype=np.int32),
+            'a_attacker_th': np.array([townhalls.get((r[0], r[1], r[2], r[3]), 0) for r in attacks], dtype=np.int16),
+            'a_defender_th': np.array([townhalls.get((r[0], r[1], defending[r[2]], r[4]), 0) for r in attacks],
+                                      dtype=np.int16),
+            'a_stars': np.array([r[5] for r in attacks], dtype=np.int8),
+        })
+        self._arrays = arrays
+        return arrays
+
+    # Estatísticas de cada membro do clã que participou de alguma guerra arquivada
+    def member_stats(self, clan_tag):
+        arrays = self._build()
+        clan = self._clans.get(clan_tag)
+        if clan is None:
+            return []
+        size = len(self._tags)
+
+        # Participações: guerras, ataques permitidos e feitos
+        mask = (arrays['m_clan'] == clan) & (arrays['m_side'] == 0)
+        tags = arrays['m_tag'][mask]
+        wars = np.bincount(tags, minlength=size)
+        allowed = np.bincount(tags, weights=arrays['m_allowed'][mask], minlength=size)
+        used = np.bincount(tags, weights=arrays['m_used'][mask], minlength=size)
+
+        # Ataques feitos pelo clã
+        mask = (arrays['a_clan'] == clan) & (arrays['a_side'] == 0)
+        attackers = arrays['a_attacker'][mask]
+        stars = arrays['a_stars'][mask]
+        attacks = np.bincount(attackers, minlength=size)
+        total_stars = np.bincount(attackers, weights=stars, minlength=size)
+        three_stars = np.bincount(attackers, weights=stars == 3, minlength=size)
+
+        # Defesas: ataques do oponente contra o membro; segurou se não levou 3 estrelas
+        mask = (arrays['a_clan'] == clan) & (arrays['a_side'] == 1)
+        defenders = arrays['a_defender'][mask]
+        defenses = np.bincount(defenders, minlength=size)
+        holds = np.bincount(defenders, weights=arrays['a_stars'][mask] < 3, minlength=size)
+
+        avg_stars = _ratio(total_stars, attacks)
+        three_star_rate = _ratio(three_stars, attacks)
+        missed_rate = _ratio(allowed - used, allowed)
+        hold_rate = _ratio(holds, defenses)
+
+        codes = {code: tag for tag, code in self._tags.items()}
+        return [
+            MemberWarStats(codes[i], self._names.get(codes[i]), int(wars[i]), int(attacks[i]), float(avg_stars[i]),
+                           float(three_star_rate[i]), float(missed_rate[i]), int(defenses[i]), float(hold_rate[i]))
+            for i in np.flatnonzero(wars)
+        ]
+
+    # Ataques do clã agrupados pela diferença de CV (atacante - defensor):
+    # [(diferença, ataques, média de estrelas, taxa de 3 estrelas)]. Com
+    # `member_tag`, só os ataques desse membro.
+    def townhall_difference(self, clan_tag, member_tag=None):
+        arrays = self._build()
+        clan = self._clans.get(clan_tag)
+        if clan is None:
+            return []
+        mask = ((arrays['a_clan'] == clan) & (arrays['a_side'] == 0)
+                & (arrays['a_attacker_th'] > 0) & (arrays['a_defender_th'] > 0))
+        if member_tag is not None:
+            code = self._tags.get(member_tag)
+            if code is None:
+                return []
+            mask &= arrays['a_attacker'] == code
+        if not mask.any():
+            return []
+        difference = arrays['a_attacker_th'][mask].astype(np.int32) - arrays['a_defender_th'][mask]
+        stars = arrays['a_stars'][mask]
+        values, groups = np.unique(difference, return_inverse=True)
+        attacks = np.bincount(groups)
+        avg_stars = np.bincount(groups, weights=stars) / attacks
+        three_star_rate = np.bincount(groups, weights=stars == 3) / attacks
+        return [(int(d), int(n), float(s), float(t)) for d, n, s, t in zip(values, attacks, avg_stars, three_star_rate)]
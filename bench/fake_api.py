@@ -0,0 +1,424 @@
+import argparse
+import asyncio
+import base64
+import datetime
+import json
+import os
+import random
+
+from aiohttp import web
+
+# Servidor que imita a API do Clash of Clans para testar o bot sem chave da API.
+# Gera clãs de 50 membros, guerras 50x50 cujos ataques avançam a cada rodada e
+# temporadas da Capital com registros de ataques longos. Também pode repetir
+# payloads gravados (veja load_replay).
+#
+# Uso avulso, com o bot apontando para ele:
+#   python -m bench.fake_api --port 8080 --clans 3 --tick-seconds 30
+#   COC_API_BASE_URL=http://127.0.0.1:8080/v1 python ClashGenius.py
+
+# Caracteres usados nas tags do jogo
+TAG_ALPHABET = "0289PYLQGRJCUV"
+
+LEAGUES = ["Liga Lendária", "Liga Titã I", "Liga Campeão I", "Liga Mestre I", "Liga Cristal I", "Liga Ouro I"]
+ROLES = ["leader", "coLeader", "admin", "member"]
+
+
+# Monta uma tag do jogo a partir de um número
+def make_tag(number):
+    chars = []
+    while True:
+        number, rest = divmod(number, len(TAG_ALPHABET))
+        chars.append(TAG_ALPHABET[rest])
+        if not number:
+            break
+    return "#" + "".join(reversed(chars)).rjust(6, "2")
+
+
+# Horário no formato da API (ex.: 20240105T080000.000Z)
+def api_time(moment):
+    return moment.strftime("%Y%m%dT%H%M%S.000Z")
+
+
+# Um clã simulado: membros, guerra atual, temporada da Capital e histórico
+class FakeClan:
+    def __init__(self, index, members=50, war_size=50, attacks_per_tick=10, raid_attacks_per_tick=25, rng=None):
+        self.rng = rng or random.Random(index)
+        self.index = index
+        self.tag = make_tag(1000 + index)
+        self.name = f"Clã Simulado {index}"
+        self.war_size = war_size
+        self.attacks_per_tick = attacks_per_tick
+        self.raid_attacks_per_tick = raid_attacks_per_tick
+        self.next_member = 0
+        self.members = [self._new_member() for _ in range(members)]
+        self.wars = 0
+        self.war_log = []
+        self.capital_log = []
+        self.seasons = 0
+        self.war = None
+        self.capital = None
+        self._start_war()
+        self._start_capital()
+
+    def _new_member(self):
+        self.next_member += 1
+        number = 100000 + self.index * 1000 + self.next_member
+        return {
+            "tag": make_tag(number),
+            "name": f"Jogador {self.index}-{self.next_member}",
+            "role": self.rng.choice(ROLES),
+            "expLevel": self.rng.randint(50, 250),
+            "trophies": self.rng.randint(1500, 5500),
+            "league": {"name": self.rng.choice(LEAGUES)},
+            "donations": self.rng.randint(0, 500),
+            "donationsReceived": self.rng.randint(0, 500),
+            "townHallLevel": self.rng.randint(8, 16)
+        }
+
+    # Membros no formato de memberList (sem campos que só existem no perfil)
+    def member_list(self):
+        return [{k: v for k, v in m.items() if k != "townHallLevel"} for m in self.members]
+
+    def _war_side(self, tag, name, members):
+        return {
+            "tag": tag,
+            "name": name,
+            "stars": 0,
+            "destructionPercentage": 0.0,
+            "attacks": 0,
+            "members": [
+                {"tag": m["tag"], "name": m["name"], "mapPosition": position,
+                 "townhallLevel": m.get("townHallLevel", 12), "attacks": []}
+                for position, m in enumerate(members, 1)
+            ]
+        }
+
+    def _start_war(self):
+        self.wars += 1
+        now = datetime.datetime.now(datetime.timezone.utc)
+        opponents = [
+            {"tag": make_tag(900000 + self.index * 1000 + i), "name": f"Rival {i}", "townHallLevel": self.rng.randint(8, 16)}
+            for i in range(self.war_size)
+        ]
+        ours = self.members[:self.war_size]
+        self.war = {
+            "state": "preparation",
+            "teamSize": len(ours),
+            "attacksPerMember": 2,
+            "preparationStartTime": api_time(now + datetime.timedelta(seconds=self.wars)),
+            "startTime": api_time(now + datetime.timedelta(hours=23, seconds=self.wars)),
+            "endTime": api_time(now + datetime.timedelta(hours=47, seconds=self.wars)),
+            "clan": self._war_side(self.tag, self.name, ours),
+            "opponent": self._war_side(make_tag(800000 + self.index), f"Oponente {self.wars}", opponents)
+        }
+        self.war_order = 0
+
+    def _start_capital(self):
+        # Segundos somados aos horários para que temporadas seguidas nunca coincidam
+        self.seasons += 1
+        now = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=self.seasons)
+        self.capital = {
+            "id": f"season-{self.index}-{len(self.war_log)}-{now.timestamp():.0f}",
+            "state": "ongoing",
+            "startTime": api_time(now),
+            "endTime": api_time(now + datetime.timedelta(days=3)),
+            "totalAttacks": 0,
+            "districtsDestroyed": 0,
+            "offensiveReward": 0,
+            "defensiveReward": 0,
+            "members": [],
+            "attackLog": []
+        }
+
+    # Avança uma rodada: doações, entradas/saídas, ataques de guerra e da Capital
+    def advance(self):
+        rng = self.rng
+        for member in rng.sample(self.members, k=min(10, len(self.members))):
+            member["donations"] += rng.randint(1, 40)
+            member["donationsReceived"] += rng.randint(0, 30)
+            member["trophies"] += rng.randint(-30, 30)
+        if rng.random() < 0.2 and len(self.members) > 1:
+            self.members.pop(rng.randrange(len(self.members)))
+            self.members.append(self._new_member())
+
+        self._advance_war()
+        self._advance_capital()
+
+    def _advance_war(self):
+        war = self.war
+        if war["state"] == "preparation":
+            war["state"] = "inWar"
+            return
+        if war["state"] == "warEnded":
+            self.war_log.insert(0, self._war_log_entry(war))
+            del self.war_log[50:]
+            self._start_war()
+            return
+
+        sides = (war["clan"], war["opponent"])
+        for _ in range(self.attacks_per_tick):
+            attackers = [(side, m) for side in sides for m in side["members"] if len(m["attacks"]) < 2]
+            if not attackers:
+                break
+            side, member = self.rng.choice(attackers)
+            defenders = (war["opponent"] if side is war["clan"] else war["clan"])["members"]
+            stars = self.rng.choice([1, 2, 2, 3, 3, 3])
+            self.war_order += 1
+            member["attacks"].append({
+                "attackerTag": member["tag"],
+                "defenderTag": self.rng.choice(defenders)["tag"],
+                "stars": stars,
+                "destructionPercentage": self.rng.randint(40 + stars * 15, 100) if stars < 3 else 100,
+                "order": self.war_order,
+                "duration": self.rng.randint(60, 180)
+            })
+            side["attacks"] += 1
+            side["stars"] = min(side["stars"] + stars, 3 * len(defenders))
+            side["destructionPercentage"] = min(100.0, side["destructionPercentage"] + 100.0 / len(defenders) / 2)
+        if all(len(m["attacks"]) >= 2 for side in sides for m in side["members"]):
+            war["state"] = "warEnded"
+
+    def _war_log_entry(self, war):
+        clan, opponent = war["clan"], war["opponent"]
+        result = "tie"
+        if (clan["stars"], clan["destructionPercentage"]) > (opponent["stars"], opponent["destructionPercentage"]):
+            result = "win"
+        elif (clan["stars"], clan["destructionPercentage"]) < (opponent["stars"], opponent["destructionPercentage"]):
+            result = "lose"
+        summary = lambda side: {k: side[k] for k in ("tag", "name", "stars", "destructionPercentage", "attacks")}
+        return {
+            "result": result,
+            "endTime": war["endTime"],
+            "teamSize": war["teamSize"],
+            "attacksPerMember": 2,
+            "clan": summary(clan),
+            "opponent": summary(opponent)
+        }
+
+    def _advance_capital(self):
+        season = self.capital
+        if len(season["attackLog"]) >= 600:
+            season["state"] = "ended"
+            self.capital_log.insert(0, season)
+            del self.capital_log[50:]
+            self._start_capital()
+            return
+        contributors = {m["tag"]: m for m in season["members"]}
+        for _ in range(self.raid_attacks_per_tick):
+            attacker = self.rng.choice(self.members)
+            looted = self.rng.randint(500, 4000)
+            entry = contributors.get(attacker["tag"])
+            if entry is None:
+                entry = contributors[attacker["tag"]] = {
+                    "tag": attacker["tag"], "name": attacker["name"], "attacks": 0,
+                    "attackLimit": 5, "bonusAttackLimit": 1, "capitalResourcesLooted": 0
+                }
+                season["members"].append(entry)
+            entry["attacks"] += 1
+            entry["capitalResourcesLooted"] += looted
+            season["totalAttacks"] += 1
+            destruction = self.rng.choice([20, 45, 70, 100])
+            if destruction == 100:
+                season["districtsDestroyed"] += 1
+            season["attackLog"].append({
+                "attacker": {"tag": attacker["tag"], "name": attacker["name"]},
+                "defender": {"tag": make_tag(700000 + len(season["attackLog"])), "name": f"Distrito {len(season['attackLog']) % 9}"},
+                "destructionPercentage": destruction
+            })
+        season["offensiveReward"] = season["districtsDestroyed"] * 12
+        season["defensiveReward"] = season["totalAttacks"] // 4
+
+    def clan_payload(self):
+        return {
+            "tag": self.tag,
+            "name": self.name,
+            "description": "Clã gerado pelo servidor de testes",
+            "clanLevel": 20,
+            "clanPoints": sum(m["trophies"] for m in self.members) // 2,
+            "clanBuilderBasePoints": 30000,
+            "members": len(self.members),
+            "type": "inviteOnly",
+            "warFrequency": "always",
+            "warWinStreak": 3,
+            "warWins": 300 + len(self.war_log),
+            "warTies": 10,
+            "warLosses": 90,
+            "location": {"name": "Brazil"},
+            "badgeUrls": {"medium": "https://example.invalid/badge.png"},
+            "memberList": self.member_list()
+        }
+
+    def player_payload(self, tag):
+        for member in self.members:
+            if member["tag"] == tag:
+                return dict(member, clan={"tag": self.tag, "name": self.name})
+        return None
+
+
+# Carrega payloads gravados de um diretório: clan.json, currentwar.json,
+# capitalraidseasons.json, warlog.json e player.json. Cada arquivo pode ter um
+# único payload ou uma lista deles, servidos um por rodada (o último se repete).
+def load_replay(directory):
+    replay = {}
+    for endpoint in ("clan", "currentwar", "capitalraidseasons", "warlog", "player"):
+        path = os.path.join(directory, f"{endpoint}.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            replay[endpoint] = data if isinstance(data, list) else [data]
+    return replay
+
+
+# Servidor HTTP da API simulada. `tick()` avança todos os clãs em uma rodada.
+class FakeCocApi:
+    def __init__(self, clans=1, members=50, war_size=50, attacks_per_tick=10, raid_attacks_per_tick=25,
+                 seed=0, replay_dir=None, cache_max_age=0, error_rate=0.0):
+        rng = random.Random(seed)
+        self.error_rng = random.Random(seed + 1)
+        self.error_rate = error_rate
+        self.clans = {}
+        for index in range(clans):
+            clan = FakeClan(index, members, min(war_size, members), attacks_per_tick, raid_attacks_per_tick,
+                            random.Random(rng.random()))
+            self.clans[clan.tag] = clan
+        self.replay = load_replay(replay_dir) if replay_dir else {}
+        self.cache_max_age = cache_max_age
+        self.ticks = 0
+        self.requests = 0
+        self.app = web.Application()
+        self.app.router.add_get("/v1/clans/{tag}", self.clan)
+        self.app.router.add_get("/v1/clans/{tag}/currentwar", self.current_war)
+        self.app.router.add_get("/v1/clans/{tag}/capitalraidseasons", self.capital_seasons)
+        self.app.router.add_get("/v1/clans/{tag}/warlog", self.war_log)
+        self.app.router.add_get("/v1/players/{tag}", self.player)
+        self._runner = None
+
+    @property
+    def tags(self):
+        return list(self.clans)
+
+    def tick(self):
+        self.ticks += 1
+        if not self.replay:
+            for clan in self.clans.values():
+                clan.advance()
+
+    # Inicia o servidor e devolve a URL base para COC_API_BASE_URL
+    async def start(self, host="127.0.0.1", port=0):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}/v1"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _respond(self, payload):
+        self.requests += 1
+        # Falhas simuladas: limite de requisições ou servidor indisponível
+        if self.error_rate and self.error_rng.random() < self.error_rate:
+            if self.error_rng.random() < 0.5:
+                return web.json_response({"reason": "requestThrottled"}, status=429, headers={"Retry-After": "1"})
+            return web.json_response({"reason": "serviceUnavailable"}, status=503)
+        if payload is None:
+            return web.json_response({"reason": "notFound"}, status=404)
+        headers = {"Cache-Control": f"max-age={self.cache_max_age}"} if self.cache_max_age else {}
+        return web.json_response(payload, headers=headers)
+
+    def _replayed(self, endpoint):
+        payloads = self.replay.get(endpoint)
+        if not payloads:
+            return None
+        return payloads[min(self.ticks, len(payloads) - 1)]
+
+    # Uma página da lista, como a API: `limit` e o cursor `after` (base64 de {"pos": n})
+    def _page(self, request, items):
+        start = 0
+        after = request.query.get("after")
+        if after:
+            start = json.loads(base64.b64decode(after))["pos"]
+        limit = int(request.query.get("limit", len(items) or 1))
+        page = {"items": items[start:start + limit], "paging": {"cursors": {}}}
+        if start + limit < len(items):
+            page["paging"]["cursors"]["after"] = base64.b64encode(json.dumps({"pos": start + limit}).encode()).decode()
+        return page
+
+    def _clan(self, request):
+        return self.clans.get(request.match_info["tag"].upper())
+
+    async def clan(self, request):
+        if "clan" in self.replay:
+            return self._respond(self._replayed("clan"))
+        clan = self._clan(request)
+        return self._respond(clan.clan_payload() if clan else None)
+
+    async def current_war(self, request):
+        if "currentwar" in self.replay:
+            return self._respond(self._replayed("currentwar"))
+        clan = self._clan(request)
+        return self._respond(clan.war if clan else None)
+
+    async def capital_seasons(self, request):
+        if "capitalraidseasons" in self.replay:
+            return self._respond(self._replayed("capitalraidseasons"))
+        clan = self._clan(request)
+        return self._respond(self._page(request, [clan.capital] + clan.capital_log) if clan else None)
+
+    async def war_log(self, request):
+        if "warlog" in self.replay:
+            return self._respond(self._replayed("warlog"))
+        clan = self._clan(request)
+        return self._respond(self._page(request, clan.war_log) if clan else None)
+
+    async def player(self, request):
+        if "player" in self.replay:
+            return self._respond(self._replayed("player"))
+        tag = request.match_info["tag"].upper()
+        for clan in self.clans.values():
+            player = clan.player_payload(tag)
+            if player is not None:
+                return self._respond(player)
+        return self._respond(None)
+
+
+async def serve(args):
+    api = FakeCocApi(args.clans, args.members, args.war_size, args.attacks_per_tick,
+                     args.raid_attacks_per_tick, args.seed, args.replay, error_rate=args.error_rate)
+    base_url = await api.start(args.host, args.port)
+    print(f"API simulada em {base_url}")
+    print("Clãs: " + ", ".join(api.tags))
+    try:
+        while True:
+            await asyncio.sleep(args.tick_seconds)
+            api.tick()
+    finally:
+        await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API do Clash of Clans simulada")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--clans", type=int, default=1)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--war-size", type=int, default=50)
+    parser.add_argument("--attacks-per-tick", type=int, default=10)
+    parser.add_argument("--raid-attacks-per-tick", type=int, default=25)
+    parser.add_argument("--tick-seconds", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", help="diretório com payloads gravados")
+    parser.add_argument("--error-rate", type=float, default=0, help="fração das respostas com 429 ou 503")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
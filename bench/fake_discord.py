@@ -0,0 +1,66 @@
+import asyncio
+
+
+# Canal do Discord simulado: guarda as mensagens enviadas em vez de publicá-las.
+# `latency` simula o tempo de ida e volta de cada envio.
+class FakeChannel:
+    def __init__(self, channel_id, latency=0.0):
+        self.id = channel_id
+        self.latency = latency
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.messages.append(content if content is not None else kwargs)
+        return self.messages[-1]
+
+    # Mensagens enviadas desde a última chamada
+    def drain(self):
+        messages, self.messages = self.messages, []
+        return messages
+
+
+# Servidor do Discord simulado, com canais criados sob demanda
+class FakeGuild:
+    def __init__(self, guild_id, latency=0.0):
+        self.id = guild_id
+        self.latency = latency
+        self.channels = {}
+
+    def get_channel(self, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id, self.latency)
+        return channel
+
+
+# Substitui bot.get_guild para que os logs dos clãs caiam nos canais simulados
+class FakeDiscord:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.guilds = {}
+
+    def get_guild(self, guild_id):
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = FakeGuild(guild_id, self.latency)
+        return guild
+
+    def channels(self):
+        return [channel for guild in self.guilds.values() for channel in guild.channels.values()]
+
+    # Mensagens enviadas em todos os canais desde a última chamada
+    def drain(self):
+        return [message for channel in self.channels() for message in channel.drain()]
+
+
+# Contexto de comando simulado, para chamar os comandos do bot diretamente
+class FakeContext(FakeChannel):
+    def __init__(self, guild=None, latency=0.0):
+        super().__init__(0, latency)
+        self.guild = guild
+
+    # Nos comandos de barra, confirma a interação antes do trabalho demorado
+    async def defer(self, ephemeral=False):
+        pass
@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from bench.fake_api import FakeCocApi
+from bench.fake_discord import FakeContext, FakeDiscord
+from metrics import EVENTS_EMITTED
+
+# Benchmark do monitoramento contra a API e o Discord simulados. A cada rodada:
+#   1. a API simulada avança (novos ataques, doações, contribuições...);
+#   2. busca: os dados de clã, guerra e Capital de todos os clãs são obtidos
+#      com a mesma concorrência das tarefas do bot;
+#   3. comparação: check_clan, check_war e check_capital rodam sobre os dados
+#      já obtidos, medindo só a comparação e o SQLite;
+#   4. entrega: os eventos publicados são agrupados e enviados ao canal simulado;
+#   5. comandos (opcional): cada comando é executado uma vez por clã.
+# O agendamento adaptativo é ignorado: todos os clãs são verificados em toda rodada.
+#
+#   python -m bench.run --clans 10 --ticks 30
+#   python -m bench.run --json resultado.json --max-diff-ms 50
+
+COMMANDS = ("clan_info", "war_status", "top_donators", "trophies_ranking", "clan_capital_info")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+# Importa o bot configurado para a API simulada e um banco temporário
+def load_bot(base_url, api, db_path, concurrency, rate_limit):
+    os.environ.update({
+        "DISCORD_TOKEN": "bench",
+        "COC_API_KEY": "bench",
+        "COC_API_BASE_URL": base_url,
+        "CLANS": ",".join(f"{tag}:1:{i + 1}" for i, tag in enumerate(api.tags)),
+        "CLAN_TAG": "",
+        "CLANS_FILE": "",
+        "CLAN_POLL_CONCURRENCY": str(concurrency),
+        "SNAPSHOT_DB_PATH": db_path,
+        "EVENT_BATCH_WINDOW": "0",
+        "EVENT_DESTINATION_RATE": "0",
+        "COC_RATE_LIMIT": str(rate_limit)
+    })
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return importlib.import_module("ClashGenius")
+
+
+async def run(args):
+    api = FakeCocApi(args.clans, args.members, args.war_size, args.attacks_per_tick,
+                     args.raid_attacks_per_tick, args.seed, args.replay, error_rate=args.error_rate)
+    base_url = await api.start()
+    discord_sink = FakeDiscord(args.send_latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cg = load_bot(base_url, api, os.path.join(tmp, "bench.db"), args.concurrency, args.rate_limit)
+        cg.bot.get_guild = discord_sink.get_guild
+        cg.snapshot_db.open()
+        cg.history_store.open()
+        await cg.coc_client.open()
+        cg.event_pipeline.start()
+        states = list(cg.clan_registry)
+        originals = (cg.get_clan_snapshot, cg.get_war_snapshot, cg.get_capital_snapshot)
+
+        ticks = []
+        try:
+            for tick in range(1, args.ticks + 1):
+                api.tick()
+                requests_before = api.requests
+                events_before = EVENTS_EMITTED.total()
+
+                # Busca
+                started = time.perf_counter()
+                fetched = {}
+
+                async def fetch(state):
+                    fetched[state.tag] = await asyncio.gather(
+                        cg.fetch_clan(state.tag), cg.fetch_war(state.tag), cg.fetch_capital(state.tag))
+
+                await cg.run_for_clans(states, fetch, cg.clan_poll_semaphore)
+                fetch_time = time.perf_counter() - started
+
+                # Comparação sobre os dados já obtidos
+                async def snapshot(kind, tag, max_age=None):
+                    return fetched[tag][kind]
+
+                cg.get_clan_snapshot = lambda tag, max_age=None: snapshot(0, tag)
+                cg.get_war_snapshot = lambda tag, max_age=None: snapshot(1, tag)
+                cg.get_capital_snapshot = lambda tag, max_age=None: snapshot(2, tag)
+                diff_times = []
+                try:
+                    for state in states:
+                        for check in (cg.check_clan, cg.check_war, cg.check_capital):
+                            check_started = time.perf_counter()
+                            await check(state)
+                            diff_times.append(time.perf_counter() - check_started)
+                finally:
+                    cg.get_clan_snapshot, cg.get_war_snapshot, cg.get_capital_snapshot = originals
+
+                # Entrega dos eventos (em segundo plano no bot)
+                notifications = EVENTS_EMITTED.total() - events_before
+                delivery_started = time.perf_counter()
+                await cg.event_pipeline.join()
+                delivery_time = time.perf_counter() - delivery_started
+                messages = discord_sink.drain()
+
+                # Comandos
+                command_times = []
+                if args.commands:
+                    ctx = FakeContext(latency=args.send_latency)
+                    for state in states:
+                        for name in COMMANDS:
+                            command_started = time.perf_counter()
+                            await getattr(cg, name).callback(ctx, state.tag)
+                            command_times.append(time.perf_counter() - command_started)
+
+                diff_time = sum(diff_times)
+                ticks.append({
+                    "tick": tick,
+                    "fetch_ms": fetch_time * 1000,
+                    "diff_ms": diff_time * 1000,
+                    "diff_p95_ms": percentile(diff_times, 0.95) * 1000,
+                    "command_ms": statistics.mean(command_times) * 1000 if command_times else None,
+                    "delivery_ms": delivery_time * 1000,
+                    "notifications": notifications,
+                    "messages": len(messages),
+                    "api_requests": api.requests - requests_before,
+                    "polls_per_second": len(states) * 3 / (fetch_time + diff_time)
+                })
+                if not args.quiet:
+                    row = ticks[-1]
+                    print(f"rodada {tick:>3} | busca {row['fetch_ms']:>8.1f} ms | comparação {row['diff_ms']:>8.1f} ms"
+                          f" | {row['notifications']:>4} notificações em {row['messages']:>3} mensagens | {row['polls_per_second']:>7.1f} verificações/s")
+        finally:
+            await cg.event_pipeline.stop()
+            await cg.coc_client.close()
+            cg.snapshot_db.close()
+            cg.history_store.close()
+            await api.stop()
+
+    measured = ticks[1:] or ticks  # a primeira rodada só carrega o estado inicial
+    summary = {
+        "clans": args.clans,
+        "ticks": args.ticks,
+        "polls_per_second": statistics.mean(t["polls_per_second"] for t in measured),
+        "fetch_ms_per_tick": statistics.mean(t["fetch_ms"] for t in measured),
+        "diff_ms_per_tick": statistics.mean(t["diff_ms"] for t in measured),
+        "diff_ms_per_poll_p95": max(t["diff_p95_ms"] for t in measured),
+        "delivery_ms_per_tick": statistics.mean(t["delivery_ms"] for t in measured),
+        "notifications_per_tick": statistics.mean(t["notifications"] for t in measured),
+        "messages_per_tick": statistics.mean(t["messages"] for t in measured),
+        "api_requests_per_tick": statistics.mean(t["api_requests"] for t in measured),
+        "command_ms": statistics.mean(t["command_ms"] for t in measured) if args.commands else None
+    }
+    return summary, ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do monitoramento com a API simulada")
+    parser.add_argument("--clans", type=int, default=5)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--war-size", type=int, default=50)
+    parser.add_argument("--attacks-per-tick", type=int, default=10)
+    parser.add_argument("--raid-attacks-per-tick", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--send-latency", type=float, default=0.0, help="latência simulada de cada envio ao Discord (s)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="limite de requisições por segundo (0 desativa)")
+    parser.add_argument("--error-rate", type=float, default=0, help="fração das respostas da API com 429 ou 503")
+    parser.add_argument("--commands", action="store_true", help="também mede os comandos")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", help="diretório com payloads gravados (veja bench/fake_api.py)")
+    parser.add_argument("--json", help="salva o resumo e as rodadas neste arquivo")
+    parser.add_argument("--max-diff-ms", type=float, help="falha se a comparação média por rodada passar disso")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    summary, ticks = asyncio.run(run(args))
+
+    print("\nResumo")
+    for key, value in summary.items():
+        if value is not None:
+            print(f"  {key:<24} {value:>10.2f}" if isinstance(value, float) else f"  {key:<24} {value:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "ticks": ticks}, f, indent=2)
+
+    if args.max_diff_ms is not None and summary["diff_ms_per_tick"] > args.max_diff_ms:
+        print(f"Comparação média de {summary['diff_ms_per_tick']:.2f} ms acima do limite de {args.max_diff_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
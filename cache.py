@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+# Cache em memória onde cada item expira após seu TTL. Com `maxsize`, os
+# itens usados há mais tempo são descartados primeiro (LRU).
+class TTLCache:
+    def __init__(self, ttl, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    # Estatísticas de uso do cache
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Guarda o último payload de cada chave (ex.: "clan", "war") e quando foi obtido.
+# Quando o dado está mais velho que `max_age`, chamadas simultâneas compartilham
+# uma única requisição em andamento (single-flight) em vez de repeti-la.
+class SnapshotStore:
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self._snapshots = {}
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key, value):
+        self._snapshots[key] = (value, time.monotonic())
+
+    def peek(self, key, default=None):
+        entry = self._snapshots.get(key)
+        return default if entry is None else entry[0]
+
+    # Idade do snapshot em segundos (None se ainda não existe)
+    def age(self, key):
+        entry = self._snapshots.get(key)
+        return None if entry is None else time.monotonic() - entry[1]
+
+    # Retorna o snapshot se estiver dentro do limite de idade; caso contrário,
+    # atualiza com `fetcher`. Se a atualização falhar, devolve o último valor
+    # conhecido, exceto com `max_age=0` (o monitoramento, que precisa de dados
+    # novos para comparar), quando devolve None.
+    async def get(self, key, fetcher, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        entry = self._snapshots.get(key)
+        if entry is not None and max_age > 0 and time.monotonic() - entry[1] <= max_age:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(key, fetcher))
+            self._inflight[key] = task
+        value = await asyncio.shield(task)
+        if value is None and entry is not None and max_age > 0:
+            return entry[0]
+        return value
+
+    # Estatísticas de reaproveitamento dos snapshots
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._snapshots),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    async def _refresh(self, key, fetcher):
+        try:
+            value = await fetcher()
+            if value is not None:
+                self.put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
@@ -0,0 +1,177 @@
+import asyncio
+import json
+
+from models import deep_sizeof
+
+
+# Normaliza uma tag do jogo: maiúsculas, com '#' e sem a letra O (o jogo usa 0)
+def normalize_tag(tag):
+    tag = tag.strip().upper().replace('O', '0')
+    if not tag.startswith('#'):
+        tag = '#' + tag
+    return tag
+
+
+# Configuração de um clã monitorado: para qual servidor e canal enviar os logs
+class ClanConfig:
+    def __init__(self, tag, guild_id, channel_id):
+        self.tag = normalize_tag(tag)
+        self.guild_id = int(guild_id)
+        self.channel_id = int(channel_id)
+
+
+# Destino extra dos eventos de um clã já monitorado: um canal de outro servidor
+# (`guild_id` e `channel_id`) ou um webhook do Discord (`webhook_url`)
+class Subscription:
+    def __init__(self, tag, guild_id=None, channel_id=None, webhook_url=None):
+        self.tag = normalize_tag(tag)
+        self.guild_id = int(guild_id) if guild_id else None
+        self.channel_id = int(channel_id) if channel_id else None
+        self.webhook_url = webhook_url
+
+    # Identifica o destino, para não repetir a mesma inscrição
+    @property
+    def key(self):
+        return self.webhook_url or (self.guild_id, self.channel_id)
+
+
+# Estado de monitoramento de um clã (dados da última verificação, para comparação):
+# membros (tag→ClanMember), guerra (WarState) e temporada da Capital (CapitalSeason)
+class ClanState:
+    def __init__(self, config):
+        self.config = config
+        # Destinos dos eventos além do canal de logs (Subscription)
+        self.subscriptions = []
+        self.members = {}
+        self.war = None
+        self.capital = None
+        # Rodadas da Liga de Clãs já vistas na temporada atual (id→RoundProgress)
+        self.league_season = None
+        self.league_wars = {}
+        # Agendamento das próximas verificações (timestamps UNIX)
+        self.next_war_poll = 0.0
+        self.next_capital_poll = 0.0
+        self.idle_war_polls = 0
+
+    @property
+    def tag(self):
+        return self.config.tag
+
+    # Restaura o estado salvo em disco (veja SnapshotDB.load_state)
+    def restore(self, saved):
+        self.members = saved["members"]
+        self.war = saved["war"]
+        self.capital = saved["capital"]
+        self.league_season = saved["league_season"]
+        self.league_wars = saved["league_wars"]
+
+    # Memória aproximada (em bytes) usada pelo estado deste clã
+    def memory_usage(self):
+        return deep_sizeof((self.members, self.war, self.capital, self.league_wars))
+
+
+# Registro dos clãs monitorados, indexado pela tag do clã
+class ClanRegistry:
+    def __init__(self):
+        self._clans = {}
+
+    def register(self, config):
+        state = self._clans.get(config.tag)
+        if state is None:
+            state = self._clans[config.tag] = ClanState(config)
+        else:
+            state.config = config
+        return state
+
+    def get(self, tag):
+        return self._clans.get(normalize_tag(tag))
+
+    # Acrescenta um destino aos eventos de um clã monitorado; devolve False se o
+    # clã não é monitorado
+    def subscribe(self, subscription):
+        state = self._clans.get(subscription.tag)
+        if state is None:
+            return False
+        if all(s.key != subscription.key for s in state.subscriptions):
+            state.subscriptions.append(subscription)
+        return True
+
+    # Clãs cujos logs vão para um determinado servidor (pelo canal de logs ou
+    # por uma inscrição), o do canal de logs primeiro
+    def for_guild(self, guild_id):
+        states = [state for state in self._clans.values() if state.config.guild_id == guild_id]
+        states.extend(state for state in self._clans.values() if state not in states
+                      and any(s.guild_id == guild_id for s in state.subscriptions))
+        return states
+
+    # Servidores que recebem os logs de algum clã
+    def guild_ids(self):
+        ids = set()
+        for state in self._clans.values():
+            ids.add(state.config.guild_id)
+            ids.update(s.guild_id for s in state.subscriptions if s.guild_id)
+        return ids
+
+    def __iter__(self):
+        return iter(list(self._clans.values()))
+
+    def __len__(self):
+        return len(self._clans)
+
+
+# Lê a lista de clãs. Aceita um arquivo JSON com objetos {"tag", "guild_id", "channel_id"}
+# ou uma string no formato "TAG:GUILD_ID:CHANNEL_ID,TAG:GUILD_ID:CHANNEL_ID".
+def load_clan_configs(clans_file=None, clans_spec=None):
+    configs = []
+    if clans_file:
+        with open(clans_file, encoding='utf-8') as f:
+            for entry in json.load(f):
+                configs.append(ClanConfig(entry["tag"], entry["guild_id"], entry["channel_id"]))
+    if clans_spec:
+        for entry in clans_spec.split(','):
+            if entry.strip():
+                tag, guild_id, channel_id = entry.strip().split(':')
+                configs.append(ClanConfig(tag, guild_id, channel_id))
+    return configs
+
+
+# Lê as inscrições. Aceita um arquivo JSON com objetos {"tag", "guild_id",
+# "channel_id"} ou {"tag", "webhook_url"}, ou uma string no formato
+# "TAG:GUILD_ID:CHANNEL_ID,TAG:webhook:URL".
+def load_subscriptions(subscriptions_file=None, subscriptions_spec=None):
+    subscriptions = []
+    if subscriptions_file:
+        with open(subscriptions_file, encoding='utf-8') as f:
+            for entry in json.load(f):
+                subscriptions.append(Subscription(entry["tag"], entry.get("guild_id"), entry.get("channel_id"),
+                                                  entry.get("webhook_url")))
+    if subscriptions_spec:
+        for entry in subscriptions_spec.split(','):
+            if entry.strip():
+                tag, kind, target = entry.strip().split(':', 2)
+                if kind == 'webhook':
+                    subscriptions.append(Subscription(tag, webhook_url=target))
+                else:
+                    subscriptions.append(Subscription(tag, kind, target))
+    return subscriptions
+
+
+# Executa `check(state)` para cada clã com concorrência limitada. Os inícios são
+# escalonados ao longo de `spread` segundos para não disparar todas as
+# requisições de uma vez.
+async def run_for_clans(states, check, semaphore, spread=0):
+    states = list(states)
+    if not states:
+        return
+    step = spread / len(states)
+
+    async def run(index, state):
+        if step:
+            await asyncio.sleep(index * step)
+        async with semaphore:
+            try:
+                await check(state)
+            except Exception as e:
+                print(f"Erro em {check.__name__} ({state.tag}): {e}")
+
+    await asyncio.gather(*(run(index, state) for index, state in enumerate(states)))
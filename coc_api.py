@@ -0,0 +1,210 @@
+import asyncio
+import json
+import re
+import time
+from urllib.parse import quote
+
+import aiohttp
+
+from cache import TTLCache
+from metrics import API_CACHE_LOOKUPS, API_RATE_LIMIT_WAIT, API_REQUEST_DURATION, API_RESPONSES, API_RETRIES
+from ratelimit import INTERACTIVE, CircuitBreaker, RateGovernor, api_priority, backoff_delay, retry_after_seconds
+
+# orjson é opcional: decodifica bem mais rápido, mas o json padrão serve de reserva
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# URL base da API do Clash of Clans
+BASE_URL = "https://api.clashofclans.com/v1"
+
+# Respostas que indicam falha temporária do servidor e podem ser repetidas
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+TAG_RE = re.compile(r"%23[^/?]+")
+
+
+# Decodificador de JSON usado nas respostas da API
+def json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Endpoint de um caminho sem a tag e a query, usado como rótulo das métricas
+# (ex.: /clans/%232PP/currentwar → /clans/{tag}/currentwar)
+def endpoint_template(path):
+    return TAG_RE.sub("{tag}", path.split("?", 1)[0])
+
+
+# Lê por quantos segundos a resposta pode ser reutilizada (Cache-Control: max-age)
+def cache_max_age(headers):
+    cache_control = headers.get("Cache-Control", "")
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = MAX_AGE_RE.search(cache_control)
+    if not match:
+        return 0
+    age = headers.get("Age", "0")
+    max_age = int(match.group(1)) - (int(age) if age.isdigit() else 0)
+    return max(0, max_age)
+
+
+# Cliente da API do Clash of Clans com uma única sessão HTTP reaproveitada.
+# A sessão mantém um pool de conexões keep-alive e cache de DNS, evitando um
+# novo handshake TCP+TLS a cada requisição. As respostas ficam em um cache LRU
+# pelo tempo indicado pelo servidor no cabeçalho Cache-Control.
+#
+# Todas as requisições passam pelo `governor` (token bucket com prioridade para
+# os comandos, veja ratelimit.py) e pelo `breaker`, que suspende as consultas
+# durante a manutenção da API. Um 429 pausa o governor pelo Retry-After; erros
+# 5xx e de rede são repetidos até `max_retries` vezes com espera exponencial.
+class CocClient:
+    def __init__(self, api_key, base_url=BASE_URL, pool_size=20, keepalive_timeout=60,
+                 dns_cache_ttl=300, total_timeout=10, connect_timeout=5, cache_size=512,
+                 governor=None, breaker=None, max_retries=3, retry_base_delay=1.0):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "application/json"
+        }
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.session = None
+        self.cache = TTLCache(0, maxsize=cache_size) if cache_size else None
+        self.governor = governor or RateGovernor(0)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        # Latência (em segundos) e horário da última requisição feita à API
+        self.last_latency = None
+        self.last_request_at = None
+
+    @property
+    def is_open(self):
+        return self.session is not None and not self.session.closed
+
+    # Abre a sessão (chamadas repetidas não criam uma nova)
+    async def open(self):
+        if self.is_open:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=self.timeout,
+            json_serialize=json.dumps
+        )
+
+    async def close(self):
+        if self.is_open:
+            await self.session.close()
+        self.session = None
+
+    # Faz um GET em um endpoint da API e retorna o JSON, ou None em caso de erro
+    # (o caminho, com endpoint e tag, é a chave do cache de respostas). Os códigos
+    # em `quiet_statuses` (ex.: 404 esperado) não são registrados como erro e
+    # retornam `missing`, para quem precisa distinguir essa resposta de uma falha.
+    async def get(self, path, error_message="Erro na API do Clash of Clans", quiet_statuses=(), missing=None):
+        endpoint = endpoint_template(path)
+        if self.cache is not None:
+            cached = self.cache.get(path)
+            API_CACHE_LOOKUPS.inc(endpoint=endpoint, result="hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+        if not self.is_open:
+            await self.open()
+
+        priority = api_priority.get()
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                print(f"{error_message}: API indisponível, nova tentativa em {self.breaker.retry_in():.0f}s")
+                return None
+
+            waited = time.monotonic()
+            await self.governor.acquire(priority)
+            API_RATE_LIMIT_WAIT.observe(time.monotonic() - waited, priority="interactive" if priority == INTERACTIVE else "background")
+
+            retry_delay = backoff_delay(attempt, self.retry_base_delay)
+            started = time.monotonic()
+            try:
+                async with self.session.get(f"{self.base_url}{path}") as response:
+                    self.last_latency = time.monotonic() - started
+                    self.last_request_at = time.time()
+                    API_REQUEST_DURATION.observe(self.last_latency, endpoint=endpoint)
+                    API_RESPONSES.inc(endpoint=endpoint, status=str(response.status))
+                    if response.status not in RETRYABLE_STATUS:
+                        self.breaker.record_success()
+                    if response.status == 200:
+                        data = await response.json(loads=json_loads, content_type=None)
+                        max_age = cache_max_age(response.headers)
+                        if self.cache is not None and max_age > 0:
+                            self.cache.set(path, data, ttl=max_age)
+                        return data
+
+                    retry_after = retry_after_seconds(response.headers)
+                    if response.status == 429:
+                        # Limite de requisições da chave: todas as requisições esperam no governor
+                        self.governor.pause(retry_after if retry_after is not None else retry_delay)
+                        retry_delay = 0
+                    elif response.status in RETRYABLE_STATUS:
+                        reason = await self._error_reason(response)
+                        if reason == "inMaintenance":
+                            self.breaker.trip(retry_after)
+                            print(f"{error_message}: API em manutenção")
+                            return None
+                        self.breaker.record_failure()
+                        if retry_after is not None:
+                            retry_delay = retry_after
+                    else:
+                        if response.status in quiet_statuses:
+                            return missing
+                        print(f"{error_message}: {response.status}")
+                        return None
+                    print(f"{error_message}: {response.status} (tentativa {attempt + 1} de {self.max_retries + 1})")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                API_REQUEST_DURATION.observe(time.monotonic() - started, endpoint=endpoint)
+                API_RESPONSES.inc(endpoint=endpoint, status="timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+                self.breaker.record_failure()
+                print(f"{error_message}: {e!r} (tentativa {attempt + 1} de {self.max_retries + 1})")
+
+            if attempt < self.max_retries:
+                API_RETRIES.inc(endpoint=endpoint)
+                await asyncio.sleep(retry_delay)
+        return None
+
+    # Percorre um endpoint paginado (parâmetros `limit` e `after` da API), uma
+    # página de itens por vez, sem guardar as anteriores. Termina na última
+    # página ou em caso de erro; quem consome pode parar antes (ex.: ao chegar a
+    # itens já conhecidos) e as páginas seguintes não são buscadas.
+    # `quiet_statuses` é repassado ao `get`.
+    async def iter_pages(self, path, error_message="Erro na API do Clash of Clans", limit=25, quiet_statuses=()):
+        after = None
+        while True:
+            query = f"limit={limit}" + (f"&after={quote(after, safe='')}" if after else "")
+            data = await self.get(f"{path}?{query}", error_message, quiet_statuses)
+            if not data:
+                return
+            items = data.get("items") or []
+            if items:
+                yield items
+            after = (data.get("paging") or {}).get("cursors", {}).get("after")
+            if not after or not items:
+                return
+
+    # Motivo do erro informado pela API no corpo da resposta (ex.: inMaintenance)
+    async def _error_reason(self, response):
+        try:
+            body = await response.json(loads=json_loads, content_type=None)
+        except (ValueError, aiohttp.ClientError):
+            return None
+        return body.get("reason") if isinstance(body, dict) else None
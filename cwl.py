@@ -0,0 +1,131 @@
+from war import WarState
+
+# Nas guerras da Liga de Clãs cada membro tem um único ataque
+CWL_ATTACKS_PER_MEMBER = 1
+
+# Guerras de um grupo da liga em uma temporada: 7 rodadas de 4 guerras
+CWL_WARS_PER_GROUP = 28
+
+# Estrelas de bônus por vitória na classificação da liga
+CWL_WIN_BONUS = 10
+
+
+# Grupo da Liga de Clãs (/currentwar/leaguegroup): temporada, clãs (tag→nome) e
+# as tags das guerras de cada rodada ("#0" indica rodada ainda não sorteada)
+class LeagueGroup:
+    __slots__ = ('state', 'season', 'clans', 'rounds')
+
+    @classmethod
+    def from_payload(cls, group_data):
+        group = cls()
+        group.state = group_data.get('state')
+        group.season = group_data.get('season')
+        group.clans = {c['tag']: c.get('name') for c in group_data.get('clans', []) if 'tag' in c}
+        group.rounds = [[tag for tag in r.get('warTags', []) if tag and tag != '#0']
+                        for r in group_data.get('rounds', [])]
+        return group
+
+    @property
+    def war_tags(self):
+        return [tag for war_tags in self.rounds for tag in war_tags]
+
+
+# Guerra da liga (/clanwarleagues/wars) convertida uma única vez em WarState,
+# com o limite de um ataque por membro
+def parse_league_war(war_data):
+    war_data = dict(war_data)
+    war_data.setdefault('attacksPerMember', CWL_ATTACKS_PER_MEMBER)
+    return WarState(war_data)
+
+
+# Guerra da liga (WarState) vista pelo lado de `clan_tag`: os lados são trocados
+# se o clã aparecer como oponente
+def orient_war(war, clan_tag):
+    return war.swapped() if war.opponent.tag == clan_tag else war
+
+
+# Vencedor de uma guerra terminada pelas estrelas e depois pela destruição (None se empate)
+def war_winner(war):
+    clan_score = (war.clan.stars, war.clan.destruction)
+    opponent_score = (war.opponent.stars, war.opponent.destruction)
+    if clan_score == opponent_score:
+        return None
+    return war.clan.tag if clan_score > opponent_score else war.opponent.tag
+
+
+# Progresso já notificado de uma rodada da liga: o que a comparação com a
+# verificação anterior precisa (id, estado e o último `order` de ataque)
+class RoundProgress:
+    __slots__ = ('id', 'state', 'last_order')
+
+    def __init__(self, war_id, state, last_order):
+        self.id = war_id
+        self.state = state
+        self.last_order = last_order
+
+    @classmethod
+    def from_war(cls, war):
+        return cls(war.id, war.state, war.last_order)
+
+    def __eq__(self, other):
+        return (isinstance(other, RoundProgress)
+                and (self.id, self.state, self.last_order) == (other.id, other.state, other.last_order))
+
+
+# Liga de um clã: o grupo e as guerras já obtidas de todas as rodadas (tag→WarState)
+class League:
+    __slots__ = ('group', 'wars')
+
+    def __init__(self, group, wars):
+        self.group = group
+        self.wars = wars
+
+    @property
+    def state(self):
+        return self.group.state
+
+    @property
+    def season(self):
+        return self.group.season
+
+    # Guerras do clã em cada rodada, do seu lado: [(rodada, WarState)]
+    def clan_wars(self, clan_tag):
+        result = []
+        for number, war_tags in enumerate(self.group.rounds, 1):
+            for war_tag in war_tags:
+                war = self.wars.get(war_tag)
+                if war and clan_tag in (war.clan.tag, war.opponent.tag):
+                    result.append((number, orient_war(war, clan_tag)))
+        return result
+
+    # Guerra atual do clã: a que está em batalha, senão a em preparação, senão a
+    # última terminada. Retorna (rodada, WarState) ou (None, None).
+    def current_war(self, clan_tag):
+        wars = self.clan_wars(clan_tag)
+        for state in ('inWar', 'preparation', 'warEnded'):
+            matching = [(number, war) for number, war in wars if war.state == state]
+            if matching:
+                return matching[0] if state != 'warEnded' else matching[-1]
+        return None, None
+
+    # Classificação do grupo como no jogo: estrelas (com bônus por vitória) e
+    # depois destruição total. [(tag, nome, estrelas, destruição, vitórias)]
+    def standings(self):
+        table = {tag: [name, 0, 0.0, 0] for tag, name in self.group.clans.items()}
+        for war in self.wars.values():
+            if war.state not in ('inWar', 'warEnded'):
+                continue
+            team_size = war.team_size or 0
+            for side in (war.clan, war.opponent):
+                row = table.get(side.tag)
+                if row is not None:
+                    row[1] += side.stars
+                    row[2] += side.destruction * team_size
+            if war.state == 'warEnded':
+                row = table.get(war_winner(war))
+                if row is not None:
+                    row[1] += CWL_WIN_BONUS
+                    row[3] += 1
+        ranking = [(tag, name, stars, destruction, wins) for tag, (name, stars, destruction, wins) in table.items()]
+        ranking.sort(key=lambda r: (r[2], r[3]), reverse=True)
+        return ranking
@@ -0,0 +1,413 @@
+import asyncio
+
+from metrics import EVENT_DELIVERY_RETRIES, EVENTS_EMITTED
+from notifications import pack_messages
+from ratelimit import RateGovernor
+
+
+# Eventos detectados pelas tarefas de monitoramento. Cada evento sabe de qual clã
+# veio (`clan_tag`), qual tarefa o gerou (`source`) e como vira texto (`render`).
+
+class Event:
+    __slots__ = ('clan_tag',)
+    source = None
+
+    def __init__(self, clan_tag):
+        self.clan_tag = clan_tag
+
+    def render(self):
+        raise NotImplementedError
+
+
+# Eventos da verificação de membros e doações
+
+class MemberJoined(Event):
+    __slots__ = ('name', 'tag')
+    source = "check_clan_status"
+
+    def __init__(self, clan_tag, name, tag):
+        super().__init__(clan_tag)
+        self.name = name
+        self.tag = tag
+
+    def render(self):
+        return f"📥 **Novo membro no clã!** {self.name} (#{self.tag[1:]}) entrou no clã!"
+
+
+class MemberLeft(MemberJoined):
+    __slots__ = ()
+
+    def render(self):
+        return f"📤 **Membro saiu do clã!** {self.name} (#{self.tag[1:]}) saiu do clã!"
+
+
+class Donation(Event):
+    __slots__ = ('name', 'amount', 'total')
+    source = "check_clan_status"
+
+    def __init__(self, clan_tag, name, amount, total):
+        super().__init__(clan_tag)
+        self.name = name
+        self.amount = amount
+        self.total = total
+
+    def render(self):
+        return f"🎁 **Doações:** {self.name} doou {self.amount} tropas! (Total: {self.total})"
+
+
+class DonationReceived(Donation):
+    __slots__ = ()
+
+    def render(self):
+        return f"📦 **Recebimentos:** {self.name} recebeu {self.amount} tropas! (Total: {self.total})"
+
+
+# Eventos da verificação de guerra
+
+class WarStateChanged(Event):
+    __slots__ = ('state', 'clan_name', 'opponent_name', 'team_size', 'start_time', 'end_time',
+                 'clan_stars', 'opponent_stars', 'clan_destruction', 'opponent_destruction', 'league_round')
+    source = "check_war_status"
+
+    # `league_round` é a rodada, nas guerras da Liga de Clãs
+    def __init__(self, clan_tag, war, league_round=None):
+        super().__init__(clan_tag)
+        self.league_round = league_round
+        self.state = war.state
+        self.clan_name = war.clan.name or 'Nosso Clã'
+        self.opponent_name = war.opponent.name or 'Oponente'
+        self.team_size = war.team_size
+        self.start_time = war.start_time
+        self.end_time = war.end_time
+        self.clan_stars = war.clan.stars
+        self.opponent_stars = war.opponent.stars
+        self.clan_destruction = war.clan.destruction
+        self.opponent_destruction = war.opponent.destruction
+
+    def render(self):
+        league = f" (Liga de Clãs, rodada {self.league_round})" if self.league_round else ""
+        if self.state == 'preparation':
+            team_size = self.team_size or '?'
+            return (f"⚔️ **Preparação para guerra iniciada!**{league}\n"
+                    f"**{self.clan_name}** vs **{self.opponent_name}**\n"
+                    f"Guerra de {team_size} vs {team_size}\n"
+                    f"A fase de batalha começa em {self.start_time or 'horário desconhecido'}")
+
+        if self.state == 'inWar':
+            return (f"🔥 **A guerra começou!**{league}\n"
+                    f"**{self.clan_name}** vs **{self.opponent_name}**\n"
+                    f"A guerra termina em {self.end_time or 'horário desconhecido'}")
+
+        # warEnded: resultado da guerra
+        result = "Empate!"
+        if self.clan_stars > self.opponent_stars:
+            result = f"**{self.clan_name}** venceu! 🎉"
+        elif self.opponent_stars > self.clan_stars:
+            result = f"**{self.opponent_name}** venceu! 😢"
+        elif self.clan_destruction > self.opponent_destruction:
+            result = f"**{self.clan_name}** venceu por porcentagem de destruição! 🎉"
+        elif self.opponent_destruction > self.clan_destruction:
+            result = f"**{self.opponent_name}** venceu por porcentagem de destruição! 😢"
+
+        return (f"🏁 **Guerra terminada!**{league}\n"
+                f"**{self.clan_name}** {self.clan_stars}⭐ ({self.clan_destruction:.2f}%)\n"
+                f"**{self.opponent_name}** {self.opponent_stars}⭐ ({self.opponent_destruction:.2f}%)\n"
+                f"Resultado: {result}")
+
+
+# `missed` é uma lista de (nome, ataques não usados)
+class MissedAttacks(Event):
+    __slots__ = ('missed',)
+    source = "check_war_status"
+
+    def __init__(self, clan_tag, missed):
+        super().__init__(clan_tag)
+        self.missed = missed
+
+    def render(self):
+        missed_msg = "❌ **Membros que não usaram todos os ataques:**\n```\n"
+        for name, missed in self.missed:
+            missed_msg += f"{name}: {missed} {'ataque' if missed == 1 else 'ataques'} não usado(s)\n"
+        missed_msg += "```"
+        return missed_msg
+
+
+# Ataque de guerra; `side` é o lado do atacante ('clan' ou 'opponent')
+class WarAttackMade(Event):
+    __slots__ = ('side', 'attacker_name', 'defender_name', 'stars', 'destruction')
+    source = "check_war_status"
+
+    def __init__(self, clan_tag, side, attacker_name, defender_name, stars, destruction):
+        super().__init__(clan_tag)
+        self.side = side
+        self.attacker_name = attacker_name
+        self.defender_name = defender_name
+        self.stars = stars
+        self.destruction = destruction
+
+    def render(self):
+        stars = "⭐" * self.stars
+        if self.side == 'clan':
+            return f"⚔️ **Novo ataque!** {self.attacker_name} atacou {self.defender_name} e conseguiu {stars} ({self.destruction}%)"
+        return f"🛡️ **Fomos atacados!** {self.attacker_name} atacou {self.defender_name} e conseguiu {stars} ({self.destruction}%)"
+
+
+# Eventos da verificação da Capital
+
+class CapitalSeasonStarted(Event):
+    __slots__ = ('start_time', 'end_time')
+    source = "check_clan_capital_status"
+
+    def __init__(self, clan_tag, start_time, end_time):
+        super().__init__(clan_tag)
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def render(self):
+        return (f"🏛️ **Nova temporada da Capital do Clã iniciada!**\n"
+                f"Período: {self.start_time or 'desconhecido'} até {self.end_time or 'desconhecido'}")
+
+
+class CapitalSeasonSummary(Event):
+    __slots__ = ('total_attacks', 'offensive_reward', 'defensive_reward')
+    source = "check_clan_capital_status"
+
+    def __init__(self, clan_tag, total_attacks, offensive_reward, defensive_reward):
+        super().__init__(clan_tag)
+        self.total_attacks = total_attacks
+        self.offensive_reward = offensive_reward
+        self.defensive_reward = defensive_reward
+
+    def render(self):
+        return (f"🏆 **Resumo da temporada anterior:**\n"
+                f"Total de ataques: {self.total_attacks}\n"
+                f"Recompensas ofensivas: {self.offensive_reward} medalhas\n"
+                f"Recompensas defensivas: {self.defensive_reward} medalhas\n"
+                f"Total: {self.offensive_reward + self.defensive_reward} medalhas")
+
+
+# `contributions` é uma lista de (nome, ouro ganho desde a última verificação)
+class CapitalContributions(Event):
+    __slots__ = ('contributions',)
+    source = "check_clan_capital_status"
+
+    def __init__(self, clan_tag, contributions):
+        super().__init__(clan_tag)
+        self.contributions = contributions
+
+    def render(self):
+        contributions_log = "".join(f"{name}: +{gold} ouro\n" for name, gold in self.contributions)
+        return f"💰 **Novas contribuições para a Capital do Clã:**\n```\n{contributions_log}```"
+
+
+class CapitalRaidAttack(Event):
+    __slots__ = ('attacker_name', 'defender_name', 'destruction')
+    source = "check_clan_capital_status"
+
+    def __init__(self, clan_tag, attacker_name, defender_name, destruction):
+        super().__init__(clan_tag)
+        self.attacker_name = attacker_name
+        self.defender_name = defender_name
+        self.destruction = destruction
+
+    def render(self):
+        return f"⚔️ **Ataque na Capital do Clã!** {self.attacker_name} atacou {self.defender_name} e conseguiu {self.destruction}% de destruição!"
+
+
+# Relatórios agendados (veja jobs.py)
+
+# `members` é uma lista de (nome, troféus, liga) já ordenada
+class TrophyReport(Event):
+    __slots__ = ('members',)
+    source = "scheduled_reports"
+
+    def __init__(self, clan_tag, members):
+        super().__init__(clan_tag)
+        self.members = members
+
+    def render(self):
+        trophy_log = "📊 **Registro diário de troféus**\n```\n"
+        trophy_log += f"{'Nome':<15} | {'Troféus':<7} | {'Liga':<20}\n"
+        trophy_log += "-" * 50 + "\n"
+        for name, trophies, league in self.members:
+            trophy_log += f"{name[:15]:<15} | {trophies:<7} | {league or 'Sem Liga':<20}\n"
+        trophy_log += "```"
+        return trophy_log
+
+
+# `members` é uma lista de (nome, doações, recebidas) já ordenada
+class DonationReport(Event):
+    __slots__ = ('members',)
+    source = "scheduled_reports"
+
+    def __init__(self, clan_tag, members):
+        super().__init__(clan_tag)
+        self.members = members
+
+    def render(self):
+        report = "🎁 **Relatório semanal de doações**\n```\n"
+        report += f"{'Posição':<8} | {'Nome':<15} | {'Doações':<8} | {'Recebidas':<9}\n"
+        report += "-" * 48 + "\n"
+        for i, (name, donations, received) in enumerate(self.members, 1):
+            report += f"{i:<8} | {name[:15]:<15} | {donations:<8} | {received:<9}\n"
+        report += "```"
+        return report
+
+
+# Guerras do clã na semana: `record` é (vitórias, empates, derrotas) no total e
+# `previous` o mesmo na semana anterior (None no primeiro relatório)
+class WarSummaryReport(Event):
+    __slots__ = ('record', 'previous', 'win_streak', 'war_state', 'opponent_name')
+    source = "scheduled_reports"
+
+    def __init__(self, clan_tag, record, previous, win_streak, war_state=None, opponent_name=None):
+        super().__init__(clan_tag)
+        self.record = record
+        self.previous = previous
+        self.win_streak = win_streak
+        self.war_state = war_state
+        self.opponent_name = opponent_name
+
+    def render(self):
+        labels = ("Vitórias", "Empates", "Derrotas")
+        lines = ["📅 **Resumo semanal de guerras**"]
+        for i, label in enumerate(labels):
+            line = f"{label}: {self.record[i]}"
+            if self.previous is not None:
+                line += f" (+{self.record[i] - self.previous[i]} na semana)"
+            lines.append(line)
+        lines.append(f"Sequência de vitórias: {self.win_streak}")
+        if self.war_state == 'preparation':
+            lines.append(f"Guerra atual: preparação contra **{self.opponent_name or 'Oponente'}**")
+        elif self.war_state == 'inWar':
+            lines.append(f"Guerra atual: em andamento contra **{self.opponent_name or 'Oponente'}**")
+        return "\n".join(lines)
+
+
+# Pipeline entre a detecção e a entrega: as tarefas de monitoramento publicam
+# eventos com `emit` e seguem para a próxima verificação; workers consomem os
+# eventos e os entregam ao Discord.
+#
+# Cada clã é atendido sempre pelo mesmo worker (uma fila limitada por worker),
+# o que mantém a ordem das mensagens de um canal e permite entregar canais
+# diferentes em paralelo. Quando a fila enche, `emit` espera (backpressure) em
+# vez de acumular eventos sem limite. O worker espera `batch_window` segundos
+# após o primeiro evento para juntar os eventos da mesma rodada em poucas
+# mensagens. Envios que falham são repetidos com espera exponencial.
+#
+# `resolve_channels(clan_tag, source)` devolve os destinos do clã (canais e
+# webhooks, cada um com `id` e `send`). As mensagens são montadas uma vez e
+# entregues a todos os destinos em paralelo, cada destino limitado a
+# `destination_rate` mensagens por segundo (rajadas de até `destination_burst`).
+class EventPipeline:
+    def __init__(self, resolve_channels, maxsize=1000, workers=4, batch_window=1.0, max_batch=500,
+                 max_retries=3, retry_delay=1.0, destination_rate=1.0, destination_burst=5):
+        self.resolve_channels = resolve_channels
+        self.destination_rate = destination_rate
+        self.destination_burst = destination_burst
+        self._governors = {}
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        workers = max(1, workers)
+        self._queues = [asyncio.Queue(max(1, maxsize // workers)) for _ in range(workers)]
+        self._workers = []
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    # Eventos aguardando entrega
+    def qsize(self):
+        return sum(queue.qsize() for queue in self._queues)
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._work(queue)) for queue in self._queues]
+
+    # Espera a entrega do que já está nas filas e encerra os workers
+    async def stop(self, timeout=10):
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"{self.qsize()} notificações descartadas ao encerrar")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # Espera até que todos os eventos publicados tenham sido processados
+    async def join(self):
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+
+    async def emit(self, event):
+        EVENTS_EMITTED.inc(type=type(event).__name__)
+        await self._queues[hash(event.clan_tag) % len(self._queues)].put(event)
+
+    async def _work(self, queue):
+        while True:
+            batch = [await queue.get()]
+            try:
+                if self.batch_window:
+                    await asyncio.sleep(self.batch_window)
+                while len(batch) < self.max_batch and not queue.empty():
+                    batch.append(queue.get_nowait())
+                await self._deliver(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro ao entregar notificações: {e}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    # Agrupa os eventos por clã e tarefa, mantendo a ordem, e envia cada grupo
+    # no menor número de mensagens possível
+    async def _deliver(self, batch):
+        groups = {}
+        for event in batch:
+            groups.setdefault((event.clan_tag, event.source), []).append(event)
+        for (clan_tag, source), events in groups.items():
+            # Uma falha num grupo (ou num destino) não impede a entrega dos demais
+            try:
+                channels = self.resolve_channels(clan_tag, source)
+                if not channels:
+                    continue
+                messages = pack_messages([event.render() for event in events])
+            except Exception as e:
+                print(f"Erro ao preparar as notificações de {clan_tag} ({source}): {e}")
+                continue
+            results = await asyncio.gather(*(self._send_all(channel, messages) for channel in channels),
+                                           return_exceptions=True)
+            for channel, result in zip(channels, results):
+                if isinstance(result, Exception):
+                    print(f"Erro ao entregar notificações de {clan_tag} no canal {channel.id}: {result}")
+
+    # Envia as mensagens a um destino, na ordem, respeitando o limite do destino
+    async def _send_all(self, channel, messages):
+        governor = None
+        if self.destination_rate:
+            governor = self._governors.get(channel.id)
+            if governor is None:
+                governor = self._governors[channel.id] = RateGovernor(self.destination_rate, self.destination_burst)
+        for message in messages:
+            if governor is not None:
+                await governor.acquire()
+            await self._send(channel, message)
+
+    async def _send(self, channel, message):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await channel.send(message)
+            except Exception as e:
+                # Erros do cliente (sem permissão, canal apagado...) não adiantam repetir
+                status = getattr(e, 'status', None)
+                client_error = status is not None and 400 <= status < 500 and status != 429
+                if client_error or attempt == self.max_retries:
+                    print(f"Erro ao enviar notificação para o canal {channel.id}: {e}")
+                    return None
+                EVENT_DELIVERY_RETRIES.inc()
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
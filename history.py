@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS member_samples (
+    clan_tag TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    trophies INTEGER,
+    donations INTEGER,
+    donations_received INTEGER
+);
+CREATE INDEX IF NOT EXISTS member_samples_ts ON member_samples (ts);
+CREATE TABLE IF NOT EXISTS member_history_hourly (
+    clan_tag TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    trophies_min INTEGER,
+    trophies_max INTEGER,
+    trophies_last INTEGER,
+    donations_last INTEGER,
+    received_last INTEGER,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (clan_tag, tag, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS member_history_daily (
+    clan_tag TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    trophies_min INTEGER,
+    trophies_max INTEGER,
+    trophies_last INTEGER,
+    donations_last INTEGER,
+    received_last INTEGER,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (clan_tag, tag, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS clan_history_hourly (
+    clan_tag TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    points INTEGER,
+    members INTEGER,
+    donations INTEGER,
+    received INTEGER,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (clan_tag, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS clan_history_daily (
+    clan_tag TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    points INTEGER,
+    members INTEGER,
+    donations INTEGER,
+    received INTEGER,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (clan_tag, bucket)
+) WITHOUT ROWID;
+"""
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Resoluções disponíveis: (tamanho do intervalo em segundos, sufixo das tabelas)
+RESOLUTIONS = {"hourly": HOUR, "daily": DAY}
+
+
+# Histórico dos membros e do clã. Cada verificação de memberList é gravada em
+# `member_samples` (mantidas por `raw_retention` segundos) e, na mesma transação,
+# agregada nas tabelas por hora e por dia (mínimo, máximo e último valor). As
+# consultas leem só os agregados, indexados por (clã, membro, intervalo), sem
+# percorrer as amostras. Os intervalos seguem o fuso local (`utc_offset` em
+# segundos). Os métodos bloqueiam; use asyncio.to_thread.
+class HistoryStore:
+    def __init__(self, path, raw_retention=7 * DAY, utc_offset=None):
+        self.path = path
+        self.raw_retention = raw_retention
+        self.utc_offset = time.localtime().tm_gmtoff if utc_offset is None else utc_offset
+        self.conn = None
+        self._lock = threading.Lock()
+        self._pruned_at = 0
+
+    def open(self):
+        if self.conn is not None:
+            return
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            with self._lock:
+                self.conn.close()
+            self.conn = None
+
+    # Início do intervalo de `size` segundos que contém `ts`
+    def bucket(self, ts, size):
+        return ts - (ts + self.utc_offset) % size
+
+    # Grava uma verificação dos membros (ClanMember) e os pontos do clã
+    def record(self, clan_tag, clan_points, members, ts=None):
+        ts = int(ts if ts is not None else time.time())
+        samples = [(clan_tag, m.tag, ts, m.trophies, m.donations, m.donations_received) for m in members.values()]
+        donations = sum(m.donations or 0 for m in members.values())
+        received = sum(m.donations_received or 0 for m in members.values())
+
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO member_samples (clan_tag, tag, ts, trophies, donations, donations_received) VALUES (?, ?, ?, ?, ?, ?)",
+                samples
+            )
+            for suffix, size in RESOLUTIONS.items():
+                bucket = self.bucket(ts, size)
+                self.conn.executemany(
+                    f"INSERT INTO member_history_{suffix} (clan_tag, tag, bucket, trophies_min, trophies_max, trophies_last, "
+                    f"donations_last, received_last, samples) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1) "
+                    f"ON CONFLICT (clan_tag, tag, bucket) DO UPDATE SET "
+                    f"trophies_min = MIN(trophies_min, excluded.trophies_min), "
+                    f"trophies_max = MAX(trophies_max, excluded.trophies_max), "
+                    f"trophies_last = excluded.trophies_last, donations_last = excluded.donations_last, "
+                    f"received_last = excluded.received_last, samples = samples + 1",
+                    [(clan_tag, tag, bucket, trophies, trophies, trophies, d, r) for _, tag, _, trophies, d, r in samples]
+                )
+                self.conn.execute(
+                    f"INSERT INTO clan_history_{suffix} (clan_tag, bucket, points, members, donations, received, samples) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, 1) "
+                    f"ON CONFLICT (clan_tag, bucket) DO UPDATE SET points = excluded.points, members = excluded.members, "
+                    f"donations = excluded.donations, received = excluded.received, samples = samples + 1",
+                    (clan_tag, bucket, clan_points, len(members), donations, received)
+                )
+            # Descarta as amostras antigas uma vez por hora
+            if ts - self._pruned_at >= HOUR:
+                self.conn.execute("DELETE FROM member_samples WHERE ts < ?", (ts - self.raw_retention,))
+                self._pruned_at = ts
+            self.conn.commit()
+
+    # Série do clã desde `since`: [(início do intervalo, pontos, membros, doações, recebidas)]
+    def clan_series(self, clan_tag, since, resolution="daily"):
+        size = RESOLUTIONS[resolution]
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT bucket, points, members, donations, received FROM clan_history_{resolution} "
+                f"WHERE clan_tag = ? AND bucket >= ? ORDER BY bucket",
+                (clan_tag, self.bucket(int(since), size))
+            ).fetchall()
+
+    # Série de um membro desde `since`:
+    # [(início do intervalo, troféus mín., máx., último, doações, recebidas)]
+    def member_series(self, clan_tag, member_tag, since, resolution="daily"):
+        size = RESOLUTIONS[resolution]
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT bucket, trophies_min, trophies_max, trophies_last, donations_last, received_last "
+                f"FROM member_history_{resolution} WHERE clan_tag = ? AND tag = ? AND bucket >= ? ORDER BY bucket",
+                (clan_tag, member_tag, self.bucket(int(since), size))
+            ).fetchall()
@@ -0,0 +1,123 @@
+import datetime
+
+# Limites de cada campo de uma expressão cron: minuto, hora, dia do mês, mês e
+# dia da semana (0 ou 7 = domingo)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+# Converte um campo cron (*, 5, 1-5, 1,15, */10, 0-30/5) no conjunto de valores aceitos
+def parse_cron_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Campo cron inválido: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+# Agenda no formato cron de 5 campos ("minuto hora dia mês dia-da-semana"), ex.:
+# "0 0 * * *" todo dia à meia-noite, "0 20 * * 0" aos domingos às 20h
+class CronSchedule:
+    def __init__(self, spec):
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"Agenda cron deve ter 5 campos: {spec}")
+        self.spec = spec
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        # Como no cron: se dia do mês e dia da semana forem restritos, basta um deles
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _matches_day(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if moment.month not in self.months:
+            return False
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    # Último horário agendado até `now` (inclusive), ou None se não houver no último ano
+    def previous(self, now):
+        now = now.replace(second=0, microsecond=0)
+        day = now
+        for _ in range(366):
+            if self._matches_day(day):
+                for hour in sorted(self.hours, reverse=True):
+                    if day.date() == now.date() and hour > now.hour:
+                        continue
+                    for minute in sorted(self.minutes, reverse=True):
+                        if day.date() == now.date() and hour == now.hour and minute > now.minute:
+                            continue
+                        return day.replace(hour=hour, minute=minute)
+            day = (day - datetime.timedelta(days=1)).replace(hour=23, minute=59)
+        return None
+
+
+# Tarefa agendada. `run(last_data)` recebe o que a execução anterior devolveu e
+# retorna um dicionário a ser guardado com a marca de execução, ou None se ainda
+# não puder rodar (ex.: sem dados); nesse caso é tentada de novo no próximo ciclo.
+class Job:
+    def __init__(self, name, schedule, run):
+        self.name = name
+        self.schedule = schedule
+        self.run = run
+
+
+# Executa cada tarefa uma única vez por período da sua agenda. A última execução
+# de cada tarefa (início do período e dados) é persistida por `save_run`, então
+# um reinício não repete nem perde relatórios. Um período perdido (bot fora do
+# ar) só é recuperado se ainda estiver dentro de `catchup` segundos.
+class JobScheduler:
+    def __init__(self, save_run, catchup=3600):
+        self.save_run = save_run
+        self.catchup = catchup
+        self.jobs = {}
+        self.runs = {}
+
+    def add(self, job):
+        self.jobs[job.name] = job
+
+    # Carrega as últimas execuções: {nome: (início do período em ISO, dados)}
+    def restore(self, runs):
+        self.runs.update(runs)
+
+    def due(self, now):
+        for job in self.jobs.values():
+            period = job.schedule.previous(now)
+            if period is None:
+                continue
+            last_period = self.runs.get(job.name, (None, None))[0]
+            if last_period is not None and last_period >= period.isoformat():
+                continue
+            yield job, period
+
+    async def run_due(self, now):
+        for job, period in list(self.due(now)):
+            last_data = self.runs.get(job.name, (None, None))[1]
+            if (now - period).total_seconds() > self.catchup:
+                # Perdeu o horário (bot fora do ar): marca o período sem executar
+                data = last_data
+            else:
+                try:
+                    data = await job.run(last_data)
+                except Exception as e:
+                    print(f"Erro na tarefa agendada {job.name}: {e}")
+                    continue
+                if data is None:
+                    continue
+            self.runs[job.name] = (period.isoformat(), data)
+            await self.save_run(job.name, period.isoformat(), data)
@@ -0,0 +1,52 @@
+import json
+
+from aiohttp import web
+
+
+# Servidor HTTP de saúde que roda no próprio loop asyncio do bot, sem thread
+# separada. `ready_check` diz se o bot está pronto e `status_provider` monta o
+# relatório de /status; ambos são chamados a cada requisição. `metrics_provider`,
+# se informado, devolve as métricas no formato de texto do Prometheus (/metrics).
+class HealthServer:
+    def __init__(self, ready_check, status_provider, host="0.0.0.0", port=3000, metrics_provider=None):
+        self.ready_check = ready_check
+        self.status_provider = status_provider
+        self.metrics_provider = metrics_provider
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.router.add_get("/", self.home)
+        self.app.router.add_get("/ready", self.ready)
+        self.app.router.add_get("/status", self.status)
+        if metrics_provider is not None:
+            self.app.router.add_get("/metrics", self.metrics)
+        self._runner = None
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # Liveness: o processo está de pé
+    async def home(self, request):
+        return web.Response(text="Genius está online!")
+
+    # Readiness: conectado ao Discord e com a sessão da API aberta
+    async def ready(self, request):
+        if self.ready_check():
+            return web.Response(text="pronto")
+        return web.Response(text="iniciando", status=503)
+
+    async def status(self, request):
+        return web.json_response(self.status_provider(), dumps=lambda data: json.dumps(data, ensure_ascii=False))
+
+    async def metrics(self, request):
+        return web.Response(body=self.metrics_provider().encode("utf-8"),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
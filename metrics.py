@@ -0,0 +1,162 @@
+import math
+import threading
+
+# Métricas no formato de texto do Prometheus, sem dependências externas.
+# Cada métrica é registrada no REGISTRY global e os rótulos são passados como
+# argumentos nomeados: requests.inc(endpoint="/clans/{tag}", status="200").
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    # Todas as métricas no formato de exposição do Prometheus
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    # Soma de todos os rótulos
+    def total(self):
+        return sum(self._values.values())
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(counts[-1])}")
+        return lines
+
+
+# Métricas da API do Clash of Clans
+API_REQUEST_DURATION = Histogram(
+    "coc_api_request_duration_seconds", "Latência das requisições à API do Clash of Clans", ("endpoint",)
+)
+API_RESPONSES = Counter(
+    "coc_api_responses_total", "Respostas da API do Clash of Clans por código de status", ("endpoint", "status")
+)
+API_CACHE_LOOKUPS = Counter(
+    "coc_api_cache_lookups_total", "Consultas ao cache de respostas da API", ("endpoint", "result")
+)
+API_RETRIES = Counter(
+    "coc_api_retries_total", "Requisições à API repetidas após 429, 5xx ou erro de rede", ("endpoint",)
+)
+API_RATE_LIMIT_WAIT = Histogram(
+    "coc_api_rate_limit_wait_seconds", "Tempo de espera no limitador de requisições", ("priority",)
+)
+API_CIRCUIT_OPEN = Gauge("coc_api_circuit_open", "1 quando o disjuntor da API está aberto")
+
+# Métricas das tarefas de monitoramento
+LOOP_DURATION = Histogram(
+    "monitor_loop_duration_seconds", "Duração de cada execução das tarefas de monitoramento", ("loop",),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+LOOP_OVERRUNS = Counter(
+    "monitor_loop_overruns_total", "Execuções que duraram mais que o intervalo da tarefa", ("loop",)
+)
+
+# Métricas de envio de mensagens ao Discord
+DISCORD_MESSAGES = Counter(
+    "discord_messages_sent_total", "Mensagens enviadas ao Discord por origem", ("source",)
+)
+DISCORD_SEND_DURATION = Histogram(
+    "discord_send_duration_seconds", "Latência dos envios de mensagens ao Discord", ("source",)
+)
+DISCORD_SEND_ERRORS = Counter(
+    "discord_send_errors_total", "Falhas ao enviar mensagens ao Discord", ("source",)
+)
+
+# Métricas do pipeline de eventos
+EVENTS_EMITTED = Counter("events_emitted_total", "Eventos publicados pelas tarefas de monitoramento", ("type",))
+EVENT_DELIVERY_RETRIES = Counter("event_delivery_retries_total", "Envios de notificações repetidos após falha")
+EVENT_QUEUE_DEPTH = Gauge("event_queue_depth", "Eventos aguardando entrega")
+
+# Taxa de acerto dos caches (atualizada a cada leitura de /metrics)
+CACHE_HIT_RATE = Gauge("cache_hit_rate", "Taxa de acerto de cada cache", ("cache",))
+CACHE_SIZE = Gauge("cache_entries", "Itens guardados em cada cache", ("cache",))
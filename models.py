@@ -0,0 +1,191 @@
+import sys
+
+
+# Registros compactos (com __slots__) montados uma única vez a partir dos
+# payloads da API. Guardam apenas os campos usados nas comparações e nos
+# comandos, para não manter o JSON bruto em memória entre as verificações.
+
+# Membro do clã (item de memberList)
+class ClanMember:
+    __slots__ = ('tag', 'name', 'role', 'exp_level', 'trophies', 'league', 'donations', 'donations_received')
+
+    def __init__(self, tag, name, role=None, exp_level=None, trophies=0, league=None,
+                 donations=None, donations_received=None):
+        self.tag = tag
+        self.name = name
+        self.role = role
+        self.exp_level = exp_level
+        self.trophies = trophies
+        self.league = league
+        self.donations = donations
+        self.donations_received = donations_received
+
+    @classmethod
+    def from_payload(cls, member):
+        return cls(
+            member['tag'],
+            member.get('name', 'Membro'),
+            role=member.get('role'),
+            exp_level=member.get('expLevel'),
+            trophies=member.get('trophies', 0),
+            league=member.get('league', {}).get('name'),
+            donations=member.get('donations'),
+            donations_received=member.get('donationsReceived')
+        )
+
+
+# Perfil completo de um jogador (/players/{tag}). `heroes` é uma lista de
+# (nome, nível, nível máximo) da vila principal e `achievements` guarda o valor
+# atual de cada conquista.
+class PlayerProfile:
+    __slots__ = ('tag', 'name', 'clan_tag', 'role', 'townhall_level', 'exp_level', 'trophies', 'best_trophies',
+                 'war_stars', 'attack_wins', 'defense_wins', 'donations', 'donations_received',
+                 'capital_contributions', 'league', 'heroes', 'achievements')
+
+    @classmethod
+    def from_payload(cls, player_data):
+        player = cls()
+        player.tag = player_data.get('tag')
+        player.name = player_data.get('name', 'Jogador')
+        player.clan_tag = (player_data.get('clan') or {}).get('tag')
+        player.role = player_data.get('role')
+        player.townhall_level = player_data.get('townHallLevel')
+        player.exp_level = player_data.get('expLevel')
+        player.trophies = player_data.get('trophies', 0)
+        player.best_trophies = player_data.get('bestTrophies', 0)
+        player.war_stars = player_data.get('warStars', 0)
+        player.attack_wins = player_data.get('attackWins', 0)
+        player.defense_wins = player_data.get('defenseWins', 0)
+        player.donations = player_data.get('donations', 0)
+        player.donations_received = player_data.get('donationsReceived', 0)
+        player.capital_contributions = player_data.get('clanCapitalContributions', 0)
+        player.league = (player_data.get('league') or {}).get('name')
+        player.heroes = [(h.get('name'), h.get('level', 0), h.get('maxLevel', 0))
+                         for h in player_data.get('heroes', []) if h.get('village', 'home') == 'home']
+        player.achievements = {a['name']: a.get('value', 0) for a in player_data.get('achievements', []) if 'name' in a}
+        return player
+
+
+# Dados gerais do clã e sua lista de membros (None se a API não enviou memberList)
+class Clan:
+    __slots__ = ('tag', 'name', 'description', 'level', 'points', 'secondary_points', 'member_count',
+                 'type', 'war_frequency', 'war_win_streak', 'war_wins', 'war_ties', 'war_losses',
+                 'location', 'badge_url', 'members')
+
+    @classmethod
+    def from_payload(cls, clan_data):
+        clan = cls()
+        clan.tag = clan_data.get('tag')
+        clan.name = clan_data.get('name')
+        clan.description = clan_data.get('description')
+        clan.level = clan_data.get('clanLevel')
+        clan.points = clan_data.get('clanPoints')
+        # Troféus de guerra ou da Base do Construtor, o que a API enviar: (rótulo, valor)
+        clan.secondary_points = None
+        if 'clanVersusPoints' in clan_data:
+            clan.secondary_points = ("Troféus de Guerra", clan_data['clanVersusPoints'])
+        elif 'warPoints' in clan_data:
+            clan.secondary_points = ("Troféus de Guerra", clan_data['warPoints'])
+        elif 'clanBuilderBasePoints' in clan_data:
+            clan.secondary_points = ("Troféus Base Construtor", clan_data['clanBuilderBasePoints'])
+        clan.member_count = clan_data.get('members', 0)
+        clan.type = clan_data.get('type')
+        clan.war_frequency = clan_data.get('warFrequency')
+        clan.war_win_streak = clan_data.get('warWinStreak', 0)
+        clan.war_wins = clan_data.get('warWins', 0)
+        clan.war_ties = clan_data.get('warTies', 0)
+        clan.war_losses = clan_data.get('warLosses', 0)
+        clan.location = (clan_data.get('location') or {}).get('name')
+        clan.badge_url = clan_data.get('badgeUrls', {}).get('medium')
+        clan.members = None
+        if 'memberList' in clan_data:
+            clan.members = {m['tag']: ClanMember.from_payload(m) for m in clan_data['memberList'] if 'tag' in m}
+        return clan
+
+
+# Contribuição de um membro na temporada da Capital
+class CapitalMember:
+    __slots__ = ('tag', 'name', 'looted')
+
+    def __init__(self, tag, name, looted):
+        self.tag = tag
+        self.name = name
+        self.looted = looted
+
+
+# Ataque do registro de raides da Capital
+class RaidAttack:
+    __slots__ = ('attacker_tag', 'attacker_name', 'defender_tag', 'defender_name', 'destruction')
+
+    def __init__(self, attacker_tag, attacker_name, defender_tag, defender_name, destruction):
+        self.attacker_tag = attacker_tag
+        self.attacker_name = attacker_name
+        self.defender_tag = defender_tag
+        self.defender_name = defender_name
+        self.destruction = destruction
+
+    # Chave usada para reconhecer um ataque já visto
+    @property
+    def key(self):
+        return (self.attacker_tag, self.defender_tag, self.destruction)
+
+
+# Temporada de raides da Capital. `members` e `attack_log` são None quando a
+# API não enviou esses campos.
+class CapitalSeason:
+    __slots__ = ('id', 'state', 'start_time', 'end_time', 'total_attacks', 'districts_destroyed',
+                 'offensive_reward', 'defensive_reward', 'members', 'attack_log')
+
+    @classmethod
+    def from_payload(cls, season_data):
+        season = cls()
+        season.id = season_data.get('id')
+        season.state = season_data.get('state')
+        season.start_time = season_data.get('startTime')
+        season.end_time = season_data.get('endTime')
+        season.total_attacks = season_data.get('totalAttacks', 0)
+        season.districts_destroyed = season_data.get('districtsDestroyed', 0)
+        season.offensive_reward = season_data.get('offensiveReward', 0)
+        season.defensive_reward = season_data.get('defensiveReward', 0)
+        season.members = None
+        if 'members' in season_data:
+            season.members = {
+                m['tag']: CapitalMember(m['tag'], m.get('name', 'Membro'), m['capitalResourcesLooted'])
+                for m in season_data['members'] if 'tag' in m and 'capitalResourcesLooted' in m
+            }
+        season.attack_log = None
+        if 'attackLog' in season_data:
+            season.attack_log = [
+                RaidAttack(a['attacker'].get('tag', ''), a['attacker'].get('name', 'Membro desconhecido'),
+                           a['defender'].get('tag', ''), a['defender'].get('name', 'Distrito desconhecido'),
+                           a.get('destructionPercentage', 0))
+                for a in season_data['attackLog'] if 'attacker' in a and 'defender' in a
+            ]
+        return season
+
+    # Identificador da temporada (a API nem sempre envia `id`)
+    @property
+    def key(self):
+        return str(self.id or self.start_time or '')
+
+
+# Tamanho aproximado em bytes de um objeto e de tudo que ele referencia
+def deep_sizeof(obj, seen=None):
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(obj, slot):
+                    size += deep_sizeof(getattr(obj, slot), seen)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(obj.__dict__, seen)
+    return size
@@ -0,0 +1,53 @@
+# Limite de caracteres de uma mensagem do Discord
+DISCORD_MESSAGE_LIMIT = 2000
+
+CODE_FENCE = "```"
+
+
+# Divide um texto maior que o limite em pedaços, quebrando nas linhas. Um bloco
+# de código cortado no meio é fechado e reaberto no pedaço seguinte.
+def split_message(text, limit=DISCORD_MESSAGE_LIMIT):
+    if len(text) <= limit:
+        return [text]
+
+    reserve = len(CODE_FENCE) + 1  # espaço para fechar um bloco de código aberto
+    chunks = []
+    current = ""
+    in_code = False
+    for line in text.split("\n"):
+        pieces = [line[i:i + limit - 2 * reserve] for i in range(0, len(line), limit - 2 * reserve)] or [""]
+        for piece in pieces:
+            is_fence = piece.startswith(CODE_FENCE)
+            candidate = f"{current}\n{piece}" if current else piece
+            if current and len(candidate) + (reserve if in_code else 0) > limit:
+                chunks.append(current + ("\n" + CODE_FENCE if in_code else ""))
+                if in_code and is_fence:
+                    # O bloco terminaria aqui; já foi fechado no pedaço anterior
+                    current = ""
+                    in_code = False
+                    continue
+                current = f"{CODE_FENCE}\n{piece}" if in_code else piece
+            else:
+                current = candidate
+            if is_fence:
+                in_code = not in_code
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Junta vários textos no menor número de mensagens dentro do limite
+def pack_messages(texts, limit=DISCORD_MESSAGE_LIMIT, separator="\n"):
+    messages = []
+    current = ""
+    for text in texts:
+        for piece in split_message(text, limit):
+            if current and len(current) + len(separator) + len(piece) <= limit:
+                current += separator + piece
+            else:
+                if current:
+                    messages.append(current)
+                current = piece
+    if current:
+        messages.append(current)
+    return messages
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+from models import PlayerProfile
+
+
+# Perfis dos membros monitorados (tag→PlayerProfile), mantidos pelo
+# PlayerRefresher e lidos pelos comandos e relatórios sem consultar a API
+class MemberCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._profiles = {}
+
+    def get(self, tag):
+        entry = self._profiles.get(tag)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    # Horário (time.time) da última atualização do perfil, ou None
+    def refreshed_at(self, tag):
+        entry = self._profiles.get(tag)
+        return entry[1] if entry else None
+
+    def set(self, profile, refreshed_at=None):
+        self._profiles[profile.tag] = (profile, refreshed_at if refreshed_at is not None else time.time())
+
+    # Descarta os perfis de quem não é mais monitorado
+    def retain(self, tags):
+        for tag in set(self._profiles) - set(tags):
+            del self._profiles[tag]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._profiles),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def __contains__(self, tag):
+        return tag in self._profiles
+
+    def __len__(self):
+        return len(self._profiles)
+
+
+# Atualiza em segundo plano o perfil de cada membro monitorado uma vez por
+# `interval` segundos. As consultas são espaçadas igualmente ao longo do
+# intervalo (com N membros, uma a cada interval/N segundos), sempre pelo perfil
+# nunca consultado ou consultado há mais tempo, então quem entra no clã é
+# atualizado logo na próxima consulta. `member_tags()` devolve as tags
+# monitoradas, `fetch(tag)` o payload do jogador (ou None) e `on_refresh(profile)`,
+# se informado, é aguardado a cada perfil atualizado.
+class PlayerRefresher:
+    def __init__(self, cache, member_tags, fetch, interval=3600, idle_delay=60, on_refresh=None):
+        self.cache = cache
+        self.member_tags = member_tags
+        self.fetch = fetch
+        self.on_refresh = on_refresh
+        self.interval = interval
+        self.idle_delay = idle_delay
+        self._task = None
+        self._attempted = {}  # tag→última consulta (time.monotonic), com ou sem sucesso
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # Tags na ordem de atualização: nunca consultadas primeiro, depois as mais antigas
+    def _queue(self):
+        tags = list(dict.fromkeys(self.member_tags()))
+        self.cache.retain(tags)
+        for tag in set(self._attempted) - set(tags):
+            del self._attempted[tag]
+        return sorted(tags, key=lambda tag: self._attempted.get(tag, 0))
+
+    async def refresh(self, tag):
+        self._attempted[tag] = time.monotonic()
+        player_data = await self.fetch(tag)
+        if player_data:
+            profile = PlayerProfile.from_payload(player_data)
+            self.cache.set(profile)
+            if self.on_refresh is not None:
+                await self.on_refresh(profile)
+
+    async def _run(self):
+        while True:
+            tags = self._queue()
+            if not tags:
+                await asyncio.sleep(self.idle_delay)
+                continue
+            started = time.monotonic()
+            try:
+                await self.refresh(tags[0])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro ao atualizar o perfil do jogador {tags[0]}: {e}")
+            await asyncio.sleep(max(0.0, self.interval / len(tags) - (time.monotonic() - started)))
@@ -0,0 +1,157 @@
+import asyncio
+import contextvars
+import datetime
+import email.utils
+import heapq
+import itertools
+import random
+import time
+
+# Prioridades das requisições à API: quanto menor, antes é atendida
+INTERACTIVE = 0   # comandos dos usuários
+BACKGROUND = 1    # tarefas de monitoramento
+
+# Prioridade das requisições feitas no contexto atual. Os comandos a trocam
+# para INTERACTIVE; tarefas criadas a partir deles herdam o valor.
+api_priority = contextvars.ContextVar("api_priority", default=BACKGROUND)
+
+
+# Lê o cabeçalho Retry-After (segundos ou data HTTP); None se ausente ou inválido
+def retry_after_seconds(headers):
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (moment - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+# Espera exponencial com jitter completo: aleatória entre 0 e base * 2^tentativa
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# Token bucket com prioridades: libera até `rate` requisições por segundo, com
+# rajadas de até `burst`. Quando não há fichas, quem espera é atendido por
+# prioridade e, dentro da mesma prioridade, por ordem de chegada. `pause`
+# suspende todas as liberações (ex.: após um 429 com Retry-After).
+class RateGovernor:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._dispatcher = None
+
+    # Requisições aguardando uma ficha
+    @property
+    def waiting(self):
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _refill(self):
+        now = time.monotonic()
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    async def acquire(self, priority=BACKGROUND):
+        if self.rate <= 0:
+            # Sem limite de taxa, mas ainda respeitando uma pausa
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return
+        self._refill()
+        if not self._waiters and self._tokens >= 1 and time.monotonic() >= self._paused_until:
+            self._tokens -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+    # Suspende as liberações por `seconds` segundos; as fichas voltam a encher só depois
+    def pause(self, seconds):
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self._tokens = 0.0
+            self._updated = until
+
+    async def _dispatch(self):
+        while self._waiters:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():  # quem esperava desistiu (cancelado)
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+
+# Disjuntor da API: depois de `failure_threshold` falhas seguidas (ou de um aviso
+# de manutenção) fica aberto por `reset_timeout` segundos, recusando requisições.
+# Depois disso deixa passar uma única requisição de teste: se ela funcionar o
+# disjuntor fecha, se falhar abre de novo.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._open_until = None
+        self._probing = None  # início da requisição de teste em andamento
+
+    @property
+    def state(self):
+        if self._open_until is None:
+            return "closed"
+        if time.monotonic() < self._open_until:
+            return "open"
+        return "half_open"
+
+    # Segundos até a próxima requisição de teste (0 se fechado)
+    def retry_in(self):
+        if self._open_until is None:
+            return 0.0
+        return max(0.0, self._open_until - time.monotonic())
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        # Uma requisição de teste que não terminou (ex.: cancelada) expira
+        if state == "open" or (self._probing is not None and now - self._probing < self.reset_timeout):
+            return False
+        self._probing = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self._open_until = None
+        self._probing = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing is not None or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self, duration=None):
+        self._open_until = time.monotonic() + (duration if duration else self.reset_timeout)
+        self._probing = None
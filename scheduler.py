@@ -0,0 +1,88 @@
+import datetime
+
+# Intervalos de verificação da guerra (em segundos)
+WAR_POLL_IDLE_MIN = 15 * 60      # fora de guerra: começa em 15 minutos...
+WAR_POLL_IDLE_MAX = 60 * 60      # ...e dobra a cada verificação até 1 hora
+WAR_POLL_PREPARATION = 30 * 60   # preparação: até o início da batalha
+WAR_POLL_BATTLE = 5 * 60         # dia de batalha
+WAR_POLL_FINAL_HOUR = 2 * 60     # última hora da guerra
+WAR_POLL_ENDED = 30 * 60         # guerra terminada, esperando a próxima
+WAR_POLL_RETRY = 5 * 60          # falha ao consultar a API
+
+# Intervalos de verificação da Capital (em segundos)
+CAPITAL_POLL_RAID = 30 * 60      # durante o fim de semana de raides
+CAPITAL_POLL_IDLE_MAX = 12 * 3600
+CAPITAL_POLL_RETRY = 5 * 60      # falha ao consultar a API
+
+# O fim de semana de raides vai de sexta às 07:00 UTC até segunda às 07:00 UTC
+RAID_WEEKEND_START = (4, 7)      # (dia da semana, hora)
+RAID_WEEKEND_LENGTH = datetime.timedelta(days=3)
+
+MIN_POLL = 60
+
+
+# Converte um horário da API (ex.: 20240105T080000.000Z) em datetime UTC
+def parse_api_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value, "%Y%m%dT%H%M%S.%fZ").replace(tzinfo=datetime.timezone.utc)
+    except ValueError:
+        return None
+
+
+def _seconds_until(moment, now):
+    return (moment - now).total_seconds()
+
+
+# Segundos até a próxima verificação da guerra, de acordo com o estado atual.
+# `idle_polls` é quantas verificações seguidas encontraram o clã fora de guerra.
+def war_poll_delay(war, idle_polls, now):
+    if war is None:
+        return WAR_POLL_RETRY
+    if war.state == 'notInWar':
+        return min(WAR_POLL_IDLE_MAX, WAR_POLL_IDLE_MIN * 2 ** max(0, idle_polls - 1))
+    if war.state == 'preparation':
+        start = parse_api_time(war.start_time)
+        if start is None:
+            return WAR_POLL_PREPARATION
+        return max(MIN_POLL, min(WAR_POLL_PREPARATION, _seconds_until(start, now) + MIN_POLL))
+    if war.state == 'inWar':
+        end = parse_api_time(war.end_time)
+        if end is None:
+            return WAR_POLL_BATTLE
+        remaining = _seconds_until(end, now)
+        if remaining <= 3600:
+            # Na última hora, verificar com frequência e uma vez logo após o fim
+            return max(MIN_POLL, min(WAR_POLL_FINAL_HOUR, remaining + MIN_POLL))
+        return max(MIN_POLL, min(WAR_POLL_BATTLE, remaining - 3600))
+    return WAR_POLL_ENDED
+
+
+# Início e fim do fim de semana de raides em andamento ou do próximo
+def raid_weekend(now):
+    weekday, hour = RAID_WEEKEND_START
+    start = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    start -= datetime.timedelta(days=(start.weekday() - weekday) % 7)
+    if start > now:
+        start -= datetime.timedelta(days=7)
+    end = start + RAID_WEEKEND_LENGTH
+    if now >= end:
+        start += datetime.timedelta(days=7)
+        end += datetime.timedelta(days=7)
+    return start, end
+
+
+# Segundos até a próxima verificação da Capital: a cada CAPITAL_POLL_RAID durante
+# o fim de semana de raides (com uma verificação logo após o término) e, fora
+# dele, apenas quando o próximo começar. Usa os horários da temporada, se houver.
+def capital_poll_delay(season, now):
+    start, end = raid_weekend(now)
+    if season is not None and season.state == 'ongoing':
+        season_end = parse_api_time(season.end_time)
+        if season_end is not None and season_end > now:
+            start, end = min(start, now), season_end
+
+    if start <= now < end:
+        return max(MIN_POLL, min(CAPITAL_POLL_RAID, _seconds_until(end, now) + MIN_POLL))
+    return max(MIN_POLL, min(CAPITAL_POLL_IDLE_MAX, _seconds_until(start, now) + MIN_POLL))
@@ -0,0 +1,69 @@
+import bisect
+import unicodedata
+
+
+# Forma usada na busca: sem acentos e sem diferença entre maiúsculas e minúsculas
+def search_key(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold().strip()
+
+
+# Índice de prefixos dos nomes dos membros monitorados, para o autocompletar dos
+# comandos de barra. Cada nome entra uma vez inteiro e uma vez a partir de cada
+# palavra ("João Silva" é achado por "jo" e por "sil"). As entradas ficam numa
+# lista ordenada, remontada só depois que a lista de membros de um clã muda, e
+# cada busca é um bisect seguido da leitura das entradas com o prefixo.
+class MemberIndex:
+    def __init__(self):
+        self._clans = {}
+        self._keys = []
+        self._entries = []
+        self._dirty = False
+
+    # Substitui os membros (tag→ClanMember) de um clã; o índice só é remontado
+    # se algum membro entrou, saiu ou mudou de nome
+    def update(self, clan_tag, members):
+        entries = sorted((member.tag, member.name) for member in (members or {}).values())
+        if self._clans.get(clan_tag) != entries:
+            self._clans[clan_tag] = entries
+            self._dirty = True
+
+    def remove(self, clan_tag):
+        if self._clans.pop(clan_tag, None) is not None:
+            self._dirty = True
+
+    def _build(self):
+        entries = []
+        for clan_tag, members in self._clans.items():
+            for tag, name in members:
+                words = search_key(name).split()
+                for i in range(len(words)):
+                    entries.append((" ".join(words[i:]), name or tag, tag, clan_tag))
+        entries.sort()
+        self._keys = [entry[0] for entry in entries]
+        self._entries = entries
+        self._dirty = False
+
+    # Membros cujo nome (ou uma palavra do nome) começa com `prefix`:
+    # [(tag, nome, tag do clã)], no máximo `limit`, sem repetir membros. Com
+    # `clan_tags`, só os membros desses clãs.
+    def search(self, prefix, clan_tags=None, limit=25):
+        if self._dirty:
+            self._build()
+        key = search_key(prefix)
+        result = []
+        seen = set()
+        for i in range(bisect.bisect_left(self._keys, key), len(self._keys)):
+            if not self._keys[i].startswith(key):
+                break
+            _, name, tag, clan_tag = self._entries[i]
+            if tag in seen or (clan_tags is not None and clan_tag not in clan_tags):
+                continue
+            seen.add(tag)
+            result.append((tag, name, clan_tag))
+            if len(result) >= limit:
+                break
+        return result
+
+    def __len__(self):
+        return sum(len(members) for members in self._clans.values())
@@ -0,0 +1,477 @@
+import json
+import sqlite3
+import threading
+
+from models import CapitalSeason, ClanMember
+from cwl import RoundProgress
+from war import WarState, war_archive_rows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    clan_tag TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    name TEXT NOT NULL,
+    donations INTEGER,
+    donations_received INTEGER,
+    PRIMARY KEY (clan_tag, tag)
+);
+CREATE TABLE IF NOT EXISTS wars (
+    clan_tag TEXT PRIMARY KEY,
+    war_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS war_attacks (
+    clan_tag TEXT NOT NULL,
+    war_id TEXT NOT NULL,
+    side TEXT NOT NULL,
+    attacker_tag TEXT NOT NULL,
+    defender_tag TEXT NOT NULL,
+    stars INTEGER NOT NULL,
+    destruction REAL NOT NULL,
+    attack_order INTEGER,
+    PRIMARY KEY (clan_tag, war_id, side, attacker_tag, defender_tag)
+);
+CREATE TABLE IF NOT EXISTS capital_seasons (
+    clan_tag TEXT PRIMARY KEY,
+    season_id TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS capital_members (
+    clan_tag TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    name TEXT NOT NULL,
+    looted INTEGER NOT NULL,
+    PRIMARY KEY (clan_tag, tag)
+);
+CREATE TABLE IF NOT EXISTS capital_attacks (
+    clan_tag TEXT NOT NULL,
+    attacker_tag TEXT NOT NULL,
+    defender_tag TEXT NOT NULL,
+    destruction REAL NOT NULL,
+    PRIMARY KEY (clan_tag, attacker_tag, defender_tag, destruction)
+);
+CREATE TABLE IF NOT EXISTS war_archive (
+    clan_tag TEXT NOT NULL,
+    war_id TEXT NOT NULL,
+    end_time TEXT,
+    team_size INTEGER,
+    opponent_name TEXT,
+    stars INTEGER,
+    opponent_stars INTEGER,
+    destruction REAL,
+    opponent_destruction REAL,
+    PRIMARY KEY (clan_tag, war_id)
+);
+CREATE TABLE IF NOT EXISTS war_archive_members (
+    clan_tag TEXT NOT NULL,
+    war_id TEXT NOT NULL,
+    side TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    name TEXT,
+    townhall_level INTEGER,
+    attacks_allowed INTEGER NOT NULL,
+    attacks_used INTEGER NOT NULL,
+    PRIMARY KEY (clan_tag, war_id, side, tag)
+);
+CREATE TABLE IF NOT EXISTS war_archive_attacks (
+    clan_tag TEXT NOT NULL,
+    war_id TEXT NOT NULL,
+    side TEXT NOT NULL,
+    attacker_tag TEXT NOT NULL,
+    defender_tag TEXT NOT NULL,
+    stars INTEGER NOT NULL,
+    destruction REAL NOT NULL,
+    PRIMARY KEY (clan_tag, war_id, side, attacker_tag, defender_tag)
+);
+CREATE TABLE IF NOT EXISTS war_log (
+    clan_tag TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    result TEXT,
+    team_size INTEGER,
+    opponent_tag TEXT,
+    opponent_name TEXT,
+    stars INTEGER,
+    opponent_stars INTEGER,
+    destruction REAL,
+    opponent_destruction REAL,
+    PRIMARY KEY (clan_tag, end_time)
+);
+CREATE TABLE IF NOT EXISTS capital_history (
+    clan_tag TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT,
+    capital_total_loot INTEGER,
+    raids_completed INTEGER,
+    total_attacks INTEGER,
+    districts_destroyed INTEGER,
+    offensive_reward INTEGER,
+    defensive_reward INTEGER,
+    PRIMARY KEY (clan_tag, start_time)
+);
+CREATE TABLE IF NOT EXISTS league_rounds (
+    clan_tag TEXT NOT NULL,
+    season TEXT,
+    war_id TEXT NOT NULL,
+    state TEXT,
+    last_order INTEGER NOT NULL,
+    PRIMARY KEY (clan_tag, war_id)
+);
+CREATE TABLE IF NOT EXISTS member_activity (
+    tag TEXT PRIMARY KEY,
+    fingerprint TEXT,
+    last_seen REAL NOT NULL,
+    tracked_since REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_runs (
+    job TEXT PRIMARY KEY,
+    period TEXT NOT NULL,
+    data TEXT
+);
+"""
+
+
+# Campos gerais da temporada da Capital, no formato da API
+def capital_summary(season):
+    return {
+        'id': season.id,
+        'state': season.state,
+        'startTime': season.start_time,
+        'endTime': season.end_time,
+        'totalAttacks': season.total_attacks,
+        'districtsDestroyed': season.districts_destroyed,
+        'offensiveReward': season.offensive_reward,
+        'defensiveReward': season.defensive_reward,
+        'hasMembers': season.members is not None,
+        'hasAttackLog': season.attack_log is not None
+    }
+
+
+# Armazena em SQLite (modo WAL) o estado de comparação de cada clã, para que o
+# monitoramento continue de onde parou após um reinício. Só as linhas que mudaram
+# desde a última gravação são escritas. Os métodos bloqueiam; chame-os com
+# asyncio.to_thread a partir do loop do bot.
+class SnapshotDB:
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self._lock = threading.Lock()
+        # Cópia do que já foi gravado, para escrever apenas as diferenças
+        self._members = {}
+        self._wars = {}
+        self._capital = {}
+        self._capital_members = {}
+        self._capital_attacks = {}
+
+    def open(self):
+        if self.conn is not None:
+            return
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            with self._lock:
+                self.conn.close()
+            self.conn = None
+
+    # Grava os membros (ClanMember) e doações de um clã
+    def save_members(self, clan_tag, members):
+        rows = {tag: (member.name, member.donations, member.donations_received) for tag, member in members.items()}
+
+        written = self._members.setdefault(clan_tag, {})
+        changed = [(clan_tag, tag, *row) for tag, row in rows.items() if written.get(tag) != row]
+        removed = [(clan_tag, tag) for tag in written if tag not in rows]
+        if not changed and not removed:
+            return
+
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO members (clan_tag, tag, name, donations, donations_received) VALUES (?, ?, ?, ?, ?)",
+                changed
+            )
+            self.conn.executemany("DELETE FROM members WHERE clan_tag = ? AND tag = ?", removed)
+            self.conn.commit()
+        self._members[clan_tag] = rows
+
+    # Grava o estado da guerra atual (um WarState) e os ataques feitos desde a
+    # última gravação, usando o `order` dos ataques como marca d'água
+    def save_war(self, clan_tag, war):
+        written = self._wars.get(clan_tag)
+        new_war = written is None or written[0] != war.id
+        new_attacks = war.attacks if new_war else war.attacks_since(written[2])
+        if not new_war and written[1] == war.state and not new_attacks:
+            return
+
+        payload = json.dumps({
+            'state': war.state,
+            'teamSize': war.team_size,
+            'preparationStartTime': war.preparation_start_time,
+            'startTime': war.start_time,
+            'endTime': war.end_time,
+            'clan': {'name': war.clan.name, 'tag': war.clan.tag},
+            'opponent': {'name': war.opponent.name, 'tag': war.opponent.tag}
+        })
+        rows = [(clan_tag, war.id, a.side, a.attacker_tag, a.defender_tag, a.stars, a.destruction, a.order)
+                for a in new_attacks]
+        with self._lock:
+            if new_war:
+                self.conn.execute("DELETE FROM war_attacks WHERE clan_tag = ?", (clan_tag,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO wars (clan_tag, war_id, state, payload) VALUES (?, ?, ?, ?)",
+                (clan_tag, war.id, war.state, payload)
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO war_attacks (clan_tag, war_id, side, attacker_tag, defender_tag, stars, destruction, attack_order) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+        self._wars[clan_tag] = (war.id, war.state, war.last_order)
+
+    # Grava a temporada atual da Capital (CapitalSeason), com contribuições e ataques novos
+    def save_capital(self, clan_tag, season):
+        season_id = season.key
+        payload = json.dumps(capital_summary(season), sort_keys=True)
+
+        members = {tag: (member.name, member.looted) for tag, member in (season.members or {}).items()}
+        attacks = {attack.key for attack in season.attack_log or ()}
+
+        new_season = self._capital.get(clan_tag, (None,))[0] != season_id
+        written_members = {} if new_season else self._capital_members.get(clan_tag, {})
+        written_attacks = set() if new_season else self._capital_attacks.get(clan_tag, set())
+        changed_members = [(clan_tag, tag, *row) for tag, row in members.items() if written_members.get(tag) != row]
+        new_attacks = [(clan_tag, *a) for a in attacks - written_attacks]
+        if not new_season and self._capital.get(clan_tag) == (season_id, payload) and not changed_members and not new_attacks:
+            return
+
+        with self._lock:
+            if new_season:
+                self.conn.execute("DELETE FROM capital_members WHERE clan_tag = ?", (clan_tag,))
+                self.conn.execute("DELETE FROM capital_attacks WHERE clan_tag = ?", (clan_tag,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO capital_seasons (clan_tag, season_id, payload) VALUES (?, ?, ?)",
+                (clan_tag, season_id, payload)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO capital_members (clan_tag, tag, name, looted) VALUES (?, ?, ?, ?)",
+                changed_members
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO capital_attacks (clan_tag, attacker_tag, defender_tag, destruction) VALUES (?, ?, ?, ?)",
+                new_attacks
+            )
+            self.conn.commit()
+        self._capital[clan_tag] = (season_id, payload)
+        self._capital_members[clan_tag] = {**written_members, **members}
+        self._capital_attacks[clan_tag] = written_attacks | attacks
+
+    # Guarda uma guerra terminada (WarState) no arquivo usado pelas estatísticas.
+    # Retorna as linhas (participantes, ataques) se a guerra ainda não estava
+    # arquivada, ou None.
+    def archive_war(self, clan_tag, war):
+        members, attacks = war_archive_rows(clan_tag, war)
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO war_archive (clan_tag, war_id, end_time, team_size, opponent_name, stars, "
+                "opponent_stars, destruction, opponent_destruction) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (clan_tag, war.id, war.end_time, war.team_size, war.opponent.name, war.clan.stars,
+                 war.opponent.stars, war.clan.destruction, war.opponent.destruction)
+            )
+            if cursor.rowcount == 0:
+                return None
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO war_archive_members (clan_tag, war_id, side, tag, name, townhall_level, "
+                "attacks_allowed, attacks_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                members
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO war_archive_attacks (clan_tag, war_id, side, attacker_tag, defender_tag, stars, "
+                "destruction) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                attacks
+            )
+            self.conn.commit()
+        return members, attacks
+
+    # Todas as guerras arquivadas, no formato de war_archive_rows: (participantes, ataques)
+    def load_war_archive(self):
+        with self._lock:
+            members = self.conn.execute(
+                "SELECT clan_tag, war_id, side, tag, name, townhall_level, attacks_allowed, attacks_used "
+                "FROM war_archive_members"
+            ).fetchall()
+            attacks = self.conn.execute(
+                "SELECT clan_tag, war_id, side, attacker_tag, defender_tag, stars, destruction FROM war_archive_attacks"
+            ).fetchall()
+        return members, attacks
+
+    # Fim da guerra mais recente do histórico de guerras gravado (None se vazio)
+    def last_war_log_end(self, clan_tag):
+        with self._lock:
+            return self.conn.execute("SELECT MAX(end_time) FROM war_log WHERE clan_tag = ?", (clan_tag,)).fetchone()[0]
+
+    # Grava itens do histórico de guerras (/warlog), no formato da API
+    def save_war_log(self, clan_tag, items):
+        rows = [(clan_tag, item['endTime'], item.get('result'), item.get('teamSize'),
+                 item.get('opponent', {}).get('tag'), item.get('opponent', {}).get('name'),
+                 item.get('clan', {}).get('stars'), item.get('opponent', {}).get('stars'),
+                 item.get('clan', {}).get('destructionPercentage'), item.get('opponent', {}).get('destructionPercentage'))
+                for item in items]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO war_log (clan_tag, end_time, result, team_size, opponent_tag, opponent_name, "
+                "stars, opponent_stars, destruction, opponent_destruction) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+
+    # Resultado, estrelas e destruição de cada guerra do histórico gravado
+    def load_war_log(self, clan_tag):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT result, stars, destruction FROM war_log WHERE clan_tag = ? ORDER BY end_time DESC", (clan_tag,)
+            ).fetchall()
+
+    # Início da temporada da Capital terminada mais recente gravada (None se vazio)
+    def last_capital_season(self, clan_tag):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT MAX(start_time) FROM capital_history WHERE clan_tag = ?", (clan_tag,)
+            ).fetchone()[0]
+
+    # Grava temporadas terminadas da Capital (/capitalraidseasons), no formato da API
+    def save_capital_history(self, clan_tag, items):
+        rows = [(clan_tag, item['startTime'], item.get('endTime'), item.get('capitalTotalLoot'),
+                 item.get('raidsCompleted'), item.get('totalAttacks'), item.get('enemyDistrictsDestroyed',
+                 item.get('districtsDestroyed')), item.get('offensiveReward'), item.get('defensiveReward'))
+                for item in items]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO capital_history (clan_tag, start_time, end_time, capital_total_loot, "
+                "raids_completed, total_attacks, districts_destroyed, offensive_reward, defensive_reward) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+
+    # Últimas `limit` temporadas terminadas da Capital: [(início, saque total,
+    # ataques, distritos destruídos, recompensa ofensiva, recompensa defensiva)]
+    def load_capital_history(self, clan_tag, limit=5):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT start_time, capital_total_loot, total_attacks, districts_destroyed, offensive_reward, "
+                "defensive_reward FROM capital_history WHERE clan_tag = ? ORDER BY start_time DESC LIMIT ?",
+                (clan_tag, limit)
+            ).fetchall()
+
+    # Carrega o último estado gravado de um clã, no mesmo formato usado pelo
+    # monitoramento: {"members", "war" (WarState), "capital" (CapitalSeason)}
+    def load_state(self, clan_tag):
+        with self._lock:
+            member_rows = self.conn.execute(
+                "SELECT tag, name, donations, donations_received FROM members WHERE clan_tag = ?", (clan_tag,)
+            ).fetchall()
+            war_row = self.conn.execute(
+                "SELECT war_id, state, payload FROM wars WHERE clan_tag = ?", (clan_tag,)
+            ).fetchone()
+            attack_rows = self.conn.execute(
+                "SELECT side, attacker_tag, defender_tag, stars, destruction, attack_order FROM war_attacks WHERE clan_tag = ?",
+                (clan_tag,)
+            ).fetchall()
+            capital_row = self.conn.execute(
+                "SELECT season_id, payload FROM capital_seasons WHERE clan_tag = ?", (clan_tag,)
+            ).fetchone()
+            capital_member_rows = self.conn.execute(
+                "SELECT tag, name, looted FROM capital_members WHERE clan_tag = ?", (clan_tag,)
+            ).fetchall()
+            capital_attack_rows = self.conn.execute(
+                "SELECT attacker_tag, defender_tag, destruction FROM capital_attacks WHERE clan_tag = ?", (clan_tag,)
+            ).fetchall()
+            league_rows = self.conn.execute(
+                "SELECT season, war_id, state, last_order FROM league_rounds WHERE clan_tag = ?", (clan_tag,)
+            ).fetchall()
+
+        state = {"members": {}, "war": None, "capital": None,
+                 "league_season": league_rows[0][0] if league_rows else None,
+                 "league_wars": {war_id: RoundProgress(war_id, war_state, last_order)
+                                 for _, war_id, war_state, last_order in league_rows}}
+        for tag, name, donations, received in member_rows:
+            state["members"][tag] = ClanMember(tag, name, donations=donations, donations_received=received)
+        self._members[clan_tag] = {tag: (name, donations, received) for tag, name, donations, received in member_rows}
+
+        if war_row:
+            current_id, war_state, payload = war_row
+            war = json.loads(payload)
+            for side in ('clan', 'opponent'):
+                war.setdefault(side, {})['members'] = []
+            members_by_side = {'clan': {}, 'opponent': {}}
+            for side, attacker_tag, defender_tag, stars, destruction, order in attack_rows:
+                member = members_by_side[side].get(attacker_tag)
+                if member is None:
+                    member = members_by_side[side][attacker_tag] = {'tag': attacker_tag, 'attacks': []}
+                    war[side]['members'].append(member)
+                member['attacks'].append({'defenderTag': defender_tag, 'stars': stars,
+                                          'destructionPercentage': destruction, 'order': order})
+            state["war"] = WarState(war)
+            self._wars[clan_tag] = (current_id, war_state, state["war"].last_order)
+
+        if capital_row:
+            season_id, payload = capital_row
+            summary = json.loads(payload)
+            season = dict(summary)
+            if summary.get('hasMembers'):
+                season['members'] = [{'tag': tag, 'name': name, 'capitalResourcesLooted': looted}
+                                     for tag, name, looted in capital_member_rows]
+            if summary.get('hasAttackLog'):
+                season['attackLog'] = [{'attacker': {'tag': a}, 'defender': {'tag': d}, 'destructionPercentage': destruction}
+                                       for a, d, destruction in capital_attack_rows]
+            state["capital"] = CapitalSeason.from_payload(season)
+            self._capital[clan_tag] = (season_id, payload)
+            self._capital_members[clan_tag] = {tag: (name, looted) for tag, name, looted in capital_member_rows}
+            self._capital_attacks[clan_tag] = set(capital_attack_rows)
+        return state
+
+    # Grava o progresso das rodadas da liga (RoundProgress) que mudaram,
+    # descartando as de temporadas anteriores
+    def save_league_rounds(self, clan_tag, season, rounds):
+        with self._lock:
+            self.conn.execute("DELETE FROM league_rounds WHERE clan_tag = ? AND season IS NOT ?", (clan_tag, season))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO league_rounds (clan_tag, season, war_id, state, last_order) VALUES (?, ?, ?, ?, ?)",
+                [(clan_tag, season, r.id, r.state, r.last_order) for r in rounds]
+            )
+            self.conn.commit()
+
+    # Índice de atividade dos membros: [(tag, marca, last_seen, desde)]
+    def load_activity(self):
+        with self._lock:
+            return self.conn.execute("SELECT tag, fingerprint, last_seen, tracked_since FROM member_activity").fetchall()
+
+    # Grava as linhas alteradas do índice de atividade (veja ActivityTracker)
+    def save_activity(self, rows):
+        if not rows:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO member_activity (tag, fingerprint, last_seen, tracked_since) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+
+    # Últimas execuções das tarefas agendadas: {nome: (período, dados)}
+    def load_job_runs(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT job, period, data FROM job_runs").fetchall()
+        return {job: (period, json.loads(data) if data else None) for job, period, data in rows}
+
+    # Marca a execução de uma tarefa agendada no período informado
+    def save_job_run(self, job, period, data):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO job_runs (job, period, data) VALUES (?, ?, ?)",
+                (job, period, json.dumps(data) if data is not None else None)
+            )
+            self.conn.commit()
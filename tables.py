@@ -0,0 +1,60 @@
+CODE_FENCE = "```"
+
+
+# Coluna de uma tabela de largura fixa: título, largura e alinhamento ('<' ou '>')
+class Column:
+    __slots__ = ('title', 'width', 'align')
+
+    def __init__(self, title, width, align='<'):
+        self.title = title
+        self.width = width
+        self.align = align
+
+
+# Renderiza uma tabela de largura fixa em páginas de até `per_page` linhas, cada
+# uma um bloco de código com o cabeçalho. Os valores são cortados na largura da
+# coluna. Sem linhas, devolve uma única página só com o cabeçalho.
+def render_table(columns, rows, per_page=20):
+    row_format = " | ".join(f"{{:{c.align}{c.width}.{c.width}}}" for c in columns)
+    header = row_format.format(*(c.title for c in columns)).rstrip()
+    separator = "-" * len(header)
+    lines = [row_format.format(*(str(value) for value in row)).rstrip() for row in rows]
+    pages = []
+    for start in range(0, max(len(lines), 1), per_page):
+        pages.append("\n".join([CODE_FENCE, header, separator, *lines[start:start + per_page], CODE_FENCE]))
+    return pages
+
+
+# Páginas já renderizadas de cada ranking (ex.: ("trofeus", tag do clã)), junto
+# com a versão dos dados de que vieram (o snapshot usado). Enquanto o
+# monitoramento não troca o snapshot, os comandos reaproveitam as páginas.
+class PageCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._pages = {}
+
+    # Páginas de `key` se foram renderizadas a partir de `version`; senão None
+    def get(self, key, version):
+        entry = self._pages.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, version, pages):
+        self._pages[key] = (version, pages)
+        return pages
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._pages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def __len__(self):
+        return len(self._pages)
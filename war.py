@@ -0,0 +1,139 @@
+from bisect import bisect_right
+
+
+# Identificador de uma guerra (a API não fornece um id próprio)
+def war_id(war_data):
+    return war_data.get('preparationStartTime') or war_data.get('startTime') or ''
+
+
+# Ataque de guerra. `side` é o lado do atacante: 'clan' ou 'opponent'.
+class WarAttack:
+    __slots__ = ('order', 'side', 'attacker_tag', 'defender_tag', 'stars', 'destruction')
+
+    def __init__(self, order, side, attacker_tag, defender_tag, stars, destruction):
+        self.order = order
+        self.side = side
+        self.attacker_tag = attacker_tag
+        self.defender_tag = defender_tag
+        self.stars = stars
+        self.destruction = destruction
+
+
+# Participante de uma guerra
+class WarMember:
+    __slots__ = ('tag', 'name', 'map_position', 'townhall_level', 'attacks')
+
+    def __init__(self, tag, name, map_position, townhall_level, attacks):
+        self.tag = tag
+        self.name = name
+        self.map_position = map_position
+        self.townhall_level = townhall_level
+        self.attacks = attacks
+
+
+# Um dos lados da guerra, com os membros indexados por tag
+class WarSide:
+    __slots__ = ('tag', 'name', 'stars', 'destruction', 'attack_count', 'members')
+
+    def __init__(self, side, side_data):
+        self.tag = side_data.get('tag')
+        self.name = side_data.get('name')
+        self.stars = side_data.get('stars', 0)
+        self.destruction = side_data.get('destructionPercentage', 0)
+        self.attack_count = side_data.get('attacks', 0)
+        self.members = {}
+        for member in side_data.get('members', []):
+            if 'tag' not in member:
+                continue
+            attacks = tuple(
+                WarAttack(attack.get('order') or 0, side, member['tag'], attack['defenderTag'],
+                          attack.get('stars', 0), attack.get('destructionPercentage', 0))
+                for attack in member.get('attacks', []) if 'defenderTag' in attack
+            )
+            self.members[member['tag']] = WarMember(member['tag'], member.get('name'), member.get('mapPosition', 0),
+                                                    member.get('townhallLevel'), attacks)
+
+    # Cópia deste lado como o lado `side` da guerra (os ataques mudam de lado)
+    def as_side(self, side):
+        copy = WarSide(side, {})
+        copy.tag, copy.name, copy.stars = self.tag, self.name, self.stars
+        copy.destruction, copy.attack_count = self.destruction, self.attack_count
+        for tag, m in self.members.items():
+            attacks = tuple(WarAttack(a.order, side, a.attacker_tag, a.defender_tag, a.stars, a.destruction)
+                            for a in m.attacks)
+            copy.members[tag] = WarMember(m.tag, m.name, m.map_position, m.townhall_level, attacks)
+        return copy
+
+
+# Modelo de uma guerra montado uma única vez por payload: índices tag→membro dos
+# dois lados e a lista de ataques ordenada pelo campo `order` da API, que permite
+# encontrar os ataques novos a partir de uma marca d'água em vez de comparar
+# todos os ataques a cada verificação.
+class WarState:
+    __slots__ = ('id', 'state', 'team_size', 'attacks_per_member', 'preparation_start_time', 'start_time',
+                 'end_time', 'clan', 'opponent', 'attacks', '_orders', 'last_order')
+
+    def __init__(self, war_data):
+        self.id = war_id(war_data)
+        self.state = war_data.get('state')
+        self.team_size = war_data.get('teamSize')
+        self.attacks_per_member = war_data.get('attacksPerMember', 2)
+        self.preparation_start_time = war_data.get('preparationStartTime')
+        self.start_time = war_data.get('startTime')
+        self.end_time = war_data.get('endTime')
+        self.clan = WarSide('clan', war_data.get('clan', {}))
+        self.opponent = WarSide('opponent', war_data.get('opponent', {}))
+        self._index_attacks()
+
+    def _index_attacks(self):
+        attacks = [attack for side in (self.clan, self.opponent)
+                   for member in side.members.values() for attack in member.attacks]
+        attacks.sort(key=lambda a: a.order)
+        self.attacks = attacks
+        self._orders = [a.order for a in attacks]
+        self.last_order = self._orders[-1] if attacks else 0
+
+    # A mesma guerra vista pelo lado do oponente
+    def swapped(self):
+        war = WarState.__new__(WarState)
+        for name in ('id', 'state', 'team_size', 'attacks_per_member', 'preparation_start_time', 'start_time',
+                     'end_time'):
+            setattr(war, name, getattr(self, name))
+        war.clan = self.opponent.as_side('clan')
+        war.opponent = self.clan.as_side('opponent')
+        war._index_attacks()
+        return war
+
+    def side(self, side):
+        return self.clan if side == 'clan' else self.opponent
+
+    # Ataques feitos depois da marca `order`
+    def attacks_since(self, order):
+        return self.attacks[bisect_right(self._orders, order):]
+
+    # Ataques de um dos lados, na ordem em que aconteceram
+    def side_attacks(self, side):
+        return [a for a in self.attacks if a.side == side]
+
+    # Nome do atacante de um ataque
+    def attacker_name(self, attack, default):
+        attacker = self.side(attack.side).members.get(attack.attacker_tag)
+        return (attacker.name if attacker else None) or default
+
+    # Nome do defensor de um ataque
+    def defender_name(self, attack, default):
+        defending_side = self.opponent if attack.side == 'clan' else self.clan
+        defender = defending_side.members.get(attack.defender_tag)
+        return (defender.name if defender else None) or default
+
+
+# Linhas de uma guerra terminada para o arquivo de guerras e as estatísticas:
+# participantes (clã, guerra, lado, tag, nome, CV, ataques permitidos, ataques
+# feitos) e ataques (clã, guerra, lado, atacante, defensor, estrelas, destruição)
+def war_archive_rows(clan_tag, war):
+    members = [(clan_tag, war.id, side_name, m.tag, m.name, m.townhall_level, war.attacks_per_member, len(m.attacks))
+               for side_name, side in (('clan', war.clan), ('opponent', war.opponent))
+               for m in side.members.values()]
+    attacks = [(clan_tag, war.id, a.side, a.attacker_tag, a.defender_tag, a.stars, a.destruction)
+               for a in war.attacks]
+    return members, attacks